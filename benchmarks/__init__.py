@@ -0,0 +1,3 @@
+"""
+Benchmarks for edx-rest-api-client, run against a local stub server. See ``benchmarks.run``.
+"""
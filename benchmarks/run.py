@@ -0,0 +1,411 @@
+"""
+Benchmarks for the request path of ``OAuthAPIClient``.
+
+Each benchmark returns a dict of results, and ``main`` writes them all as JSON so that they can be
+compared across releases. Run them with ``python -m benchmarks``, or ``make benchmark``.
+
+The stub server runs in a thread of the benchmark process, so it competes with the client for the
+GIL: throughput numbers are only meaningful relative to other runs on the same machine.
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A host that is never resolved: requests to it are answered in process by _CannedResponseAdapter.
+IN_PROCESS_URL = 'http://in-process.benchmark/api/v1/items/'
+
+CLIENT_ID = 'benchmark-client-id'
+CLIENT_SECRET = 'benchmark-client-secret'
+
+IMPORT_TIME_CODE = (
+    'import time; start = time.perf_counter(); import edx_rest_api_client.client; '
+    'print(time.perf_counter() - start)'
+)
+
+
+def configure_django():
+    """
+    Configures Django with its default, in-memory cache, unless the caller already configured it.
+    """
+    from django.conf import settings  # pylint: disable=import-outside-toplevel
+    if not settings.configured and not os.environ.get('DJANGO_SETTINGS_MODULE'):
+        settings.configure()
+
+
+class _CannedResponseAdapter(requests.adapters.BaseAdapter):
+    """
+    Answers every request with the same response, without any I/O.
+
+    Mounting it on a session isolates the time spent in the session itself from the network.
+    """
+
+    def __init__(self, content):
+        super().__init__()
+        self.content = content
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ,unused-argument
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers['Content-Type'] = 'application/json'
+        response.url = request.url
+        response.request = request
+        response._content = self.content  # pylint: disable=protected-access
+        response._content_consumed = True  # pylint: disable=protected-access
+        return response
+
+    def close(self):
+        pass
+
+
+def _summarize(samples_ns):
+    """
+    Returns statistics, in microseconds, for a list of durations in nanoseconds.
+    """
+    samples = sorted(samples_ns)
+    return {
+        'count': len(samples),
+        'min_us': samples[0] / 1000,
+        'mean_us': statistics.fmean(samples) / 1000,
+        'median_us': statistics.median(samples) / 1000,
+        'p95_us': samples[int(len(samples) * 0.95) - 1] / 1000,
+        'p99_us': samples[int(len(samples) * 0.99) - 1] / 1000,
+    }
+
+
+def _time_calls(calls, iterations, warmup=50):
+    """
+    Times each of ``calls`` ``iterations`` times, interleaving them so that they see the same conditions.
+    """
+    for _ in range(warmup):
+        for call in calls:
+            call()
+    samples = [[] for _ in calls]
+    for _ in range(iterations):
+        for call, call_samples in zip(calls, samples):
+            start = time.perf_counter_ns()
+            call()
+            call_samples.append(time.perf_counter_ns() - start)
+    return [_summarize(call_samples) for call_samples in samples]
+
+
+def _new_client(server, **kwargs):
+    from edx_rest_api_client.client import OAuthAPIClient  # pylint: disable=import-outside-toplevel
+    return OAuthAPIClient(server.url, CLIENT_ID, CLIENT_SECRET, **kwargs)
+
+
+def _clear_token_caches():
+    from edx_django_utils.cache import TieredCache  # pylint: disable=import-outside-toplevel
+    TieredCache.dangerous_clear_all_tiers()
+
+
+def _compare(raw_session, client, url, iterations):
+    raw, oauth_client = _time_calls([lambda: raw_session.get(url), lambda: client.get(url)], iterations)
+    return {
+        'requests_session': raw,
+        'oauth_api_client': oauth_client,
+        'overhead_median_us': oauth_client['median_us'] - raw['median_us'],
+        'overhead_mean_us': oauth_client['mean_us'] - raw['mean_us'],
+    }
+
+
+def bench_per_call_overhead(server, iterations):
+    """
+    Measures the time ``OAuthAPIClient.request`` adds to a plain ``requests.Session`` request.
+
+    The ``in_process`` results answer requests without any I/O, so they show the overhead of the
+    client itself. The ``loopback`` results make real requests to the stub server.
+
+    The plain session sends the same JWT, so that both skip the ``.netrc`` lookup requests makes
+    for requests without authentication.
+    """
+    from benchmarks.stub_server import API_PATH  # pylint: disable=import-outside-toplevel
+    from edx_rest_api_client.auth import SuppliedJwtAuth  # pylint: disable=import-outside-toplevel
+    _clear_token_caches()
+    results = {}
+    with requests.Session() as raw_session, _new_client(server) as client:
+        # Get the access token before timing anything.
+        raw_session.auth = SuppliedJwtAuth(client.get_jwt_access_token())
+        results['loopback'] = _compare(raw_session, client, server.url + API_PATH, iterations)
+
+        adapter = _CannedResponseAdapter(server.api_body)
+        raw_session.mount(IN_PROCESS_URL, adapter)
+        client.mount(IN_PROCESS_URL, adapter)
+        results['in_process'] = _compare(raw_session, client, IN_PROCESS_URL, iterations)
+    return results
+
+
+def bench_header_propagation(server, iterations):
+    """
+    Measures the time ``OAuthAPIClient.request`` takes while a Django request is being handled.
+
+    Requests are answered without any I/O, so the results show the time spent in the client. The
+    ``no_django_request`` calls are made outside of a Django request. The ``x_request_id`` calls
+    propagate the X-Request-ID of the Django request, and the ``extra_headers`` calls also propagate
+    its traceparent and tenant headers.
+    """
+    import crum  # pylint: disable=import-outside-toplevel
+    from django.http import HttpRequest  # pylint: disable=import-outside-toplevel
+    _clear_token_caches()
+    inbound_request = HttpRequest()
+    inbound_request.META.update({
+        'HTTP_X_REQUEST_ID': 'benchmark-request-id',
+        'HTTP_TRACEPARENT': '00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01',
+        'HTTP_X_TENANT_ID': 'benchmark-tenant',
+    })
+    adapter = _CannedResponseAdapter(server.api_body)
+    extra_headers = ('X-Request-ID', 'traceparent', 'X-Tenant-ID')
+    with _new_client(server) as client, _new_client(server, propagate_headers=extra_headers) as extra_client:
+        for benchmark_client in (client, extra_client):
+            benchmark_client.mount(IN_PROCESS_URL, adapter)
+            benchmark_client.get_jwt_access_token()
+        no_django_request, = _time_calls([lambda: client.get(IN_PROCESS_URL)], iterations)
+        crum.set_current_request(inbound_request)
+        try:
+            x_request_id, extra = _time_calls(
+                [lambda: client.get(IN_PROCESS_URL), lambda: extra_client.get(IN_PROCESS_URL)], iterations,
+            )
+        finally:
+            crum.set_current_request(None)
+    return {
+        'no_django_request': no_django_request,
+        'x_request_id': x_request_id,
+        'extra_headers': extra,
+    }
+
+
+def bench_endpoint(server, iterations):
+    """
+    Compares ``OAuthAPIClient.get`` with calls of an ``OAuthAPIClient.endpoint``, for a URL with a path field.
+
+    Requests are answered without any I/O, so the results show the time spent in the client.
+    """
+    _clear_token_caches()
+    with _new_client(server) as client:
+        client.mount(IN_PROCESS_URL, _CannedResponseAdapter(server.api_body))
+        client.get_jwt_access_token()
+        get_item = client.endpoint(IN_PROCESS_URL + '{item_id}/')
+        get, endpoint = _time_calls(
+            [lambda: client.get(IN_PROCESS_URL + '{}/'.format(42)), lambda: get_item(item_id=42)], iterations,
+        )
+    return {
+        'get': get,
+        'endpoint': endpoint,
+        'saved_median_us': get['median_us'] - endpoint['median_us'],
+        'saved_mean_us': get['mean_us'] - endpoint['mean_us'],
+    }
+
+
+def _make_requests(client, url, count, barrier, errors):
+    barrier.wait()
+    for _ in range(count):
+        try:
+            client.get(url).raise_for_status()
+        except requests.RequestException as error:
+            errors.append(error)
+
+
+def bench_throughput(server, thread_counts, requests_per_level):
+    """
+    Measures how many requests per second threads sharing a single client make to the stub server.
+    """
+    from benchmarks.stub_server import API_PATH  # pylint: disable=import-outside-toplevel
+    _clear_token_caches()
+    url = server.url + API_PATH
+    results = []
+    for thread_count in thread_counts:
+        requests_per_thread = max(requests_per_level // thread_count, 1)
+        errors = []
+        with _new_client(server, pool_connections=1, pool_maxsize=thread_count) as client:
+            client.get_jwt_access_token()
+            barrier = threading.Barrier(thread_count + 1)
+            threads = [
+                threading.Thread(target=_make_requests, args=(client, url, requests_per_thread, barrier, errors))
+                for _ in range(thread_count)
+            ]
+            for thread in threads:
+                thread.start()
+            barrier.wait()
+            start = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+        total_requests = requests_per_thread * thread_count
+        results.append({
+            'threads': thread_count,
+            'requests': total_requests,
+            'errors': len(errors),
+            'seconds': elapsed,
+            'requests_per_second': total_requests / elapsed,
+        })
+    return results
+
+
+def bench_token_stampede(server, thread_count):
+    """
+    Measures what happens when many clients need an access token at the same time, with an empty cache.
+
+    Ideally only one access token request reaches the stub server, and the other clients reuse its token.
+    """
+    _clear_token_caches()
+    server.reset_token_requests()
+    clients = [_new_client(server) for _ in range(thread_count)]
+    barrier = threading.Barrier(thread_count)
+    samples = [None] * thread_count
+
+    def get_token(index):
+        barrier.wait()
+        start = time.perf_counter_ns()
+        clients[index].get_jwt_access_token()
+        samples[index] = time.perf_counter_ns() - start
+
+    threads = [threading.Thread(target=get_token, args=(index,)) for index in range(thread_count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        client.close()
+
+    return {
+        'threads': thread_count,
+        'token_latency_seconds': server.token_latency,
+        'token_requests': server.token_requests,
+        'seconds': elapsed,
+        'latency': _summarize(samples),
+    }
+
+
+def bench_import_time(repeats):
+    """
+    Measures how long importing ``edx_rest_api_client.client`` takes in a new interpreter.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIR, os.environ.get('PYTHONPATH')])))
+    samples = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_TIME_CODE], capture_output=True, check=True, env=env, text=True,
+        ).stdout
+        samples.append(float(output.strip()) * 1000)
+    return {
+        'repeats': repeats,
+        'min_ms': min(samples),
+        'median_ms': statistics.median(samples),
+    }
+
+
+def bench_json_decoding(items, iterations):
+    """
+    Measures how long decoding a large page of results takes with each of the available decoders.
+    """
+    from edx_rest_api_client import json_utils  # pylint: disable=import-outside-toplevel
+    content = json.dumps({
+        'count': items,
+        'next': None,
+        'results': [{'id': index, 'key': 'course-v1:edX+Demo+{}'.format(index), 'pacing': 'self'}
+                    for index in range(items)],
+    }).encode('utf-8')
+
+    def response():
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(content)
+        response.encoding = 'utf-8'
+        return response
+
+    def iterate_items():
+        for _ in json_utils.iter_json_items(response()):
+            pass
+
+    response_json, decode_response, streamed = _time_calls([
+        lambda: response().json(),
+        lambda: json_utils.decode_response(response()),
+        iterate_items,
+    ], iterations, warmup=2)
+    return {
+        'bytes': len(content),
+        'fast_decoder': 'orjson' if json_utils.orjson else 'msgspec' if json_utils.msgspec else None,
+        'response_json': response_json,
+        'decode_response': decode_response,
+        'iter_json_items': streamed,
+    }
+
+
+def _get_metadata():
+    from edx_rest_api_client import __version__  # pylint: disable=import-outside-toplevel
+    return {
+        'edx_rest_api_client_version': __version__,
+        'requests_version': requests.__version__,
+        'python_version': platform.python_version(),
+        'python_implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+BENCHMARKS = ('overhead', 'propagation', 'endpoint', 'throughput', 'stampede', 'import_time', 'json')
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', default='-', help='File to write the JSON results to, or - for stdout.')
+    parser.add_argument('--only', action='append', choices=BENCHMARKS, help='Benchmark to run (repeatable).')
+    parser.add_argument('--iterations', type=int, default=2000, help='Timed requests per overhead measurement.')
+    parser.add_argument('--threads', default='1,2,4,8,16,32,64', help='Comma separated thread counts.')
+    parser.add_argument('--throughput-requests', type=int, default=2000, help='Requests per thread count.')
+    parser.add_argument('--stampede-threads', type=int, default=32, help='Clients asking for a token at once.')
+    parser.add_argument('--token-latency', type=float, default=0.05, help='Seconds to answer token requests.')
+    parser.add_argument('--json-items', type=int, default=20000, help='Items in the page the json benchmark decodes.')
+    parser.add_argument('--import-repeats', type=int, default=5, help='Interpreters started to time the import.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    selected = args.only or BENCHMARKS
+
+    # Time the import before this process imports the client.
+    results = {}
+    if 'import_time' in selected:
+        results['import_time'] = bench_import_time(args.import_repeats)
+
+    configure_django()
+    from benchmarks.stub_server import StubServer  # pylint: disable=import-outside-toplevel
+    with StubServer(token_latency=args.token_latency) as server:
+        if 'overhead' in selected:
+            results['overhead'] = bench_per_call_overhead(server, args.iterations)
+        if 'propagation' in selected:
+            results['propagation'] = bench_header_propagation(server, args.iterations)
+        if 'endpoint' in selected:
+            results['endpoint'] = bench_endpoint(server, args.iterations)
+        if 'throughput' in selected:
+            thread_counts = [int(count) for count in args.threads.split(',')]
+            results['throughput'] = bench_throughput(server, thread_counts, args.throughput_requests)
+        if 'stampede' in selected:
+            results['stampede'] = bench_token_stampede(server, args.stampede_threads)
+
+    if 'json' in selected:
+        results['json'] = bench_json_decoding(args.json_items, max(args.iterations // 100, 5))
+
+    output = json.dumps({'metadata': _get_metadata(), 'results': results}, indent=2, sort_keys=True)
+    if args.output == '-':
+        print(output)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(output + '\n')
@@ -0,0 +1,117 @@
+"""
+A local HTTP server that stands in for the OAuth2 provider and an API during benchmarks.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ACCESS_TOKEN_PATH = '/oauth2/access_token'
+API_PATH = '/api/v1/items/'
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers access token requests and API requests with small, fixed JSON bodies.
+    """
+
+    # Keep connections alive, like real services, so the benchmarks measure pooled requests.
+    protocol_version = 'HTTP/1.1'
+    # The headers and the body are written separately: without this, delayed ACKs add ~40ms to each request.
+    disable_nagle_algorithm = True
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path != ACCESS_TOKEN_PATH:
+            self._send_json(404, {})
+            return
+        self.server.record_token_request()
+        if self.server.token_latency:
+            time.sleep(self.server.token_latency)
+        self._send_json(200, {
+            'access_token': 'benchmark-token',
+            'expires_in': self.server.token_expires_in,
+            'token_type': 'JWT',
+        })
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        if not self.path.startswith(API_PATH):
+            self._send_json(404, {})
+            return
+        self._send_json(200, self.server.api_body)
+
+    def _send_json(self, status, body):
+        content = body if isinstance(body, bytes) else json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Serves the stub OAuth2 provider and API on a free local port, in a daemon thread.
+
+    Usage example::
+
+        with StubServer(token_latency=0.05) as server:
+            client = OAuthAPIClient(server.url, 'client-id', 'client-secret')
+            client.get(server.url + API_PATH)
+
+    """
+
+    daemon_threads = True
+
+    def __init__(self, token_latency=0, token_expires_in=3600, api_items=10):
+        """
+        Args:
+            token_latency (float): How long in seconds the access token endpoint takes to answer.
+            token_expires_in (int): Lifetime in seconds of the access tokens that are returned.
+            api_items (int): Number of items in the API responses.
+
+        """
+        super().__init__(('127.0.0.1', 0), _StubRequestHandler)
+        self.token_latency = token_latency
+        self.token_expires_in = token_expires_in
+        self.api_body = json.dumps({
+            'count': api_items,
+            'next': None,
+            'previous': None,
+            'results': [{'id': index, 'name': 'Item {}'.format(index)} for index in range(api_items)],
+        }).encode('utf-8')
+        self.token_requests = 0
+        self._token_requests_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def record_token_request(self):
+        with self._token_requests_lock:
+            self.token_requests += 1
+
+    def reset_token_requests(self):
+        with self._token_requests_lock:
+            self.token_requests = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='benchmark-stub-server', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
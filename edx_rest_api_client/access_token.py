@@ -0,0 +1,151 @@
+"""
+Access tokens and their lifetimes.
+
+Expirations are kept as UTC datetimes, so that they can be shared between processes and hosts, but
+whether a token is still valid is decided with the monotonic clock of the process. This way a jump
+of the wall clock, like an NTP correction, can't make a token expire early or be used after it expired.
+"""
+import datetime
+import time
+
+import jwt
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def get_jwt_expiration(access_token):
+    """
+    Returns the ``exp`` claim of a JWT access token as a naive UTC datetime.
+
+    The signature isn't verified: the expiration is only used to avoid using the token after it expires.
+
+    Returns:
+        datetime.datetime: The expiration, or None if the token isn't a JWT or has no expiration.
+
+    """
+    try:
+        expiration = jwt.decode(access_token, options={'verify_signature': False}).get('exp')
+        return _EPOCH + datetime.timedelta(seconds=expiration)
+    except (jwt.InvalidTokenError, TypeError, OverflowError):
+        return None
+
+
+def get_jwt_lifetime(access_token):
+    """
+    Returns the seconds between the ``iat`` and ``exp`` claims of a JWT access token, without verifying it.
+
+    Returns:
+        float: The lifetime, or None if the token isn't a JWT or lacks either claim.
+
+    """
+    try:
+        claims = jwt.decode(access_token, options={'verify_signature': False})
+        return float(claims['exp'] - claims['iat'])
+    except (jwt.InvalidTokenError, KeyError, TypeError):
+        return None
+
+
+class AccessToken(tuple):
+    """
+    An (access token string, expiration datetime) tuple, which also knows when the token expires on
+    the monotonic clock.
+
+    It unpacks like the tuples returned by earlier versions of this library::
+
+        token, expiration = get_and_cache_oauth_access_token(url, client_id, client_secret)
+
+    The monotonic deadline only makes sense within a process. When the token is pickled, or read from
+    a cache as a plain tuple, the deadline is computed again from the expiration.
+    """
+
+    def __new__(cls, access_token, expires_at, monotonic_deadline=None, lifetime_seconds=None):
+        """
+        Args:
+            access_token (str): The access token.
+            expires_at (datetime.datetime): When the token expires, as a naive UTC datetime.
+            monotonic_deadline (float): When the token expires, in ``time.monotonic()`` seconds.
+                Defaults to the time left until ``expires_at`` on the wall clock.
+            lifetime_seconds (float): How long the token was valid for when it was issued, if known.
+
+        """
+        record = super().__new__(cls, (access_token, expires_at))
+        if monotonic_deadline is None:
+            remaining_seconds = (expires_at - datetime.datetime.utcnow()).total_seconds()
+            monotonic_deadline = time.monotonic() + remaining_seconds
+        record.monotonic_deadline = monotonic_deadline
+        record.lifetime_seconds = lifetime_seconds
+        return record
+
+    def __reduce__(self):
+        return (type(self), (self.access_token, self.expires_at))
+
+    @classmethod
+    def from_tuple(cls, oauth_access_token_response):
+        """
+        Returns the (access token, expiration) tuple ``oauth_access_token_response`` as an AccessToken.
+        """
+        if isinstance(oauth_access_token_response, cls):
+            return oauth_access_token_response
+        access_token, expires_at = oauth_access_token_response
+        return cls(access_token, expires_at)
+
+    @classmethod
+    def from_expires_in(cls, access_token, expires_in, requested_at, requested_at_monotonic):
+        """
+        Returns the AccessToken for a token endpoint response.
+
+        The lifetime is counted from when the token was requested, so the time taken by the request
+        shortens it rather than lengthening it. If the token is a JWT whose ``exp`` claim is earlier
+        than ``expires_in``, the token expires at ``exp`` instead.
+
+        Args:
+            access_token (str): The access token.
+            expires_in (float): The lifetime of the token in seconds, as returned by the token endpoint.
+            requested_at (datetime.datetime): When the token was requested, as a naive UTC datetime.
+            requested_at_monotonic (float): When the token was requested, in ``time.monotonic()`` seconds.
+
+        """
+        expires_at = requested_at + datetime.timedelta(seconds=expires_in)
+        jwt_expiration = get_jwt_expiration(access_token)
+        if jwt_expiration is not None and jwt_expiration < expires_at:
+            expires_at = jwt_expiration
+        lifetime_seconds = (expires_at - requested_at).total_seconds()
+        return cls(access_token, expires_at, requested_at_monotonic + lifetime_seconds, lifetime_seconds)
+
+    @property
+    def access_token(self):
+        return self[0]
+
+    @property
+    def expires_at(self):
+        return self[1]
+
+    def remaining_seconds(self):
+        """
+        Returns the number of seconds until the token expires, which is negative once it has expired.
+        """
+        return self.monotonic_deadline - time.monotonic()
+
+    def get_expiry_skew(self, expiry_skew_seconds):
+        """
+        Returns how long before its expiration the token should be replaced.
+
+        That is ``expiry_skew_seconds``, but at most half the lifetime of the token, so that tokens issued for
+        less than the skew can still be reused. The lifetime of tokens read from a cache is taken from their
+        JWT claims. Tokens whose lifetime is unknown get the whole skew.
+        """
+        lifetime_seconds = self.lifetime_seconds
+        if lifetime_seconds is None:
+            if self.remaining_seconds() > expiry_skew_seconds:
+                # The skew is the smaller, whatever the lifetime is.
+                return expiry_skew_seconds
+            lifetime_seconds = get_jwt_lifetime(self.access_token)
+            if lifetime_seconds is None:
+                return expiry_skew_seconds
+        return min(expiry_skew_seconds, lifetime_seconds / 2)
+
+    def is_valid(self, min_remaining_seconds=0):
+        """
+        Returns whether the token will still be valid in ``min_remaining_seconds``.
+        """
+        return self.remaining_seconds() > min_remaining_seconds
@@ -0,0 +1,264 @@
+"""
+An asyncio counterpart of ``OAuthAPIClient``, built on httpx.
+
+Requires the ``async`` extra: ``pip install edx-rest-api-client[async]``.
+"""
+import asyncio
+import datetime
+import json
+import time
+import weakref
+
+import httpx
+
+from edx_rest_api_client.access_token import AccessToken
+from edx_rest_api_client.auth import SuppliedJwtAuth
+from edx_rest_api_client.client import (ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS, REQUEST_CONNECT_TIMEOUT,
+                                        REQUEST_READ_TIMEOUT, _cache_access_token, _get_access_token_request_data,
+                                        _get_cached_access_token, _get_oauth_url, _get_token_cache_key,
+                                        get_request_id, get_user_agent)
+from edx_rest_api_client.django_support import set_custom_attribute
+from edx_rest_api_client.json_utils import decode_response
+from edx_rest_api_client.token_store import get_default_token_store
+
+# Serializes access token fetches per cache key within each event loop. asyncio locks can only
+# be used from a single loop, so the locks are kept separately for every running loop.
+_ASYNC_TOKEN_FETCH_LOCKS = weakref.WeakKeyDictionary()
+
+
+def _get_httpx_timeout(timeout):
+    """
+    Converts a requests-style (connect, read) timeout tuple to an ``httpx.Timeout``.
+    """
+    if isinstance(timeout, tuple):
+        connect_timeout, read_timeout = timeout
+        return httpx.Timeout(read_timeout, connect=connect_timeout)
+    return httpx.Timeout(timeout)
+
+
+async def get_oauth_access_token_async(url, client_id, client_secret, token_type='jwt',
+                                       grant_type='client_credentials', refresh_token=None,
+                                       timeout=(REQUEST_CONNECT_TIMEOUT, REQUEST_READ_TIMEOUT),
+                                       client=None):
+    """
+    Retrieves OAuth 2.0 access token using the given grant type, without blocking the event loop.
+
+    See ``get_oauth_access_token`` for usage details.
+
+    Kwargs:
+        client (httpx.AsyncClient): Client used to make the token request. A temporary client is
+            used if none is given.
+
+    Raises:
+        httpx.HTTPError if there is a problem retrieving the access token.
+
+    Returns:
+        AccessToken: Tuple containing (access token string, expiration datetime).
+
+    """
+    requested_at = datetime.datetime.utcnow()
+    requested_at_monotonic = time.monotonic()
+    data = _get_access_token_request_data(client_id, client_secret, token_type, grant_type, refresh_token)
+    request_kwargs = {
+        'data': data,
+        'headers': {'User-Agent': get_user_agent()},
+        'timeout': _get_httpx_timeout(timeout),
+    }
+
+    if client is None:
+        async with httpx.AsyncClient() as temporary_client:
+            response = await temporary_client.post(_get_oauth_url(url), **request_kwargs)
+    else:
+        response = await client.post(_get_oauth_url(url), **request_kwargs)
+
+    response.raise_for_status()  # Raise an exception for bad status codes.
+    try:
+        data = decode_response(response)
+        access_token = data['access_token']
+        expires_in = data['expires_in']
+    except (KeyError, json.decoder.JSONDecodeError) as json_error:
+        raise httpx.DecodingError('Invalid access token response', request=response.request) from json_error
+
+    return AccessToken.from_expires_in(access_token, expires_in, requested_at, requested_at_monotonic)
+
+
+async def get_and_cache_oauth_access_token_async(url, client_id, client_secret, token_type='jwt',
+                                                 grant_type='client_credentials', refresh_token=None,
+                                                 timeout=(REQUEST_CONNECT_TIMEOUT, REQUEST_READ_TIMEOUT),
+                                                 client=None,
+                                                 expiry_skew_seconds=ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS,
+                                                 token_store=None):
+    """
+    Retrieves a possibly cached OAuth 2.0 access token using the given grant type.
+
+    This shares its cache with ``get_and_cache_oauth_access_token``; see there for usage details.
+    Concurrent cache misses for the same token on an event loop are coalesced, so that only
+    one task requests a new token while the others wait for its result. Stores with a ``lock`` method,
+    like ``FileTokenStore``, are not locked, because their locks would block the event loop.
+
+    Returns:
+        AccessToken: Tuple containing (access token string, expiration datetime).
+
+    """
+    oauth_url = _get_oauth_url(url)
+    cache_key = _get_token_cache_key(token_type, grant_type, client_id, oauth_url)
+    if token_store is None:
+        token_store = get_default_token_store()
+
+    # Attempt to get an unexpired cached access token
+    cached_token = _get_cached_access_token(cache_key, 0, token_store, expiry_skew_seconds)
+    if cached_token is not None:
+        return cached_token
+
+    loop_locks = _ASYNC_TOKEN_FETCH_LOCKS.setdefault(asyncio.get_running_loop(), {})
+    async with loop_locks.setdefault(cache_key, asyncio.Lock()):
+        cached_token = _get_cached_access_token(cache_key, 0, token_store, expiry_skew_seconds)
+        if cached_token is not None:
+            return cached_token
+
+        oauth_access_token_response = await get_oauth_access_token_async(
+            oauth_url,
+            client_id,
+            client_secret,
+            token_type=token_type,
+            grant_type=grant_type,
+            refresh_token=refresh_token,
+            timeout=timeout,
+            client=client,
+        )
+        _cache_access_token(cache_key, oauth_access_token_response, expiry_skew_seconds, token_store)
+
+    return oauth_access_token_response
+
+
+class AsyncOAuthAPIClient(httpx.AsyncClient):
+    """
+    An :class:`httpx.AsyncClient` that automatically authenticates against edX's preferred
+    authentication method, given a client id and client secret. It behaves like
+    :class:`~edx_rest_api_client.client.OAuthAPIClient`, but for use with asyncio.
+
+    Usage example::
+
+        async with AsyncOAuthAPIClient(
+            settings.BACKEND_SERVICE_EDX_OAUTH2_PROVIDER_URL,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_KEY,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_SECRET,
+        ) as client:
+            response = await client.get(
+                settings.EXAMPLE_API_SERVICE_URL + 'example/',
+                params={'username': user.username},
+                timeout=httpx.Timeout(0.5, connect=3.1), # Always set a timeout.
+            )
+            response.raise_for_status()  # could be an error response
+            response_data = response.json()
+
+    Note that the ``timeout`` argument of the constructor applies to access token requests, like
+    it does for ``OAuthAPIClient``, rather than being the default timeout of the httpx client.
+
+    Note: Access tokens are cached in the ``token_store``. By default, that is the ``TieredCache`` when Django
+    is configured, which requires its middleware, and otherwise a ``MemoryTokenStore`` in the memory of the
+    process, so the client can be used without Django. See ``edx_rest_api_client.token_store``, and
+    https://github.com/openedx/edx-django-utils/blob/master/edx_django_utils/cache/README.rst#tieredcache
+
+    """
+
+    # See OAuthAPIClient.oauth_uri
+    oauth_uri = None
+
+    def __init__(self, base_url, client_id, client_secret,
+                 timeout=(REQUEST_CONNECT_TIMEOUT, REQUEST_READ_TIMEOUT),
+                 expiry_skew_seconds=ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS,
+                 token_store=None,
+                 **kwargs):
+        """
+        Args:
+            base_url (str): base url of the LMS oauth endpoint, which can optionally include the path `/oauth2`.
+            client_id (str): Client ID
+            client_secret (str): Client secret
+            timeout (tuple(float,float)): Requests timeout parameter for access token requests.
+            expiry_skew_seconds (float): How long before their expiration access tokens are replaced.
+            token_store: Where to cache access tokens. See ``get_and_cache_oauth_access_token``.
+
+        Any other keyword arguments are passed on to :class:`httpx.AsyncClient`.
+        """
+        super().__init__(**kwargs)
+        self.headers['user-agent'] = get_user_agent()
+        # httpx wraps callable auth objects, so keep a reference to set the token on.
+        self._jwt_auth = SuppliedJwtAuth(None)
+        self.auth = self._jwt_auth
+
+        # httpx.AsyncClient already uses _base_url and _timeout for its own settings.
+        self._oauth_base_url = base_url.rstrip('/')
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self._token_timeout = timeout
+        self._expiry_skew_seconds = expiry_skew_seconds
+        self._token_store = token_store
+        # Token requests go through their own client, so that they don't pass through send() below.
+        self._token_client = httpx.AsyncClient(transport=kwargs.get('transport'))
+        # See OAuthAPIClient._token_memo
+        self._token_memo = None
+
+    async def _ensure_authentication(self):
+        """
+        Ensures that the client's JWT auth token is set with an unexpired token.
+
+        Raises:
+            httpx.HTTPError if there is a problem retrieving the access token.
+
+        """
+        token_memo = self._token_memo
+        if token_memo is not None and time.monotonic() < token_memo[1]:
+            return
+
+        oauth_url = self._oauth_base_url if not self.oauth_uri else self._oauth_base_url + self.oauth_uri
+        access_token = await get_and_cache_oauth_access_token_async(
+            oauth_url,
+            self._client_id,
+            self._client_secret,
+            grant_type='client_credentials',
+            timeout=self._token_timeout,
+            client=self._token_client,
+            expiry_skew_seconds=self._expiry_skew_seconds,
+            token_store=self._token_store,
+        )
+
+        self._jwt_auth.token = access_token.access_token
+        self._token_memo = (
+            access_token.access_token,
+            access_token.monotonic_deadline - access_token.get_expiry_skew(self._expiry_skew_seconds),
+        )
+
+    def invalidate_token(self):
+        """
+        Forgets the access token held by this client, so the next request looks it up in the token cache again.
+        """
+        self._token_memo = None
+
+    async def get_jwt_access_token(self):
+        """
+        Returns the JWT access token that will be used to make authenticated calls.
+
+        See ``OAuthAPIClient.get_jwt_access_token``.
+        """
+        await self._ensure_authentication()
+        return self._jwt_auth.token
+
+    async def send(self, request, **kwargs):
+        """
+        Overrides AsyncClient.send to ensure that the client is authenticated.
+
+        Note: Typically, users of the client won't call this directly, but will
+        instead use AsyncClient.get or AsyncClient.post.
+
+        """
+        request_id = get_request_id()
+        if request.headers.get('X-Request-ID') is None and request_id is not None:
+            request.headers['X-Request-ID'] = request_id
+        set_custom_attribute('api_client', 'AsyncOAuthAPIClient')
+        await self._ensure_authentication()
+        return await super().send(request, **kwargs)
+
+    async def aclose(self):
+        await self._token_client.aclose()
+        await super().aclose()
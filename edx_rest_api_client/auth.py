@@ -1,9 +1,10 @@
 import datetime
 
 import jwt
-from edx_django_utils.monitoring import set_custom_attribute
 from requests.auth import AuthBase
 
+from edx_rest_api_client.django_support import set_custom_attribute
+
 
 # pylint: disable=line-too-long
 class JwtAuth(AuthBase):
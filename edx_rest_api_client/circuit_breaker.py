@@ -0,0 +1,170 @@
+"""
+A circuit breaker that stops ``OAuthAPIClient`` from calling upstream hosts that keep failing.
+"""
+import collections
+import threading
+import time
+
+import requests
+
+from edx_rest_api_client.exceptions import CircuitOpenError
+
+
+class _HostCircuit:
+    """
+    The state of the circuit for a single host.
+    """
+
+    def __init__(self, window_size):
+        self.state = CircuitBreaker.CLOSED
+        # Outcomes of the most recent calls, True for failures.
+        self.outcomes = collections.deque(maxlen=window_size)
+        self.opened_at = None
+        self.trial_calls = 0
+
+
+class CircuitBreaker:
+    """
+    Tracks the failure rate of calls to each upstream host, and fails calls fast while a host is unhealthy.
+
+    Each host's circuit starts closed, letting calls through. Once at least ``minimum_calls`` of the
+    last ``window_size`` calls were made and ``failure_rate_threshold`` of them failed, the circuit
+    opens and calls raise :class:`~edx_rest_api_client.exceptions.CircuitOpenError` without being
+    made. After ``cooldown_seconds``, the circuit becomes half-open and lets ``half_open_max_calls``
+    trial calls through: if they succeed the circuit closes again, otherwise it reopens.
+
+    Calls fail if they raise a connection error or timeout, or return a status in ``failure_statuses``.
+
+    Usage example::
+
+        client = OAuthAPIClient(
+            settings.BACKEND_SERVICE_EDX_OAUTH2_PROVIDER_URL,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_KEY,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_SECRET,
+            circuit_breaker=CircuitBreaker(failure_rate_threshold=0.5, cooldown_seconds=30),
+        )
+
+    A single breaker can be shared by several clients, to share what they know about each host.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    DEFAULT_FAILURE_STATUSES = frozenset([500, 502, 503, 504])
+
+    def __init__(self, failure_rate_threshold=0.5, minimum_calls=10, window_size=20, cooldown_seconds=30,
+                 half_open_max_calls=1, failure_statuses=DEFAULT_FAILURE_STATUSES):
+        """
+        Args:
+            failure_rate_threshold (float): Fraction of failed calls, between 0 and 1, that opens the circuit.
+            minimum_calls (int): Number of calls that must be recorded before the circuit can open.
+            window_size (int): Number of most recent calls used to compute the failure rate.
+            cooldown_seconds (float): How long the circuit stays open before allowing trial calls.
+            half_open_max_calls (int): Number of trial calls allowed at once while half-open.
+            failure_statuses (iterable(int)): Response status codes that count as failures.
+
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.window_size = window_size
+        self.cooldown_seconds = cooldown_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.failure_statuses = frozenset(failure_statuses)
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _get_circuit(self, host):
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = self._circuits[host] = _HostCircuit(self.window_size)
+        return circuit
+
+    def get_state(self, host):
+        """
+        Returns the state of the circuit for ``host``, one of CLOSED, OPEN or HALF_OPEN.
+        """
+        with self._lock:
+            circuit = self._get_circuit(host)
+            if circuit.state == self.OPEN and time.monotonic() - circuit.opened_at >= self.cooldown_seconds:
+                return self.HALF_OPEN
+            return circuit.state
+
+    def before_call(self, host):
+        """
+        Checks whether a call to ``host`` may be made.
+
+        Raises:
+            CircuitOpenError if the circuit for ``host`` is open, or half-open with all trial calls in use.
+
+        Returns:
+            str: The state of the circuit for ``host``.
+
+        """
+        with self._lock:
+            circuit = self._get_circuit(host)
+            if circuit.state == self.OPEN:
+                if time.monotonic() - circuit.opened_at < self.cooldown_seconds:
+                    raise CircuitOpenError(host)
+                circuit.state = self.HALF_OPEN
+                circuit.trial_calls = 0
+            if circuit.state == self.HALF_OPEN:
+                if circuit.trial_calls >= self.half_open_max_calls:
+                    raise CircuitOpenError(host)
+                circuit.trial_calls += 1
+            return circuit.state
+
+    def record_success(self, host):
+        with self._lock:
+            circuit = self._get_circuit(host)
+            if circuit.state == self.HALF_OPEN:
+                circuit.state = self.CLOSED
+                circuit.outcomes.clear()
+            circuit.outcomes.append(False)
+
+    def record_failure(self, host):
+        with self._lock:
+            circuit = self._get_circuit(host)
+            circuit.outcomes.append(True)
+            if circuit.state == self.HALF_OPEN or self._is_failure_rate_exceeded(circuit):
+                circuit.state = self.OPEN
+                circuit.opened_at = time.monotonic()
+
+    def _is_failure_rate_exceeded(self, circuit):
+        calls = len(circuit.outcomes)
+        return calls >= self.minimum_calls and sum(circuit.outcomes) / calls >= self.failure_rate_threshold
+
+    def call(self, host, send):
+        """
+        Makes a call to ``host`` with ``send`` if the circuit allows it, and records the outcome.
+
+        Raises:
+            CircuitOpenError if the circuit for ``host`` doesn't allow the call.
+
+        Returns:
+            requests.Response: The response returned by ``send``.
+
+        """
+        self.before_call(host)
+        try:
+            response = send()
+        except (requests.ConnectionError, requests.Timeout):
+            self.record_failure(host)
+            raise
+        except BaseException:
+            # Other errors, such as invalid URLs, say nothing about the health of the host. Release
+            # the trial call, if this was one, without changing the state of the circuit.
+            self._release_trial_call(host)
+            raise
+
+        if response.status_code in self.failure_statuses:
+            self.record_failure(host)
+        else:
+            self.record_success(host)
+        return response
+
+    def _release_trial_call(self, host):
+        with self._lock:
+            circuit = self._get_circuit(host)
+            if circuit.state == self.HALF_OPEN and circuit.trial_calls > 0:
+                circuit.trial_calls -= 1
@@ -1,19 +1,45 @@
+import collections
 import datetime
+import functools
+import gzip
+import http.cookiejar
 import json
+import logging
 import socket
 import os
+import re
+import string
+import threading
+import time
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urljoin, urlsplit
 
-import crum
 import requests
+import requests.adapters
+import requests.cookies
+import requests.models
+import requests.sessions
+import requests.structures
 import requests.utils
-from edx_django_utils.cache import TieredCache
-from edx_django_utils.monitoring import set_custom_attribute
+import urllib3.response
 
 from edx_rest_api_client.__version__ import __version__
-from edx_rest_api_client.auth import SuppliedJwtAuth
+from edx_rest_api_client.access_token import AccessToken
+from edx_rest_api_client.auth import BearerAuth, SuppliedJwtAuth
+from edx_rest_api_client.django_support import get_django_cache, set_custom_attribute
+from edx_rest_api_client.exceptions import CircuitOpenError
+from edx_rest_api_client.instrumentation import TOKEN_CACHE_HIT, TOKEN_CACHE_MISS, TOKEN_MEMO, RequestTimings
+from edx_rest_api_client.json_utils import decode_response, iter_json_items
+from edx_rest_api_client.propagation import (DEFAULT_PROPAGATED_HEADERS, NO_HEADERS, get_propagated_headers,
+                                             get_propagation_context)
+from edx_rest_api_client.token_store import get_default_token_store
+
+log = logging.getLogger(__name__)
 
 # When caching tokens, use this value to err on expiring tokens a little early so they are
-# sure to be valid at the time they are used.
+# sure to be valid at the time they are used. It is the default ``expiry_skew_seconds``.
 ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS = 5
 
 # How long should we wait to connect to the auth service.
@@ -21,6 +47,40 @@ ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS = 5
 REQUEST_CONNECT_TIMEOUT = 3.05
 REQUEST_READ_TIMEOUT = 5
 
+# When a token lease is used, this is how long a single process may hold the right to fetch a
+# new token before other processes give up waiting and fetch one themselves. It should be
+# longer than the total timeout of a token request.
+TOKEN_LEASE_TIMEOUT_SECONDS = 10
+# How often processes waiting on another process's token lease check the cache for the new token.
+TOKEN_LEASE_POLL_INTERVAL_SECONDS = 0.1
+
+# When a background token refresh fails, wait at most this long before trying again.
+TOKEN_REFRESH_RETRY_SECONDS = 30
+
+# When an API rejects an access token with a 401, the token is dropped from the token cache and a new one
+# is fetched, at most once in this interval per token in each process. This keeps a service that rejects
+# every token, for example because the client lacks permissions, from causing a storm of token requests.
+TOKEN_INVALIDATION_INTERVAL_SECONDS = 30
+
+# The auth class that ``OAuthAPIClient`` uses to send each type of access token.
+TOKEN_AUTH_CLASSES = {
+    'jwt': SuppliedJwtAuth,
+    'bearer': BearerAuth,
+}
+
+# A session shared by all access token requests in a process, so that they reuse pooled connections
+# to the auth service instead of making a new TCP/TLS connection every time.
+_token_session = None
+_token_session_lock = threading.Lock()
+
+# Serializes access token fetches per cache key within this process, so that concurrent cache
+# misses for the same token result in a single request to the auth service.
+_TOKEN_FETCH_LOCKS = {}
+_TOKEN_FETCH_LOCKS_GUARD = threading.Lock()
+# When tokens were last dropped from the token cache after being rejected, by cache key. Guarded by
+# the token fetch lock of each key.
+_TOKEN_INVALIDATION_TIMES = {}
+
 
 def user_agent():
     """
@@ -35,7 +95,8 @@ def user_agent():
     """
     client_name = 'unknown_client_name'
     try:
-        client_name = os.environ.get("EDX_REST_API_CLIENT_NAME") or socket.gethostbyname(socket.gethostname())
+        # Only the local hostname is used, because resolving it through DNS can block for a long time.
+        client_name = os.environ.get("EDX_REST_API_CLIENT_NAME") or socket.gethostname()
     except:  # pylint: disable=bare-except
         pass  # using 'unknown_client_name' is good enough.  no need to log.
     return "{} edx-rest-api-client/{} {}".format(
@@ -45,7 +106,21 @@ def user_agent():
     )
 
 
-USER_AGENT = user_agent()
+@functools.lru_cache(maxsize=None)
+def get_user_agent():
+    """
+    Return the User-Agent of this client, computing it on first use. See ``user_agent``.
+    """
+    return user_agent()
+
+
+def __getattr__(name):
+    """
+    Computes USER_AGENT when it is first accessed, rather than when this module is imported.
+    """
+    if name == 'USER_AGENT':
+        return get_user_agent()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def _get_oauth_url(url):
@@ -69,20 +144,54 @@ def _get_oauth_url(url):
     return stripped_url + '/oauth2/access_token'
 
 
+def _get_token_session():
+    """
+    Returns the session used for access token requests, creating it on first use.
+    """
+    global _token_session
+    with _token_session_lock:
+        if _token_session is None:
+            session = requests.Session()
+            # The session is shared by every client in the process, so it must not pass cookies from one to another.
+            session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+            session.headers['User-Agent'] = get_user_agent()
+            _token_session = session
+        return _token_session
+
+
+def _reset_token_session():
+    """
+    Drops the shared token session, so that a forked process doesn't reuse its parent's connections.
+    """
+    global _token_session, _token_session_lock
+    _token_session = None
+    _token_session_lock = threading.Lock()
+
+
+def _reset_token_fetch_locks():
+    """
+    Replaces the token fetch locks, which a forked process inherits locked if another thread held them.
+    """
+    global _TOKEN_FETCH_LOCKS, _TOKEN_FETCH_LOCKS_GUARD
+    _TOKEN_FETCH_LOCKS = {}
+    _TOKEN_FETCH_LOCKS_GUARD = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_token_session)
+os.register_at_fork(after_in_child=_reset_token_fetch_locks)
+
+
 def get_request_id():
     """
     Helper to get the request id - usually set via an X-Request-ID header
     """
-    request = crum.get_current_request()
-    if request is not None and request.headers is not None:
-        return request.headers.get('X-Request-ID')
-    else:
-        return None
+    return get_propagated_headers().get('X-Request-ID')
 
 
 def get_oauth_access_token(url, client_id, client_secret, token_type='jwt', grant_type='client_credentials',
                            refresh_token=None,
-                           timeout=(REQUEST_CONNECT_TIMEOUT, REQUEST_READ_TIMEOUT)):
+                           timeout=(REQUEST_CONNECT_TIMEOUT, REQUEST_READ_TIMEOUT),
+                           retry=None):
     """
     Retrieves OAuth 2.0 access token using the given grant type.
 
@@ -94,51 +203,66 @@ def get_oauth_access_token(url, client_id, client_secret, token_type='jwt', gran
         token_type (str): Type of token to return. Options include bearer and jwt.
         grant_type (str): One of 'client_credentials' or 'refresh_token'
         refresh_token (str): The previous access token (for grant_type=refresh_token)
+        retry (RetryPolicy): If set, how to retry failed token requests.
 
     Raises:
         requests.RequestException if there is a problem retrieving the access token.
 
     Returns:
-        tuple: Tuple containing (access token string, expiration datetime).
+        AccessToken: Tuple containing (access token string, expiration datetime). The expiration is
+        the earlier of ``expires_in`` and the ``exp`` claim of JWT access tokens.
 
     """
-    now = datetime.datetime.utcnow()
-    data = {
-        'grant_type': grant_type,
-        'client_id': client_id,
-        'client_secret': client_secret,
-        'token_type': token_type,
-    }
-    if refresh_token:
-        data['refresh_token'] = refresh_token
-    else:
-        assert grant_type != 'refresh_token', "refresh_token parameter required"
+    requested_at = datetime.datetime.utcnow()
+    requested_at_monotonic = time.monotonic()
+    data = _get_access_token_request_data(client_id, client_secret, token_type, grant_type, refresh_token)
 
-    response = requests.post(
-        _get_oauth_url(url),
-        data=data,
-        headers={
-            'User-Agent': USER_AGENT,
-        },
-        timeout=timeout
-    )
+    def send():
+        return _get_token_session().post(
+            _get_oauth_url(url),
+            data=data,
+            timeout=timeout
+        )
+
+    if retry is None:
+        response = send()
+    else:
+        # Requesting another token has no side effects, so the POST is safe to retry.
+        response = retry.call(send, 'POST', always_retryable=True, monitoring_attribute='api_client_token_retries')
 
     response.raise_for_status()  # Raise an exception for bad status codes.
     try:
-        data = response.json()
+        data = decode_response(response)
         access_token = data['access_token']
         expires_in = data['expires_in']
     except (KeyError, json.decoder.JSONDecodeError) as json_error:
         raise requests.RequestException(response=response) from json_error
 
-    expires_at = now + datetime.timedelta(seconds=expires_in)
+    return AccessToken.from_expires_in(access_token, expires_in, requested_at, requested_at_monotonic)
 
-    return access_token, expires_at
+
+def _get_access_token_request_data(client_id, client_secret, token_type, grant_type, refresh_token):
+    """
+    Returns the form data for a request to the OAuth 2.0 access token endpoint.
+    """
+    data = {
+        'grant_type': grant_type,
+        'client_id': client_id,
+        'client_secret': client_secret,
+        'token_type': token_type,
+    }
+    if refresh_token:
+        data['refresh_token'] = refresh_token
+    else:
+        assert grant_type != 'refresh_token', "refresh_token parameter required"
+    return data
 
 
 def get_and_cache_oauth_access_token(url, client_id, client_secret, token_type='jwt', grant_type='client_credentials',
                                      refresh_token=None,
-                                     timeout=(REQUEST_CONNECT_TIMEOUT, REQUEST_READ_TIMEOUT)):
+                                     timeout=(REQUEST_CONNECT_TIMEOUT, REQUEST_READ_TIMEOUT),
+                                     use_token_lease=False, refresh_ahead_seconds=None, retry=None, token_broker=None,
+                                     expiry_skew_seconds=ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS, token_store=None):
     """
     Retrieves a possibly cached OAuth 2.0 access token using the given grant type.
 
@@ -148,46 +272,657 @@ def get_and_cache_oauth_access_token(url, client_id, client_secret, token_type='
     the access token either wasn't found in the cache, or was expired, retrieves a new
     access token and caches it for the lifetime of the token.
 
-    Note: Consider tokens to be expired ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS early
-    to ensure the token won't expire while it is in use.
+    Note: Consider tokens to be expired ``expiry_skew_seconds`` early to ensure the token
+    won't expire while it is in use.
+
+    Concurrent cache misses for the same token within a process are coalesced, so that only
+    one thread requests a new token while the others wait for its result.
+
+    Kwargs:
+        use_token_lease (bool): If True, also coalesce cache misses across processes by taking
+            a lease in the Django cache before requesting a new token. Processes that fail to
+            get the lease wait up to TOKEN_LEASE_TIMEOUT_SECONDS for the holder to cache the token.
+        refresh_ahead_seconds (float): If set, treat a cached token that expires within this many
+            seconds as expired, so that a new token is fetched ahead of expiry.
+        retry (RetryPolicy): If set, how to retry failed token requests.
+        token_broker (FileTokenBroker): If set, used to share tokens between the processes of a host,
+            so that only one of them requests a new token. This happens before taking the token lease,
+            so it works even when the Django cache isn't shared or available.
+        expiry_skew_seconds (float): How long before their expiration tokens are treated as expired,
+            to allow for the time taken to use them and for clock differences with the auth service.
+            At most half the lifetime of the token is used, so that short-lived tokens are still reused.
+        token_store: Where to cache tokens, like a ``MemoryTokenStore``, ``TieredCacheTokenStore`` or
+            ``FileTokenStore``. See ``edx_rest_api_client.token_store``. Defaults to the ``TieredCache`` when
+            Django is configured, and to the memory of the process otherwise.
+
+    Returns:
+        AccessToken: Tuple containing (access token string, expiration datetime).
+
+    """
+    return _get_or_fetch_access_token(
+        url, client_id, client_secret, token_type, grant_type, refresh_token, timeout,
+        use_token_lease, refresh_ahead_seconds, retry, token_broker, expiry_skew_seconds, token_store,
+    )[0]
+
+
+def _get_or_fetch_access_token(url, client_id, client_secret, token_type, grant_type, refresh_token, timeout,
+                               use_token_lease, refresh_ahead_seconds, retry, token_broker=None,
+                               expiry_skew_seconds=ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS, token_store=None):
+    """
+    Implements ``get_and_cache_oauth_access_token``.
 
     Returns:
-        tuple: Tuple containing (access token string, expiration datetime).
+        tuple: Tuple containing the AccessToken, and TOKEN_CACHE_HIT or TOKEN_CACHE_MISS depending
+        on whether the token had to be fetched.
 
     """
     oauth_url = _get_oauth_url(url)
-    cache_key = 'edx_rest_api_client.access_token.{}.{}.{}.{}'.format(
+    cache_key = _get_token_cache_key(token_type, grant_type, client_id, oauth_url)
+
+    min_remaining_seconds = refresh_ahead_seconds or 0
+    if token_store is None:
+        token_store = get_default_token_store()
+
+    # Attempt to get an unexpired cached access token
+    cached_token = _get_cached_access_token(cache_key, min_remaining_seconds, token_store, expiry_skew_seconds)
+    if cached_token is not None:
+        return cached_token, TOKEN_CACHE_HIT
+
+    # Only one thread per process fetches a given token. Threads that were waiting on the lock
+    # will usually find the freshly cached token once they acquire it.
+    with _get_token_fetch_lock(cache_key):
+        cached_token = _get_cached_access_token(cache_key, min_remaining_seconds, token_store, expiry_skew_seconds)
+        if cached_token is not None:
+            return cached_token, TOKEN_CACHE_HIT
+
+        def fetch_access_token():
+            return _fetch_and_cache_access_token(
+                cache_key, oauth_url, client_id, client_secret, token_type, grant_type, refresh_token, timeout,
+                use_token_lease, min_remaining_seconds, retry, expiry_skew_seconds, token_store,
+            )
+
+        # Stores shared between processes, like FileTokenStore, let only one of them fetch the token.
+        if hasattr(token_store, 'lock'):
+            with token_store.lock(cache_key):
+                cached_token = _get_cached_access_token(
+                    cache_key, min_remaining_seconds, token_store, expiry_skew_seconds,
+                )
+                if cached_token is not None:
+                    return cached_token, TOKEN_CACHE_HIT
+                return fetch_access_token()
+
+        if token_broker is None:
+            return fetch_access_token()
+
+        # Another process on this host may already have the token. If not, only the process
+        # holding the broker's lock fetches it, and the others find it once they get the lock.
+        brokered_token = _get_cached_access_token(cache_key, min_remaining_seconds, token_broker, expiry_skew_seconds)
+        if brokered_token is None:
+            with token_broker.lock(cache_key):
+                brokered_token = _get_cached_access_token(
+                    cache_key, min_remaining_seconds, token_broker, expiry_skew_seconds,
+                )
+                if brokered_token is None:
+                    oauth_access_token_response, token_cache = fetch_access_token()
+                    token_broker.set(cache_key, oauth_access_token_response)
+                    return oauth_access_token_response, token_cache
+
+        _cache_access_token(cache_key, brokered_token, expiry_skew_seconds, token_store)
+        return brokered_token, TOKEN_CACHE_HIT
+
+
+def _fetch_and_cache_access_token(cache_key, oauth_url, client_id, client_secret, token_type, grant_type,
+                                  refresh_token, timeout, use_token_lease, min_remaining_seconds, retry,
+                                  expiry_skew_seconds, token_store):
+    """
+    Requests a new access token and caches it, or waits for another process holding the token lease to cache it.
+
+    Returns:
+        tuple: The AccessToken, and TOKEN_CACHE_HIT or TOKEN_CACHE_MISS.
+
+    """
+    lease = None
+    if use_token_lease:
+        lease = _acquire_token_lease(cache_key)
+        if lease is None:
+            # Another process is fetching this token; wait for it to show up in the cache.
+            cached_token = _wait_for_cached_access_token(
+                cache_key, min_remaining_seconds, token_store, expiry_skew_seconds,
+            )
+            if cached_token is not None:
+                return cached_token, TOKEN_CACHE_HIT
+
+    try:
+        # Get a new access token if no unexpired access token was found in the cache.
+        oauth_access_token_response = get_oauth_access_token(
+            oauth_url,
+            client_id,
+            client_secret,
+            token_type=token_type,
+            grant_type=grant_type,
+            refresh_token=refresh_token,
+            timeout=timeout,
+            retry=retry,
+        )
+
+        _cache_access_token(cache_key, oauth_access_token_response, expiry_skew_seconds, token_store)
+    finally:
+        if lease is not None:
+            _release_token_lease(cache_key, lease)
+
+    return oauth_access_token_response, TOKEN_CACHE_MISS
+
+
+def _get_token_cache_key(token_type, grant_type, client_id, oauth_url):
+    return 'edx_rest_api_client.access_token.{}.{}.{}.{}'.format(
         token_type,
         grant_type,
         client_id,
         oauth_url,
     )
-    cached_response = TieredCache.get_cached_response(cache_key)
 
-    # Attempt to get an unexpired cached access token
-    if cached_response.is_found:
-        _, expiration = cached_response.value
-        # Double-check the token hasn't already expired as a safety net.
-        adjusted_expiration = expiration - datetime.timedelta(seconds=ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS)
-        if datetime.datetime.utcnow() < adjusted_expiration:
-            return cached_response.value
-
-    # Get a new access token if no unexpired access token was found in the cache.
-    oauth_access_token_response = get_oauth_access_token(
-        oauth_url,
-        client_id,
-        client_secret,
-        grant_type=grant_type,
-        refresh_token=refresh_token,
-        timeout=timeout,
+
+def _cache_access_token(cache_key, oauth_access_token_response,
+                        expiry_skew_seconds=ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS, token_store=None):
+    """
+    Caches the new access token in ``token_store`` with an expiration matching the lifetime of the token.
+
+    Tokens that expire within their expiry skew are not cached. See ``AccessToken.get_expiry_skew``.
+    """
+    access_token = AccessToken.from_tuple(oauth_access_token_response)
+    expires_in = int(access_token.remaining_seconds() - access_token.get_expiry_skew(expiry_skew_seconds))
+    if expires_in <= 0:
+        return
+    if token_store is None:
+        token_store = get_default_token_store()
+    # The cache holds a plain tuple, which processes running other versions of this library can read.
+    token_store.set(cache_key, tuple(access_token), expires_in)
+
+
+def _get_cached_access_token(cache_key, min_remaining_seconds=ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS,
+                             token_store=None, expiry_skew_seconds=None):
+    """
+    Returns the AccessToken cached in ``token_store`` for ``cache_key``, or None if there is no cached
+    token or it expires within ``min_remaining_seconds``, or within its expiry skew if ``expiry_skew_seconds``
+    is given. See ``AccessToken.get_expiry_skew``.
+    """
+    if token_store is None:
+        token_store = get_default_token_store()
+    cached_value = token_store.get(cache_key)
+    if cached_value is None:
+        return None
+    # Double-check the token hasn't already expired as a safety net.
+    cached_token = AccessToken.from_tuple(cached_value)
+    if expiry_skew_seconds is not None:
+        min_remaining_seconds = max(min_remaining_seconds, cached_token.get_expiry_skew(expiry_skew_seconds))
+    return cached_token if cached_token.is_valid(min_remaining_seconds) else None
+
+
+def _get_token_fetch_lock(cache_key):
+    """
+    Returns the in-process lock guarding token fetches for ``cache_key``.
+    """
+    with _TOKEN_FETCH_LOCKS_GUARD:
+        return _TOKEN_FETCH_LOCKS.setdefault(cache_key, threading.Lock())
+
+
+def _get_token_lease_key(cache_key):
+    return cache_key + '.lease'
+
+
+def _acquire_token_lease(cache_key):
+    """
+    Attempts to take the cross-process lease for fetching the token stored at ``cache_key``.
+
+    The lease is stored in the Django cache, which is shared between processes.
+
+    Returns:
+        str: A value identifying this lease holder if the lease was acquired, otherwise None.
+
+    """
+    django_cache = get_django_cache()
+    lease = uuid.uuid4().hex
+    if django_cache.add(_get_token_lease_key(cache_key), lease, TOKEN_LEASE_TIMEOUT_SECONDS):
+        return lease
+    return None
+
+
+def _release_token_lease(cache_key, lease):
+    """
+    Releases the cross-process token lease, if it is still held by ``lease``.
+    """
+    django_cache = get_django_cache()
+    lease_key = _get_token_lease_key(cache_key)
+    if django_cache.get(lease_key) == lease:
+        django_cache.delete(lease_key)
+
+
+def _wait_for_cached_access_token(cache_key, min_remaining_seconds, token_store, expiry_skew_seconds=None):
+    """
+    Waits for another process holding the token lease to cache a new token.
+
+    Returns:
+        AccessToken: The cached token, or None if the lease was released
+        or expired without a token being cached.
+
+    """
+    django_cache = get_django_cache()
+    lease_key = _get_token_lease_key(cache_key)
+    deadline = time.monotonic() + TOKEN_LEASE_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(TOKEN_LEASE_POLL_INTERVAL_SECONDS)
+        cached_token = _get_cached_access_token(cache_key, min_remaining_seconds, token_store, expiry_skew_seconds)
+        if cached_token is not None:
+            return cached_token
+        if django_cache.get(lease_key) is None:
+            break
+    return None
+
+
+# Methods whose identical concurrent requests may share a single response when coalescing requests.
+COALESCED_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+# Request arguments that don't prevent coalescing. Others, like auth, cookies or a body, could make
+# otherwise identical requests get different responses.
+_COALESCABLE_KWARGS = frozenset(['params', 'timeout', 'allow_redirects', 'token_type'])
+# Request arguments that send another identity than the client's, so that the responses must not be cached
+# under its client id.
+_UNCACHEABLE_KWARGS = frozenset(['auth', 'cookies'])
+
+# Methods whose request bodies may be compressed. Servers rarely expect bodies on the others.
+COMPRESSED_METHODS = frozenset(['PATCH', 'POST', 'PUT'])
+# gzip level used to compress request bodies, which trades a little size for much faster compression than 9.
+REQUEST_COMPRESSION_LEVEL = 6
+
+# Number of bytes read and written at a time by ``download_to`` and ``upload_from``.
+TRANSFER_CHUNK_SIZE = 1024 * 1024
+# Before starting a transfer, ``download_to`` and ``upload_from`` make sure that the access token remains
+# valid for at least this long, so that it doesn't expire while a large body is being sent.
+TRANSFER_MIN_TOKEN_SECONDS = 300
+# How many times ``download_to`` continues a resumable download after its connection breaks.
+DOWNLOAD_MAX_RESUMES = 3
+
+# Placeholder for the fields of ``OAuthAPIClient.endpoint`` URL templates while the templates are prepared.
+# It only has characters that are left as they are in URLs.
+_URL_FIELD_MARKER = 'edxrestapiclientfield{}x'
+# Characters left unescaped in the values of URL template fields, which can't add path segments or query parameters.
+_URL_PATH_SAFE_CHARACTERS = "!$&'()*+,;=:@"
+_URL_QUERY_SAFE_CHARACTERS = "!$'()*,:;@/?"
+# Arguments of ``Endpoint`` calls, which can't be the names of URL template fields.
+_ENDPOINT_CALL_ARGUMENTS = frozenset([
+    'self', 'params', 'data', 'json', 'files', 'headers', 'timeout', 'stream', 'allow_redirects',
+])
+
+# The outcome of one call made by ``OAuthAPIClient.batch``. Exactly one of response and exception is set.
+BatchResult = collections.namedtuple('BatchResult', ['response', 'exception'])
+
+
+class _InFlightRequest:
+    """
+    A request being made on behalf of several callers, when coalescing requests.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.exception = None
+
+
+def _copy_response(response):
+    """
+    Returns a copy of ``response``, whose body has already been read, that can be used independently.
+    """
+    response_copy = requests.Response()
+    response_copy.status_code = response.status_code
+    response_copy.reason = response.reason
+    response_copy.url = response.url
+    response_copy.encoding = response.encoding
+    response_copy.headers = requests.structures.CaseInsensitiveDict(response.headers)
+    response_copy.history = list(response.history)
+    response_copy.elapsed = response.elapsed
+    response_copy.request = response.request
+    response_copy.cookies = response.cookies.copy()
+    response_copy._content = response.content  # pylint: disable=protected-access
+    response_copy._content_consumed = True  # pylint: disable=protected-access
+    return response_copy
+
+
+def get_supported_content_encodings():
+    """
+    Returns the response content encodings that can be decoded, in order of preference.
+
+    brotli (``br``) and ``zstd`` are only supported when the brotli or zstandard package is installed.
+    """
+    decoders = urllib3.response.HTTPResponse.CONTENT_DECODERS
+    return [encoding for encoding in ('zstd', 'br', 'gzip', 'deflate') if encoding in decoders]
+
+
+def _compress_request_body(request, threshold):
+    """
+    Gzips the body of the prepared ``request`` if it is at least ``threshold`` bytes.
+
+    Streamed bodies, bodies that are already encoded, and bodies that don't get smaller are sent as they are.
+    """
+    body = request.body
+    if request.method not in COMPRESSED_METHODS or 'Content-Encoding' in request.headers:
+        return
+    if isinstance(body, str):
+        try:
+            # http.client would send the str encoded as ISO-8859-1.
+            body = body.encode('iso-8859-1')
+        except UnicodeEncodeError:
+            return
+    if not isinstance(body, bytes) or len(body) < threshold:
+        return
+
+    compressed_body = gzip.compress(body, compresslevel=REQUEST_COMPRESSION_LEVEL, mtime=0)
+    if len(compressed_body) >= len(body):
+        return
+    request.body = compressed_body
+    request.headers['Content-Encoding'] = 'gzip'
+    request.headers['Content-Length'] = str(len(compressed_body))
+
+
+def _is_replayable_body(data, files):
+    """
+    Returns whether a request with the given ``data`` and ``files`` can be sent more than once.
+
+    Bodies read from files or iterators are consumed by the first request.
+    """
+    if files:
+        return False
+    return data is None or isinstance(data, (bytes, str, dict, list, tuple))
+
+
+def _get_content_range(response):
+    """
+    Returns the first byte position and complete length from the ``Content-Range`` header of ``response``.
+
+    Either may be None, for example for the ``bytes */1234`` of a 416 response.
+    """
+    match = re.match(r'bytes\s+(?:(\d+)-\d+|\*)/(\d+|\*)', response.headers.get('Content-Range', ''))
+    if match is None:
+        return None, None
+    first_byte, complete_length = match.groups()
+    return (
+        int(first_byte) if first_byte is not None else None,
+        int(complete_length) if complete_length != '*' else None,
     )
 
-    # Cache the new access token with an expiration matching the lifetime of the token.
-    _, expiration = oauth_access_token_response
-    expires_in = (expiration - datetime.datetime.utcnow()).seconds - ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS
-    TieredCache.set_all_tiers(cache_key, oauth_access_token_response, expires_in)
 
-    return oauth_access_token_response
+def _iter_file_chunks(file, chunk_size):
+    return iter(functools.partial(file.read, chunk_size), b'')
+
+
+def _quote_form_value(value):
+    """
+    Escapes a name or filename for a multipart/form-data header, the way browsers do.
+    """
+    return value.replace('\r', '%0D').replace('\n', '%0A').replace('"', '%22')
+
+
+def _iter_multipart_body(boundary, fields, field_name, filename, content_type, chunks):
+    """
+    Yields a multipart/form-data body with the given form ``fields`` and a file made of ``chunks``.
+    """
+    for name, value in fields.items():
+        yield '--{}\r\nContent-Disposition: form-data; name="{}"\r\n\r\n{}\r\n'.format(
+            boundary, _quote_form_value(name), value,
+        ).encode('utf-8')
+    yield '--{}\r\nContent-Disposition: form-data; name="{}"; filename="{}"\r\nContent-Type: {}\r\n\r\n'.format(
+        boundary, _quote_form_value(field_name), _quote_form_value(filename), content_type,
+    ).encode('utf-8')
+    yield from chunks
+    yield '\r\n--{}--\r\n'.format(boundary).encode('utf-8')
+
+
+def _merge_propagated_headers(propagated_headers, headers):
+    """
+    Returns the headers of a request with the ``propagated_headers``, which ``headers`` override.
+
+    Either mapping is returned as is when the other is empty, so that most requests don't copy them.
+    """
+    if not headers:
+        return propagated_headers
+    if not propagated_headers:
+        return headers
+    return {**propagated_headers, **headers}
+
+
+def _get_next_page_url(page, page_url):
+    """
+    Returns the absolute URL of the page after ``page``, or None if it is the last page.
+
+    Supports the ``next`` links of DRF's paginators, including cursor pagination, as well as the
+    ``pagination`` object returned by some edX APIs.
+    """
+    if not isinstance(page, dict):
+        return None
+    next_url = page.get('next')
+    if next_url is None and isinstance(page.get('pagination'), dict):
+        next_url = page['pagination'].get('next')
+    return urljoin(page_url, next_url) if next_url else None
+
+
+def _check_token_type(token_type):
+    if token_type not in TOKEN_AUTH_CLASSES:
+        raise ValueError('token_type must be one of {}.'.format(', '.join(sorted(TOKEN_AUTH_CLASSES))))
+
+
+def _cancel_refresh_timers(refresh_timers, refresh_lock):
+    """
+    Cancels the pending background token refreshes of an ``OAuthAPIClient``, which stops their threads.
+    """
+    with refresh_lock:
+        for refresh_timer in refresh_timers.values():
+            refresh_timer.cancel()
+        refresh_timers.clear()
+
+
+def _refresh_token_in_background(client_ref, token_type):
+    """
+    Timer target that refreshes a token of an ``OAuthAPIClient``, if it still exists.
+    """
+    client = client_ref()
+    if client is not None:
+        client._refresh_token(token_type)  # pylint: disable=protected-access
+
+
+def _compile_url_template(template):
+    """
+    Prepares a URL template the way requests prepares URLs, and splits it at its fields.
+
+    Returns:
+        tuple: The prepared parts of the URL around the fields, which are one more than the fields, a
+        (name, safe characters) tuple for each field, and whether the URL has a query.
+
+    """
+    marked_template = []
+    field_names = []
+    for literal_text, field_name, format_spec, conversion in string.Formatter().parse(template):
+        marked_template.append(literal_text)
+        if field_name is None:
+            continue
+        if not field_name.isidentifier() or format_spec or conversion:
+            raise ValueError('URL template fields must be plain names, like {{course_id}}: {!r}'.format(template))
+        if field_name in _ENDPOINT_CALL_ARGUMENTS:
+            raise ValueError('{!r} can not be the name of a URL template field.'.format(field_name))
+        marked_template.append(_URL_FIELD_MARKER.format(len(field_names)))
+        field_names.append(field_name)
+
+    prepared_url = requests.models.PreparedRequest()
+    prepared_url.prepare_url(''.join(marked_template), None)
+    split_url = urlsplit(prepared_url.url)
+    marker_prefix = _URL_FIELD_MARKER.format('')[:-1]
+    if marker_prefix in split_url.netloc or marker_prefix in split_url.fragment:
+        raise ValueError('URL template fields can only be in the path or query: {!r}'.format(template))
+
+    url_parts = []
+    fields = []
+    url = prepared_url.url
+    for index, field_name in enumerate(field_names):
+        url_part, _, url = url.partition(_URL_FIELD_MARKER.format(index))
+        url_parts.append(url_part)
+        is_in_query = any('?' in previous_part for previous_part in url_parts)
+        fields.append((field_name, _URL_QUERY_SAFE_CHARACTERS if is_in_query else _URL_PATH_SAFE_CHARACTERS))
+    url_parts.append(url)
+    return url_parts, fields, bool(split_url.query)
+
+
+class Endpoint:
+    """
+    An API endpoint of an ``OAuthAPIClient``, for making many requests to it cheaply. See ``OAuthAPIClient.endpoint``.
+
+    Attributes:
+        template (str): The URL template of the endpoint.
+        method (str): The HTTP method of its requests.
+
+    """
+
+    def __init__(self, client, template, method='GET', headers=None, token_type=None):
+        self.template = template
+        self.method = method.upper()
+        self._client = client
+        self._token_type = token_type or client._token_type
+        self._url_parts, self._fields, self._url_has_query = _compile_url_template(template)
+        self._field_names = frozenset(field_name for field_name, _ in self._fields)
+        self._headers = requests.structures.CaseInsensitiveDict(headers or {})
+        self._base_headers = requests.sessions.merge_setting(
+            self._headers, client.headers, dict_class=requests.structures.CaseInsensitiveDict,
+        )
+        # Proxies and TLS settings only depend on the scheme and host, which all the requests share.
+        self._settings = client.merge_environment_settings(self._url_parts[0], {}, None, None, None)
+        # Requests that may be answered from the response cache or coalesced are made as usual.
+        uses_response_cache = client._response_cache is not None and self.method == 'GET'
+        self._uses_request = uses_response_cache or (client._coalesce_requests and self.method in COALESCED_METHODS)
+
+    def __repr__(self):
+        return '<Endpoint {} {}>'.format(self.method, self.template)
+
+    def format_url(self, **fields):
+        """
+        Returns the URL of the endpoint with the values of its fields, which are percent-encoded.
+
+        Raises:
+            TypeError if a field is missing, or isn't one of the template's.
+
+        """
+        if len(fields) > len(self._field_names):
+            unexpected_fields = set(fields).difference(self._field_names)
+            raise TypeError('Unexpected URL template fields: {}'.format(', '.join(sorted(unexpected_fields))))
+        url = [self._url_parts[0]]
+        for (field_name, safe_characters), url_part in zip(self._fields, self._url_parts[1:]):
+            if field_name not in fields:
+                raise TypeError('Missing URL template field: {}'.format(field_name))
+            value = quote(str(fields[field_name]), safe=safe_characters)
+            if safe_characters is _URL_PATH_SAFE_CHARACTERS and value in ('.', '..'):
+                # Dot segments would be resolved by servers, moving the request to another path.
+                value = value.replace('.', '%2E')
+            url.append(value)
+            url.append(url_part)
+        return ''.join(url)
+
+    def __call__(self, params=None, data=None, json=None,  # pylint: disable=redefined-outer-name
+                 files=None, headers=None, timeout=None, stream=None, allow_redirects=True, **fields):
+        """
+        Makes a request to the endpoint.
+
+        The arguments are those of ``requests.Session.request``, and ``fields`` are the values of the fields of
+        the URL template.
+
+        Returns:
+            requests.Response
+
+        """
+        # pylint: disable=protected-access
+        client = self._client
+        url = self.format_url(**fields)
+        json_body = json
+        if self._uses_request:
+            return self._request(url, params, data, json_body, files, headers, timeout, stream, allow_redirects)
+
+        request_url = url
+        if client.params:
+            params = requests.sessions.merge_setting(params, client.params)
+        if params:
+            encoded_params = requests.models.RequestEncodingMixin._encode_params(params)
+            if encoded_params:
+                request_url = '{}{}{}'.format(url, '&' if self._url_has_query else '?', encoded_params)
+        request_headers = self._get_headers(client._get_request_propagated_headers(), headers)
+        settings = self._settings if stream is None else dict(self._settings, stream=stream)
+
+        def send_request():
+            prepared_request = self._prepare(request_url, request_headers, data, files, json_body)
+            return client.send(prepared_request, timeout=timeout, allow_redirects=allow_redirects, **settings)
+
+        def make_request(timings=None):
+            return client._send_authenticated(
+                self.method, url, self._token_type, send_request, _is_replayable_body(data, files), timings=timings,
+            )
+
+        if client._request_hooks:
+            return client._request_with_hooks(self.method, url, make_request, streamed=settings['stream'])
+        return make_request()
+
+    def _get_headers(self, propagated_headers, headers):
+        """
+        Returns the headers of a request: the client's, the propagated ones, the endpoint's, then ``headers``.
+
+        Headers set to None in ``headers`` are left out.
+        """
+        request_headers = self._base_headers
+        if propagated_headers:
+            request_headers = request_headers.copy()
+            for name, value in propagated_headers.items():
+                if name not in self._headers:
+                    request_headers[name] = value
+        if headers:
+            if request_headers is self._base_headers:
+                request_headers = request_headers.copy()
+            for name, value in headers.items():
+                if value is None:
+                    request_headers.pop(name, None)
+                else:
+                    request_headers[name] = value
+        return request_headers
+
+    def _prepare(self, url, headers, data, files, json_body):
+        """
+        Prepares one attempt of a request, with the current access token.
+        """
+        # pylint: disable=protected-access
+        client = self._client
+        prepared_request = requests.models.PreparedRequest()
+        prepared_request.method = self.method
+        prepared_request.url = url
+        prepared_request.headers = headers.copy()
+        if client.cookies:
+            prepared_request.prepare_cookies(requests.cookies.merge_cookies(
+                requests.cookies.RequestsCookieJar(), client.cookies,
+            ))
+        else:
+            # Redirects add the cookies they set to the jar.
+            prepared_request._cookies = requests.cookies.RequestsCookieJar()
+        prepared_request.prepare_body(data, files, json_body)
+        client._get_token_auth(self._token_type)(prepared_request)
+        prepared_request.hooks = client.hooks
+        if client._compress_requests_over is not None:
+            _compress_request_body(prepared_request, client._compress_requests_over)
+        return prepared_request
+
+    def _request(self, url, params, data, json_body, files, headers, timeout, stream, allow_redirects):
+        """
+        Makes a request to the endpoint with ``OAuthAPIClient.request``.
+        """
+        kwargs = {'token_type': self._token_type}
+        for name, value in (
+                ('params', params), ('data', data), ('json', json_body), ('files', files), ('timeout', timeout),
+                ('stream', stream), ('allow_redirects', allow_redirects)):
+            # Left out when unset, so that the request can be coalesced.
+            if value is not None and not (name == 'allow_redirects' and value):
+                kwargs[name] = value
+        request_headers = dict(self._headers)
+        request_headers.update(headers or {})
+        return self._client.request(self.method, url, headers=request_headers, **kwargs)
 
 
 class OAuthAPIClient(requests.Session):
@@ -214,8 +949,10 @@ class OAuthAPIClient(requests.Session):
     For more usage details, see documentation of the :class:`requests.Session` object:
     - https://requests.readthedocs.io/en/master/user/advanced/#session-objects
 
-    Note: Requires Django + Middleware for TieredCache, used for caching the access token.
-    See https://github.com/openedx/edx-django-utils/blob/master/edx_django_utils/cache/README.rst#tieredcache
+    Note: Access tokens are cached in the ``token_store``. By default, that is the ``TieredCache`` when Django
+    is configured, which requires its middleware, and otherwise a ``MemoryTokenStore`` in the memory of the
+    process, so the client can be used without Django. See ``edx_rest_api_client.token_store``, and
+    https://github.com/openedx/edx-django-utils/blob/master/edx_django_utils/cache/README.rst#tieredcache
 
     """
 
@@ -226,6 +963,25 @@ class OAuthAPIClient(requests.Session):
 
     def __init__(self, base_url, client_id, client_secret,
                  timeout=(REQUEST_CONNECT_TIMEOUT, REQUEST_READ_TIMEOUT),
+                 use_token_lease=False,
+                 refresh_ahead=None,
+                 pool_connections=requests.adapters.DEFAULT_POOLSIZE,
+                 pool_maxsize=requests.adapters.DEFAULT_POOLSIZE,
+                 pool_block=requests.adapters.DEFAULT_POOLBLOCK,
+                 max_retries=requests.adapters.DEFAULT_RETRIES,
+                 retry=None,
+                 circuit_breaker=None,
+                 response_cache=None,
+                 coalesce_requests=False,
+                 request_hooks=None,
+                 accept_encoding=None,
+                 compress_requests_over=None,
+                 token_broker=None,
+                 expiry_skew_seconds=ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS,
+                 token_type='jwt',
+                 rate_limiter=None,
+                 token_store=None,
+                 propagate_headers=DEFAULT_PROPAGATED_HEADERS,
                  **kwargs):
         """
         Args:
@@ -237,36 +993,648 @@ class OAuthAPIClient(requests.Session):
             client_secret (str): Client secret
             timeout (tuple(float,float)): Requests timeout parameter for access token requests.
                 (https://requests.readthedocs.io/en/master/user/advanced/#timeouts)
+            use_token_lease (bool): Coalesce access token requests across processes using a lease
+                in the Django cache. See ``get_and_cache_oauth_access_token``.
+            refresh_ahead (float): If set, a fraction between 0 and 1 of the access token's lifetime after
+                which a daemon thread fetches a new token, so requests don't wait on the auth service.
+                For example, 0.75 refreshes a token that expires in an hour after 45 minutes.
+            pool_connections (int): Number of hosts to keep connection pools for.
+            pool_maxsize (int): Maximum number of connections kept open to each host. Set this to at least
+                the number of threads sharing the client, to avoid discarding and reopening connections.
+            pool_block (bool): Whether to wait for a free connection when all pooled connections to a host
+                are in use, rather than opening a connection that is discarded afterwards.
+            max_retries (int or urllib3.util.Retry): Retries for failed connections, passed to
+                :class:`requests.adapters.HTTPAdapter`.
+            retry (RetryPolicy): If set, how to retry failed API and access token requests. Requests
+                with streamed bodies or files are never retried, because their bodies can't be sent again.
+            circuit_breaker (CircuitBreaker): If set, used to fail requests fast, with ``CircuitOpenError``,
+                while their host keeps failing.
+            response_cache (ResponseCache): If set, used to cache the responses to GET requests, following
+                their ``Cache-Control``, ``ETag`` and ``Last-Modified`` headers. Requests made with their own
+                ``auth`` or ``cookies`` bypass it.
+            coalesce_requests (bool): Whether identical GET, HEAD and OPTIONS requests made at the same time
+                from several threads should share one request. Each caller gets its own copy of the response.
+                Requests with a body, streamed responses or extra arguments like ``auth`` are not coalesced.
+            request_hooks (iterable(callable)): Functions called with a ``RequestTimings`` after each request,
+                whether it succeeded or raised an error. See ``edx_rest_api_client.instrumentation``,
+                which also provides ``OpenTelemetryHook`` to record requests as OpenTelemetry spans.
+            accept_encoding (iterable(str)): Content encodings to accept for responses, in order of preference,
+                like ``['zstd', 'br', 'gzip']``. Encodings that can't be decoded, because the brotli or zstandard
+                package isn't installed, are left out. Defaults to all the supported encodings.
+            compress_requests_over (int): If set, PATCH, POST and PUT bodies of at least this many bytes are
+                sent gzipped, with ``Content-Encoding: gzip``. Only use this with services that accept it.
+            token_broker (FileTokenBroker): If set, used to share access tokens with the other processes of
+                the host. See ``get_and_cache_oauth_access_token``.
+            expiry_skew_seconds (float): How long before their expiration access tokens are replaced,
+                to allow for slow requests and for clock differences with the auth service.
+            token_type (str): Type of access token to authenticate requests with: ``jwt``, sent with
+                ``SuppliedJwtAuth``, or ``bearer``, sent with ``BearerAuth``. Requests can use the other
+                type by passing ``token_type``, for example ``client.get(url, token_type='bearer')``, so a
+                service calling both JWT and bearer-only backends can share one client and its connection
+                pools. Each type of token is cached and refreshed separately.
+            rate_limiter (RateLimiter): If set, used to limit the rate and concurrency of requests to each host
+                or URL prefix, and to slow down when they respond with ``429 Too Many Requests``. Every attempt
+                of a retried request counts. Requests that would wait too long raise ``RateLimitedError``.
+            token_store: Where to cache access tokens, like a ``FileTokenStore`` for command line tools.
+                See ``get_and_cache_oauth_access_token``.
+            propagate_headers (iterable(str)): Headers of the Django request being handled that are sent
+                along with API requests, like ``['X-Request-ID', 'traceparent', 'X-Tenant-ID']``. They are
+                read once per Django request. Headers passed to a request override them.
 
         """
+        if refresh_ahead is not None and not 0 < refresh_ahead < 1:
+            raise ValueError('refresh_ahead must be between 0 and 1.')
+        _check_token_type(token_type)
+
         super().__init__(**kwargs)
-        self.headers['user-agent'] = USER_AGENT
-        self.auth = SuppliedJwtAuth(None)
+        self.headers['user-agent'] = get_user_agent()
+        supported_encodings = get_supported_content_encodings()
+        if accept_encoding is not None:
+            supported_encodings = [encoding for encoding in accept_encoding if encoding in supported_encodings]
+        self.headers['Accept-Encoding'] = ', '.join(supported_encodings) or 'identity'
+        self.auth = TOKEN_AUTH_CLASSES[token_type](None)
+
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=max_retries,
+        )
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
 
         self._base_url = base_url.rstrip('/')
         self._client_id = client_id
         self._client_secret = client_secret
         self._timeout = timeout
+        self._use_token_lease = use_token_lease
+        self._token_broker = token_broker
+        self._expiry_skew_seconds = expiry_skew_seconds
+        self._token_store = token_store
+        self._propagated_header_names = tuple(propagate_headers)
+        self._token_type = token_type
+        # Auth objects for the token types other than token_type, which is sent with self.auth.
+        self._token_auths = {}
+        self._retry = retry
+        self._circuit_breaker = circuit_breaker
+        self._rate_limiter = rate_limiter
+        self._response_cache = response_cache
+        self._coalesce_requests = coalesce_requests
+        self._request_hooks = list(request_hooks or ())
+        self._compress_requests_over = compress_requests_over
+        self._in_flight_requests = {}
+        self._in_flight_requests_lock = threading.Lock()
+        self._refresh_ahead = refresh_ahead
+        self._refresh_lock = threading.Lock()
+        # The pending background refresh of each token type, and the AccessToken it replaces.
+        self._refresh_timers = {}
+        self._refresh_access_tokens = {}
+        # Timer threads sleep until their refresh is due, so they are stopped when a client that
+        # wasn't closed is garbage collected.
+        weakref.finalize(self, _cancel_refresh_timers, self._refresh_timers, self._refresh_lock)
+        # A (token, monotonic deadline) tuple per token type for the token currently set on its auth
+        # object, which lets requests skip the token cache until the token is close to expiring. Each
+        # tuple is replaced as a whole so that threads never see a token paired with another token's deadline.
+        self._token_memos = {}
 
-    def _ensure_authentication(self):
+    def _get_client_oauth_url(self):
+        return self._base_url if not self.oauth_uri else self._base_url + self.oauth_uri
+
+    def _get_token_auth(self, token_type):
+        """
+        Returns the auth object that sends tokens of ``token_type``.
+        """
+        if token_type == self._token_type:
+            return self.auth
+        return self._token_auths.setdefault(token_type, TOKEN_AUTH_CLASSES[token_type](None))
+
+    def _ensure_authentication(self, token_type=None, min_remaining_seconds=0):
         """
-        Ensures that the Session's auth.token is set with an unexpired token.
+        Ensures that the auth object for ``token_type`` is set with an unexpired token.
+
+        Kwargs:
+            token_type (str): The type of token. Defaults to the client's ``token_type``.
+            min_remaining_seconds (float): How long the token must remain valid for, in addition to the
+                client's ``expiry_skew_seconds``.
 
         Raises:
             requests.RequestException if there is a problem retrieving the access token.
 
+        Returns:
+            str: How the token was obtained: TOKEN_MEMO, TOKEN_CACHE_HIT or TOKEN_CACHE_MISS.
+
         """
-        oauth_url = self._base_url if not self.oauth_uri else self._base_url + self.oauth_uri
+        token_type = token_type or self._token_type
+        token_memo = self._token_memos.get(token_type)
+        if token_memo is not None and time.monotonic() + min_remaining_seconds < token_memo[1]:
+            return TOKEN_MEMO
 
-        oauth_access_token_response = get_and_cache_oauth_access_token(
-            oauth_url,
+        oauth_access_token_response, token_cache = _get_or_fetch_access_token(
+            self._get_client_oauth_url(),
             self._client_id,
             self._client_secret,
+            token_type=token_type,
             grant_type='client_credentials',
+            refresh_token=None,
             timeout=self._timeout,
+            use_token_lease=self._use_token_lease,
+            refresh_ahead_seconds=min_remaining_seconds + self._expiry_skew_seconds if min_remaining_seconds else None,
+            retry=self._retry,
+            token_broker=self._token_broker,
+            expiry_skew_seconds=self._expiry_skew_seconds,
+            token_store=self._token_store,
         )
 
-        self.auth.token, _ = oauth_access_token_response
+        self._set_token(token_type, oauth_access_token_response)
+        if self._refresh_ahead is not None:
+            self._schedule_token_refresh(token_type, oauth_access_token_response)
+        return token_cache
+
+    def _set_token(self, token_type, access_token):
+        """
+        Sets the AccessToken used for ``token_type``, and remembers it until shortly before it expires.
+        """
+        self._get_token_auth(token_type).token = access_token.access_token
+        self._token_memos[token_type] = (
+            access_token.access_token,
+            access_token.monotonic_deadline - access_token.get_expiry_skew(self._expiry_skew_seconds),
+        )
+
+    def invalidate_token(self, token_type=None):
+        """
+        Forgets the access tokens held by this client, so the next request looks them up in the token cache again.
+
+        Kwargs:
+            token_type (str): If set, only forget the token of this type.
+
+        """
+        if token_type is None:
+            self._token_memos.clear()
+        else:
+            self._token_memos.pop(token_type, None)
+
+    def _replace_rejected_token(self, token_type, rejected_token):
+        """
+        Replaces the access token ``rejected_token``, which an API rejected with a 401.
+
+        The token is dropped from this client and from the token cache, unless another thread or process
+        has already replaced it, and a new one is fetched. Other requests rejected at the same time find
+        the new token instead of fetching one each.
+
+        Returns:
+            bool: Whether the client now has a different token, with which the request can be sent again.
+
+        """
+        cache_key = _get_token_cache_key(token_type, 'client_credentials', self._client_id,
+                                         _get_oauth_url(self._get_client_oauth_url()))
+        token_stores = [self._token_store or get_default_token_store()]
+        if self._token_broker is not None:
+            token_stores.append(self._token_broker)
+
+        with _get_token_fetch_lock(cache_key):
+            token_memo = self._token_memos.get(token_type)
+            if token_memo is not None and token_memo[0] == rejected_token:
+                self._token_memos.pop(token_type, None)
+            rejecting_stores = [
+                token_store for token_store in token_stores
+                if (token_store.get(cache_key) or (None,))[0] == rejected_token
+            ]
+            if rejecting_stores:
+                last_invalidation = _TOKEN_INVALIDATION_TIMES.get(cache_key)
+                if last_invalidation is not None and \
+                        time.monotonic() - last_invalidation < TOKEN_INVALIDATION_INTERVAL_SECONDS:
+                    return False
+                _TOKEN_INVALIDATION_TIMES[cache_key] = time.monotonic()
+                for token_store in rejecting_stores:
+                    token_store.delete(cache_key)
+                set_custom_attribute('api_client_token_rejected', True)
+
+        try:
+            self._ensure_authentication(token_type)
+        except requests.RequestException:
+            log.exception('Replacing the rejected access token for client %s failed.', self._client_id)
+            return False
+        return self._get_token_auth(token_type).token != rejected_token
+
+    def _schedule_token_refresh(self, token_type, access_token, delay=None):
+        """
+        Schedules a background refresh of the AccessToken ``access_token`` of type ``token_type``.
+
+        Unless ``delay`` is given, the refresh happens once the ``refresh_ahead`` fraction of the
+        token's remaining lifetime has passed. Nothing is scheduled if a refresh of this token is
+        already pending.
+        """
+        with self._refresh_lock:
+            refresh_timer = self._refresh_timers.get(token_type)
+            if refresh_timer is not None and self._refresh_access_tokens[token_type] == access_token:
+                return
+            if refresh_timer is not None:
+                refresh_timer.cancel()
+
+            if delay is None:
+                delay = max(access_token.remaining_seconds() * self._refresh_ahead, 0)
+
+            # The timer only holds a weak reference, so that it doesn't keep an unused client alive.
+            refresh_timer = threading.Timer(
+                delay, _refresh_token_in_background, args=(weakref.ref(self), token_type),
+            )
+            refresh_timer.daemon = True
+            self._refresh_timers[token_type] = refresh_timer
+            self._refresh_access_tokens[token_type] = access_token
+            refresh_timer.start()
+
+    def _refresh_token(self, token_type=None):
+        """
+        Replaces the current access token of ``token_type``, unless another client has already cached a newer one.
+        """
+        token_type = token_type or self._token_type
+        with self._refresh_lock:
+            self._refresh_timers.pop(token_type, None)
+            access_token = self._refresh_access_tokens[token_type]
+
+        # Any cached token that doesn't outlive the current one is treated as expired.
+        remaining_seconds = access_token.remaining_seconds()
+        try:
+            new_access_token = get_and_cache_oauth_access_token(
+                self._get_client_oauth_url(),
+                self._client_id,
+                self._client_secret,
+                token_type=token_type,
+                grant_type='client_credentials',
+                timeout=self._timeout,
+                use_token_lease=self._use_token_lease,
+                retry=self._retry,
+                refresh_ahead_seconds=max(remaining_seconds, 0) + 1,
+                token_broker=self._token_broker,
+                expiry_skew_seconds=self._expiry_skew_seconds,
+                token_store=self._token_store,
+            )
+        except requests.RequestException:
+            log.exception('Background refresh of the access token for client %s failed.', self._client_id)
+            # Try again later. The request path will still fetch a token itself if this one expires.
+            retry_delay = min(TOKEN_REFRESH_RETRY_SECONDS, max(remaining_seconds / 2, 1))
+            self._schedule_token_refresh(token_type, access_token, delay=retry_delay)
+            return
+
+        self._set_token(token_type, new_access_token)
+        self._schedule_token_refresh(token_type, new_access_token)
+
+    def _with_circuit_breaker(self, host, send):
+        """
+        Wraps ``send`` so that each attempt goes through the circuit breaker for ``host``.
+        """
+        def send_with_circuit_breaker():
+            set_custom_attribute('api_client_circuit_state', self._circuit_breaker.get_state(host))
+            try:
+                return self._circuit_breaker.call(host, send)
+            except CircuitOpenError:
+                set_custom_attribute('api_client_circuit_open_host', host)
+                raise
+
+        return send_with_circuit_breaker
+
+    def iter_pages(self, url, params=None, prefetch=False, **kwargs):
+        """
+        Yields the pages of a paginated list endpoint, following their ``next`` links.
+
+        Usage example::
+
+            for page in client.iter_pages(settings.DISCOVERY_API_URL + 'courses/', params={'page_size': 100}):
+                process(page['results'])
+
+        Args:
+            url (str): URL of the first page.
+            params (dict): Query parameters for the first page. Later pages use the query of the ``next`` link.
+            prefetch (bool): Whether to fetch the next page in a background thread while the current page is
+                processed. At most one page is fetched ahead, so memory use stays bounded.
+
+        Any other keyword arguments, like ``timeout``, are passed on to every ``get`` call.
+
+        Raises:
+            requests.HTTPError if a page can't be retrieved.
+
+        Yields:
+            dict: The decoded JSON of each page.
+
+        """
+        # Pages fetched in the background don't see the current Django request, so pass its headers along.
+        headers = {**self._get_propagated_headers(), **(kwargs.pop('headers', None) or {})}
+
+        def get_page(page_url, page_params):
+            response = self.get(page_url, params=page_params, headers=dict(headers), **kwargs)
+            response.raise_for_status()
+            return response.url, decode_response(response)
+
+        if not prefetch:
+            page_url, page = get_page(url, params)
+            while True:
+                yield page
+                next_url = _get_next_page_url(page, page_url)
+                if next_url is None:
+                    return
+                page_url, page = get_page(next_url, None)
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='edx_rest_api_client_prefetch')
+        try:
+            page_url, page = get_page(url, params)
+            while True:
+                next_url = _get_next_page_url(page, page_url)
+                next_page = executor.submit(get_page, next_url, None) if next_url else None
+                yield page
+                if next_page is None:
+                    return
+                page_url, page = next_page.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_results(self, url, params=None, prefetch=False, results_key='results', stream=False, **kwargs):
+        """
+        Yields the items of a paginated list endpoint, one at a time, fetching pages as needed.
+
+        See ``iter_pages`` for details of the arguments.
+
+        Kwargs:
+            results_key (str): Key of the list of items in each page. Endpoints that return a plain list
+                are treated as a single page.
+            stream (bool): Whether to decode each page's items as the page is read, rather than decoding
+                whole pages. Only one item is held in memory at a time, which suits very large pages.
+                Can't be combined with ``prefetch``.
+
+        """
+        if not stream:
+            for page in self.iter_pages(url, params=params, prefetch=prefetch, **kwargs):
+                yield from page if isinstance(page, list) else page[results_key]
+            return
+
+        if prefetch:
+            raise ValueError('prefetch and stream cannot be combined.')
+        page_url = url
+        while page_url is not None:
+            with self.get(page_url, params=params, stream=True, **kwargs) as response:
+                response.raise_for_status()
+                page = {}
+                yield from iter_json_items(response, key=results_key, metadata=page)
+            page_url, params = _get_next_page_url(page, response.url), None
+
+    def batch(self, calls, max_workers=requests.adapters.DEFAULT_POOLSIZE):
+        """
+        Makes independent requests concurrently on a bounded pool of threads.
+
+        Usage example::
+
+            results = client.batch(
+                [('GET', COURSE_RUN_URL.format(key), {'timeout': (3.1, 0.5)}) for key in course_run_keys],
+                max_workers=10,
+            )
+            for result in results:
+                if result.exception is None:
+                    process(result.response)
+
+        All requests share this client's access token and connection pools, so ``max_workers`` should not
+        be more than ``pool_maxsize``. Requests are made with the propagated headers of the current Django request.
+
+        Args:
+            calls (iterable): ``(method, url)`` or ``(method, url, kwargs)`` tuples, where ``kwargs`` are
+                passed on to ``request``.
+            max_workers (int): Maximum number of requests in flight at once.
+
+        Returns:
+            list(BatchResult): The outcome of each call, in the same order as ``calls``. Errors raised
+            by a call are returned as its ``exception`` rather than raised.
+
+        """
+        calls = list(calls)
+        if not calls:
+            return []
+
+        # Fetch the token once up front, rather than having every worker wait on it.
+        self._ensure_authentication()
+        propagated_headers = self._get_propagated_headers()
+
+        def make_call(call):
+            method, url, kwargs = call if len(call) == 3 else (*call, {})
+            kwargs = dict(kwargs)
+            headers = _merge_propagated_headers(propagated_headers, kwargs.pop('headers', None))
+            try:
+                return BatchResult(self.request(method, url, headers=headers, **kwargs), None)
+            except Exception as exception:  # pylint: disable=broad-except
+                return BatchResult(None, exception)
+
+        max_workers = min(max_workers, len(calls))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='edx_rest_api_client_batch') as executor:
+            return list(executor.map(make_call, calls))
+
+    def endpoint(self, template, method='GET', headers=None, token_type=None):
+        """
+        Returns an ``Endpoint`` for making many requests to the same API endpoint, with less work for each.
+
+        The URL template is parsed and prepared once, and so are the headers, proxies and TLS settings of
+        the requests. Each call only fills in the URL fields, query parameters and body of its request.
+
+        Usage example::
+
+            get_enrollment = client.endpoint(
+                settings.LMS_ROOT_URL + '/api/enrollment/v1/enrollment/{username},{course_id}'
+            )
+            for username in usernames:
+                response = get_enrollment(username=username, course_id=course_id, timeout=(3.1, 0.5))
+
+        Args:
+            template (str): URL of the endpoint, with fields in the path or query in ``str.format`` syntax, like
+                ``{course_id}``. Field values are percent-encoded, so that they can't add path segments or
+                query parameters.
+            method (str): HTTP method of the requests.
+            headers (dict): Headers of every request, which the headers passed to a call override.
+            token_type (str): The type of access token to send, ``jwt`` or ``bearer``. Defaults to the
+                client's ``token_type``.
+
+        The client's headers and environment settings, like proxies, are read when the endpoint is created,
+        so later changes to them don't apply to it. The client's ``params`` are sent with every request, and
+        the ``params`` passed to a call override them. GET requests of a client with a response cache, and
+        requests of a client that coalesces requests, are made with ``request`` as usual.
+
+        Raises:
+            ValueError if the template has fields outside of its path and query, or fields that aren't plain names.
+
+        Returns:
+            Endpoint: A callable that makes a request, taking the fields of the template and the arguments of
+            ``requests.Session.request``, like ``params``, ``json`` or ``timeout``.
+
+        """
+        if token_type is not None:
+            _check_token_type(token_type)
+        return Endpoint(self, template, method=method, headers=headers, token_type=token_type)
+
+    def _get_propagated_headers(self):
+        return get_propagated_headers(self._propagated_header_names)
+
+    def _authenticate_transfer(self, kwargs):
+        """
+        Ensures, before a transfer, that the access token used for it won't expire while it's under way.
+        """
+        token_type = kwargs.get('token_type')
+        if token_type is not None:
+            _check_token_type(token_type)
+        if 'auth' not in kwargs:
+            self._ensure_authentication(token_type, min_remaining_seconds=TRANSFER_MIN_TOKEN_SECONDS)
+
+    def download_to(self, url, destination, resume=False, chunk_size=TRANSFER_CHUNK_SIZE,
+                    max_resumes=DOWNLOAD_MAX_RESUMES, **kwargs):
+        """
+        Writes the body of a GET response to a file a chunk at a time, without holding it in memory.
+
+        Usage example::
+
+            client.download_to(settings.LMS_ROOT_URL + '/api/grades/v1/export/', '/tmp/grades.csv', resume=True)
+
+        Args:
+            url (str): URL to download.
+            destination (str, os.PathLike or file object): Path of the file to write, which is replaced,
+                or a binary file object to write to.
+            resume (bool): Whether to continue a partial download instead of starting over. The bytes
+                already in the file, or before the current position of a file object, are kept and the
+                rest is requested with a ``Range`` header. If the connection breaks, the download also
+                continues from where it stopped, up to ``max_resumes`` times. Servers that don't support
+                ranges send the whole body again, which replaces the partial one.
+            chunk_size (int): Number of bytes written at a time.
+            max_resumes (int): How many times to continue a download after its connection breaks.
+
+        Any other keyword arguments, like ``params`` or ``timeout``, are passed on to every ``get`` call.
+
+        Raises:
+            requests.HTTPError if the response has an error status, or is a partial response for the wrong
+                range. A file at ``destination`` is then left untouched, unless the download was already under way.
+
+        Returns:
+            requests.Response: The last response, whose body has been written to ``destination``.
+
+        """
+        self._authenticate_transfer(kwargs)
+        headers = dict(kwargs.pop('headers', None) or {})
+        if resume:
+            # Ranges are positions in the encoded body, so it must be unencoded to continue it.
+            headers.setdefault('Accept-Encoding', 'identity')
+
+        is_path = isinstance(destination, (str, os.PathLike))
+        file = None if is_path else destination
+        # Number of bytes of the body that are already in the destination.
+        position = 0
+        if resume and is_path:
+            position = os.path.getsize(destination) if os.path.exists(destination) else 0
+        elif resume:
+            position = destination.tell()
+
+        resumes = 0
+        try:
+            while True:
+                request_headers = dict(headers)
+                if position:
+                    request_headers['Range'] = 'bytes={}-'.format(position)
+                response = self.get(url, headers=request_headers, stream=True, **kwargs)
+                if response.status_code == 416 and _get_content_range(response)[1] == position:
+                    # The partial download was already complete.
+                    response.close()
+                    return response
+                response.raise_for_status()
+                if response.status_code == 206 and _get_content_range(response)[0] != position:
+                    response.close()
+                    if not position:
+                        raise requests.HTTPError(
+                            'Partial response to a request for the whole body of {}'.format(url), response=response,
+                        )
+                    # Part of the body other than the one requested can't be written, so download all of it.
+                    log.warning('Range request to %s got another range, downloading the whole body.', url)
+                    position = 0
+                    continue
+                if response.status_code != 206:
+                    position = 0
+                if file is None:
+                    file = open(destination, 'r+b' if position else 'wb')  # pylint: disable=consider-using-with
+                if resume:
+                    file.seek(position)
+                    file.truncate()
+
+                try:
+                    with response:
+                        for chunk in response.iter_content(chunk_size):
+                            file.write(chunk)
+                            position += len(chunk)
+                    return response
+                except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError):
+                    supports_ranges = response.status_code == 206 or response.headers.get('Accept-Ranges') == 'bytes'
+                    if not resume or not supports_ranges or resumes >= max_resumes:
+                        raise
+                    resumes += 1
+                    set_custom_attribute('api_client_download_resumes', resumes)
+                    log.warning('Download of %s broke off after %d bytes, resuming.', url, position)
+        finally:
+            if is_path and file is not None:
+                file.close()
+
+    def upload_from(self, url, source, method='POST', field_name=None, filename=None, content_type=None,
+                    fields=None, chunk_size=TRANSFER_CHUNK_SIZE, **kwargs):
+        """
+        Sends a file or an iterable of bytes as a request body a chunk at a time, without holding it in memory.
+
+        Files are sent with their ``Content-Length``. Iterables, like generators, and multipart bodies are
+        sent with chunked transfer encoding. Either way the body can only be read once, so the request is
+        not retried.
+
+        Usage example::
+
+            client.upload_from(
+                settings.LMS_ROOT_URL + '/api/bulk_enroll/v1/bulk_enroll/upload/', '/tmp/learners.csv',
+                field_name='file', content_type='text/csv', fields={'action': 'enroll'},
+            )
+
+        Args:
+            url (str): URL to send the body to.
+            source (str, os.PathLike, file object or iterable(bytes)): Path of the file to send, a binary
+                file object, or an iterable yielding the body in chunks.
+            method (str): HTTP method of the request.
+            field_name (str): If set, the body is sent as ``multipart/form-data``, with ``source`` as the file
+                of this form field, the way browsers upload files.
+            filename (str): Filename of the multipart file. Defaults to the name of the source file.
+            content_type (str): Content type of ``source``. Defaults to ``application/octet-stream`` for
+                multipart files.
+            fields (dict): Other form fields of the multipart body, mapping names to values.
+            chunk_size (int): Number of bytes read from files at a time.
+
+        Any other keyword arguments, like ``headers`` or ``timeout``, are passed on to ``request``.
+
+        Returns:
+            requests.Response
+
+        """
+        self._authenticate_transfer(kwargs)
+        headers = dict(kwargs.pop('headers', None) or {})
+        is_path = isinstance(source, (str, os.PathLike))
+        source_file = open(source, 'rb') if is_path else source  # pylint: disable=consider-using-with
+        body = source_file
+        try:
+            if field_name is not None:
+                if filename is None:
+                    source_name = getattr(source_file, 'name', None)
+                    filename = os.path.basename(source_name) if isinstance(source_name, str) else field_name
+                chunks = _iter_file_chunks(source_file, chunk_size) if hasattr(source_file, 'read') else source_file
+                boundary = uuid.uuid4().hex
+                headers['Content-Type'] = 'multipart/form-data; boundary={}'.format(boundary)
+                body = _iter_multipart_body(
+                    boundary, fields or {}, field_name, filename, content_type or 'application/octet-stream', chunks,
+                )
+            elif content_type is not None:
+                headers.setdefault('Content-Type', content_type)
+            return self.request(method, url, headers=headers, data=body, **kwargs)
+        finally:
+            if is_path:
+                source_file.close()
+
+    def close(self):
+        """
+        Cancels any pending background token refreshes, and closes the session.
+        """
+        _cancel_refresh_timers(self._refresh_timers, self._refresh_lock)
+        super().close()
 
     def get_jwt_access_token(self):
         """
@@ -279,8 +1647,29 @@ class OAuthAPIClient(requests.Session):
         Here is example code that properly uses the configured JWT decoder:
         https://github.com/openedx/edx-drf-extensions/blob/master/edx_rest_framework_extensions/auth/jwt/authentication.py#L180-L190
         """
-        self._ensure_authentication()
-        return self.auth.token
+        return self.get_access_token('jwt')
+
+    def get_access_token(self, token_type=None):
+        """
+        Returns the access token of ``token_type`` that will be used to make authenticated calls.
+
+        Kwargs:
+            token_type (str): ``jwt`` or ``bearer``. Defaults to the client's ``token_type``.
+
+        """
+        token_type = token_type or self._token_type
+        _check_token_type(token_type)
+        self._ensure_authentication(token_type)
+        return self._get_token_auth(token_type).token
+
+    def prepare_request(self, request):
+        """
+        Overrides Session.prepare_request to compress large request bodies, if configured.
+        """
+        prepared_request = super().prepare_request(request)
+        if self._compress_requests_over is not None:
+            _compress_request_body(prepared_request, self._compress_requests_over)
+        return prepared_request
 
     def request(self, method, url, headers=None, **kwargs):  # pylint: disable=arguments-differ
         """
@@ -289,12 +1678,214 @@ class OAuthAPIClient(requests.Session):
         Note: Typically, users of the client won't call this directly, but will
         instead use Session.get or Session.post.
 
+        Kwargs:
+            token_type (str): The type of access token to send, ``jwt`` or ``bearer``. Defaults to the
+                client's ``token_type``. Ignored if ``auth`` is given.
+
         """
-        request_id = get_request_id()
-        if headers is None:
-            headers = {}
-        if headers.get('X-Request-ID') is None and request_id is not None:
-            headers['X-Request-ID'] = request_id
-        set_custom_attribute('api_client', 'OAuthAPIClient')
-        self._ensure_authentication()
-        return super().request(method, url, headers=headers, **kwargs)
+        if 'token_type' in kwargs:
+            _check_token_type(kwargs['token_type'])
+        headers = _merge_propagated_headers(self._get_request_propagated_headers(), headers) or NO_HEADERS
+
+        if self._request_hooks:
+            return self._request_with_hooks(
+                method, url, lambda timings: self._request(method, url, headers, kwargs, timings),
+                streamed=kwargs.get('stream', False),
+            )
+        return self._request(method, url, headers, kwargs)
+
+    def _get_request_propagated_headers(self):
+        """
+        Returns the headers propagated from the current Django request, and notes the request for monitoring.
+        """
+        context = get_propagation_context(self._propagated_header_names)
+        if context is None:
+            set_custom_attribute('api_client', 'OAuthAPIClient')
+            return NO_HEADERS
+        # The attribute is set on the transaction of the Django request, so once is enough.
+        context.set_custom_attribute('api_client', 'OAuthAPIClient')
+        return context.headers
+
+    def _request(self, method, url, headers, kwargs, timings=None):
+        is_coalescable = method.upper() in COALESCED_METHODS and _COALESCABLE_KWARGS.issuperset(kwargs)
+        if self._coalesce_requests and is_coalescable:
+            return self._request_coalesced(method, url, headers, kwargs, timings)
+        return self._request_uncoalesced(method, url, headers, kwargs, timings)
+
+    def _request_with_hooks(self, method, url, make_request, streamed):
+        """
+        Makes a request with ``make_request``, which is passed its ``RequestTimings``, then calls the request
+        hooks with the timings.
+        """
+        timings = RequestTimings(method, url, time.time_ns())
+        start = time.perf_counter()
+        try:
+            response = make_request(timings)
+            timings.record_response(response, streamed=streamed)
+            return response
+        except Exception as exception:
+            timings.exception = exception
+            raise
+        finally:
+            timings.total_seconds = time.perf_counter() - start
+            for hook in self._request_hooks:
+                try:
+                    hook(timings)
+                except Exception:  # pylint: disable=broad-except
+                    log.exception('Request hook %r failed.', hook)
+
+    def _request_uncoalesced(self, method, url, headers, kwargs, timings=None):
+        if self._response_cache is not None and method.upper() == 'GET' and not kwargs.get('stream') and \
+                _UNCACHEABLE_KWARGS.isdisjoint(kwargs):
+            return self._request_with_response_cache(url, headers, kwargs, timings)
+        return self._send_request(method, url, headers, kwargs, timings)
+
+    def _request_coalesced(self, method, url, headers, kwargs, timings=None):
+        """
+        Makes a request, or waits for an identical request already being made by another thread.
+        """
+        prepared_url = requests.models.PreparedRequest()
+        prepared_url.prepare_url(url, kwargs.get('params'))
+        # The request ID differs between callers, but doesn't change the response.
+        key_headers = tuple(sorted(
+            (name.lower(), value) for name, value in headers.items() if name.lower() != 'x-request-id'
+        ))
+        key = (
+            method.upper(), prepared_url.url, key_headers, kwargs.get('allow_redirects', True),
+            kwargs.get('token_type') or self._token_type,
+        )
+
+        with self._in_flight_requests_lock:
+            in_flight_request = self._in_flight_requests.get(key)
+            is_leader = in_flight_request is None
+            if is_leader:
+                in_flight_request = self._in_flight_requests[key] = _InFlightRequest()
+
+        if not is_leader:
+            set_custom_attribute('api_client_coalesced', True)
+            if timings is not None:
+                timings.coalesced = True
+            in_flight_request.done.wait()
+            if in_flight_request.exception is not None:
+                raise in_flight_request.exception
+            return _copy_response(in_flight_request.response)
+
+        try:
+            response = self._request_uncoalesced(method, url, headers, kwargs, timings)
+            # Read the body now, so that every caller can have a copy of it.
+            response.content  # pylint: disable=pointless-statement
+            in_flight_request.response = response
+            return response
+        except Exception as exception:
+            in_flight_request.exception = exception
+            raise
+        finally:
+            with self._in_flight_requests_lock:
+                del self._in_flight_requests[key]
+            in_flight_request.done.set()
+
+    def _send_request(self, method, url, headers, kwargs, timings=None):
+        """
+        Makes a request, authenticating it and applying the retry policy and circuit breaker.
+        """
+        kwargs = dict(kwargs)
+        token_type = kwargs.pop('token_type', None) or self._token_type
+        uses_access_token = 'auth' not in kwargs
+        if token_type != self._token_type:
+            kwargs.setdefault('auth', self._get_token_auth(token_type))
+        session_request = super().request
+
+        def send_request():
+            return session_request(method, url, headers=headers, **kwargs)
+
+        is_replayable = _is_replayable_body(kwargs.get('data'), kwargs.get('files'))
+        return self._send_authenticated(
+            method, url, token_type, send_request, is_replayable, uses_access_token=uses_access_token, timings=timings,
+        )
+
+    def _send_authenticated(self, method, url, token_type, send_request, is_replayable, uses_access_token=True,
+                            timings=None):
+        """
+        Sends a request with ``send_request``, authenticating it and applying the retry policy and circuit breaker.
+
+        Args:
+            send_request (callable): Sends the request with the current access token of ``token_type``,
+                and returns the response. It is called once for each attempt.
+            is_replayable (bool): Whether the body of the request can be sent again.
+            uses_access_token (bool): Whether the request is authenticated with the client's access token.
+
+        """
+        # Authenticate before any retries, so that failing token requests aren't retried by both policies.
+        token_start = time.perf_counter()
+        token_cache = self._ensure_authentication(token_type)
+        token_seconds = time.perf_counter() - token_start
+        if token_cache != TOKEN_MEMO:
+            set_custom_attribute('api_client_token_cache', token_cache)
+            set_custom_attribute('api_client_token_seconds', token_seconds)
+        if timings is not None:
+            timings.token_cache = token_cache
+            timings.token_seconds = token_seconds
+
+        if self._rate_limiter is not None:
+            send_request = functools.partial(self._rate_limiter.call, url, send_request)
+        if self._circuit_breaker is not None:
+            send_request = self._with_circuit_breaker(urlsplit(url).netloc, send_request)
+
+        sent_tokens = []
+
+        def send():
+            # The token may have neared expiry while waiting to retry.
+            self._ensure_authentication(token_type)
+            sent_tokens.append(self._get_token_auth(token_type).token)
+            return send_request()
+
+        def send_with_retries():
+            if self._retry is None or not is_replayable:
+                return send()
+            return self._retry.call(send, method)
+
+        response = send_with_retries()
+        # A token rejected before it expires has usually been revoked, or signed with a rotated key.
+        # Replace it, and send the request once more with the new token if its body can be sent again.
+        if response.status_code == 401 and uses_access_token and \
+                self._replace_rejected_token(token_type, sent_tokens[-1]) and is_replayable:
+            response.close()
+            response = send_with_retries()
+        return response
+
+    def _request_with_response_cache(self, url, headers, kwargs, timings=None):
+        """
+        Makes a GET request through the response cache.
+        """
+        request_headers = requests.structures.CaseInsensitiveDict(headers)
+        request_cache_control = request_headers.get('Cache-Control', '').lower()
+        if 'no-store' in request_cache_control:
+            return self._send_request('GET', url, headers, kwargs, timings)
+
+        prepared_url = requests.models.PreparedRequest()
+        prepared_url.prepare_url(url, kwargs.get('params'))
+        cache_key = self._response_cache.get_key(self._client_id, prepared_url.url, request_headers)
+        entry = self._response_cache.get(cache_key)
+        if entry is not None and not self._response_cache.matches(entry, requests.sessions.merge_setting(
+                request_headers, self.headers, dict_class=requests.structures.CaseInsensitiveDict)):
+            entry = None
+
+        if entry is not None:
+            if 'no-cache' not in request_cache_control and self._response_cache.is_fresh(entry):
+                set_custom_attribute('api_client_response_cache', 'hit')
+                return self._response_cache.build_response(entry)
+            conditional_headers = self._response_cache.get_conditional_headers(entry)
+            if conditional_headers and not any(name in request_headers for name in conditional_headers):
+                headers = dict(headers, **conditional_headers)
+            else:
+                entry = None
+
+        response = self._send_request('GET', url, headers, kwargs, timings)
+        if entry is not None and response.status_code == 304:
+            set_custom_attribute('api_client_response_cache', 'revalidated')
+            entry = self._response_cache.update(cache_key, entry, response)
+            return self._response_cache.build_response(entry)
+
+        set_custom_attribute('api_client_response_cache', 'miss')
+        self._response_cache.store(cache_key, response)
+        return response
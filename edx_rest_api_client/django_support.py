@@ -0,0 +1,56 @@
+"""
+Lazy access to the Django features used by this library, so that it can be used without Django.
+
+Django, edx-django-utils and crum are only imported once Django is configured, which keeps
+importing the client fast in scripts and workers that don't use Django.
+"""
+import os
+import sys
+
+# Django stays configured once it is, so that is only checked until it's found to be.
+_django_configured = False
+
+
+def is_django_configured():
+    """
+    Returns whether Django settings are available, through ``DJANGO_SETTINGS_MODULE`` or ``settings.configure()``.
+    """
+    global _django_configured
+    if _django_configured:
+        return True
+    if os.environ.get('DJANGO_SETTINGS_MODULE'):
+        _django_configured = True
+    else:
+        # Settings can only have been configured if django.conf has been imported.
+        django_conf = sys.modules.get('django.conf')
+        _django_configured = django_conf is not None and django_conf.settings.configured
+    return _django_configured
+
+
+def set_custom_attribute(key, value):
+    """
+    Sets a custom attribute on the current monitoring transaction, like
+    ``edx_django_utils.monitoring.set_custom_attribute``. Does nothing when Django isn't configured.
+    """
+    if is_django_configured():
+        from edx_django_utils.monitoring import \
+            set_custom_attribute as set_monitoring_attribute  # pylint: disable=import-outside-toplevel
+        set_monitoring_attribute(key, value)
+
+
+def get_django_cache():
+    """
+    Returns the default Django cache.
+    """
+    from django.core.cache import cache  # pylint: disable=import-outside-toplevel
+    return cache
+
+
+def get_current_request():
+    """
+    Returns the Django request being handled by the current thread, or None.
+    """
+    if not is_django_configured():
+        return None
+    import crum  # pylint: disable=import-outside-toplevel
+    return crum.get_current_request()
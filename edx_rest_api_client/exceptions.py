@@ -1,2 +1,22 @@
 # noinspection PyUnresolvedReferences
-from requests.exceptions import Timeout  # pylint: disable=unused-import
+from requests.exceptions import RequestException, Timeout  # pylint: disable=unused-import
+
+
+class CircuitOpenError(RequestException):
+    """
+    Raised instead of making a request to a host whose circuit breaker is open.
+    """
+
+    def __init__(self, host):
+        super().__init__(f'Circuit breaker is open for {host}')
+        self.host = host
+
+
+class RateLimitedError(RequestException):
+    """
+    Raised instead of making a request that would have to wait longer than allowed for its rate limit.
+    """
+
+    def __init__(self, destination):
+        super().__init__(f'Rate limit exceeded for {destination}')
+        self.destination = destination
@@ -0,0 +1,127 @@
+"""
+Hooks that receive the timings of each request made with ``OAuthAPIClient``.
+"""
+from urllib.parse import urlsplit
+
+try:
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover
+    trace = None
+
+# How the client got the access token for a request.
+TOKEN_MEMO = 'memo'  # The token held by the client was still valid.
+TOKEN_CACHE_HIT = 'hit'  # The token was found in the token cache.
+TOKEN_CACHE_MISS = 'miss'  # A new token was requested from the auth service.
+
+
+class RequestTimings:
+    """
+    What happened during one call to ``OAuthAPIClient.request``.
+
+    Durations are in seconds, and are None when they don't apply, for example for responses
+    served from the response cache.
+
+    Attributes:
+        method (str): HTTP method of the request.
+        url (str): URL of the request, without the query parameters passed as ``params``.
+        start_time_ns (int): When the request started, in nanoseconds since the epoch.
+        token_cache (str): How the access token was obtained: TOKEN_MEMO, TOKEN_CACHE_HIT or TOKEN_CACHE_MISS.
+        token_seconds (float): Time spent getting the access token, including requesting a new one.
+        ttfb_seconds (float): Time between sending the last attempt and receiving its response headers,
+            which includes opening a connection when none could be reused from the pool. requests
+            doesn't expose DNS, connect and TLS handshake times separately.
+        total_seconds (float): Time spent in ``request``, including the token, retries and reading the body.
+        status_code (int): Status code of the response.
+        response_bytes (int): Size of the decoded response body, or its Content-Length for streamed responses.
+        from_cache (bool): Whether the response came from the response cache.
+        coalesced (bool): Whether the response was shared from an identical request made by another thread.
+        exception (Exception): The error raised by the request, if any.
+
+    """
+
+    def __init__(self, method, url, start_time_ns):
+        self.method = method.upper()
+        self.url = url
+        self.start_time_ns = start_time_ns
+        self.token_cache = None
+        self.token_seconds = None
+        self.ttfb_seconds = None
+        self.total_seconds = None
+        self.status_code = None
+        self.response_bytes = None
+        self.from_cache = False
+        self.coalesced = False
+        self.exception = None
+
+    def record_response(self, response, streamed):
+        self.status_code = response.status_code
+        self.from_cache = getattr(response, 'from_cache', False)
+        if not self.from_cache and not self.coalesced:
+            self.ttfb_seconds = response.elapsed.total_seconds()
+        if not streamed:
+            self.response_bytes = len(response.content)
+        elif response.headers.get('Content-Length', '').isdigit():
+            self.response_bytes = int(response.headers['Content-Length'])
+
+
+class OpenTelemetryHook:
+    """
+    A request hook that records each request as an OpenTelemetry client span.
+
+    The span is a child of the span that is current when the request is made. It requires the
+    ``opentelemetry-api`` package, and a configured tracer provider to export the spans.
+
+    Usage example::
+
+        client = OAuthAPIClient(
+            settings.BACKEND_SERVICE_EDX_OAUTH2_PROVIDER_URL,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_KEY,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_SECRET,
+            request_hooks=[OpenTelemetryHook()],
+        )
+
+    """
+
+    def __init__(self, tracer_provider=None):
+        """
+        Args:
+            tracer_provider (opentelemetry.trace.TracerProvider): The provider of the tracer used to
+                create spans. Defaults to the global tracer provider.
+
+        """
+        if trace is None:
+            raise ImportError('OpenTelemetryHook requires the opentelemetry-api package.')
+        self.tracer = trace.get_tracer(__name__, tracer_provider=tracer_provider)
+
+    def __call__(self, timings):
+        attributes = {
+            'http.request.method': timings.method,
+            'url.full': timings.url,
+            'server.address': urlsplit(timings.url).hostname or '',
+            'edx_rest_api_client.from_cache': timings.from_cache,
+            'edx_rest_api_client.coalesced': timings.coalesced,
+        }
+        optional_attributes = {
+            'http.response.status_code': timings.status_code,
+            'http.response.body.size': timings.response_bytes,
+            'edx_rest_api_client.token_cache': timings.token_cache,
+            'edx_rest_api_client.token_seconds': timings.token_seconds,
+            'edx_rest_api_client.ttfb_seconds': timings.ttfb_seconds,
+        }
+        attributes.update({name: value for name, value in optional_attributes.items() if value is not None})
+        if timings.exception is not None:
+            attributes['error.type'] = type(timings.exception).__qualname__
+        elif timings.status_code is not None and timings.status_code >= 500:
+            attributes['error.type'] = str(timings.status_code)
+
+        span = self.tracer.start_span(
+            timings.method,
+            kind=trace.SpanKind.CLIENT,
+            attributes=attributes,
+            start_time=timings.start_time_ns,
+        )
+        if 'error.type' in attributes:
+            span.set_status(trace.StatusCode.ERROR)
+        if timings.exception is not None:
+            span.record_exception(timings.exception)
+        span.end(end_time=timings.start_time_ns + int(timings.total_seconds * 1e9))
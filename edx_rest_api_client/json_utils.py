@@ -0,0 +1,209 @@
+"""
+JSON decoding for API responses, using a faster decoder when one is installed.
+
+orjson, and otherwise msgspec, decode responses straight from their bytes. Without either of them,
+the standard library's json module is used, like ``requests.Response.json`` does.
+"""
+import codecs
+import json
+
+import requests
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+# Bytes read at a time when streaming a response.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_UTF8_ENCODINGS = frozenset(['utf-8', 'utf8'])
+_WHITESPACE = ' \t\n\r'
+
+
+def _get_fast_decoder():
+    if orjson is not None:
+        return orjson.loads
+    if msgspec is not None:
+        return msgspec.json.decode
+    return None
+
+
+def loads(content):
+    """
+    Decodes a JSON document from bytes or a str.
+
+    Raises:
+        requests.JSONDecodeError if ``content`` isn't valid JSON.
+
+    """
+    fast_decoder = _get_fast_decoder()
+    try:
+        if fast_decoder is not None:
+            return fast_decoder(content)
+        return json.loads(content)
+    except ValueError as error:
+        # orjson and json raise json.JSONDecodeError, msgspec raises a ValueError without a position.
+        raise requests.JSONDecodeError(
+            getattr(error, 'msg', str(error)), getattr(error, 'doc', ''), getattr(error, 'pos', 0),
+        ) from error
+
+
+def decode_response(response):
+    """
+    Returns the decoded JSON body of ``response``, like ``response.json()`` but faster for large bodies.
+
+    Bodies that are declared or detected as UTF-8 are decoded straight from their bytes, without first
+    building a str. Others fall back to ``response.json()``, which handles their encoding.
+
+    Raises:
+        requests.JSONDecodeError if the body isn't valid JSON.
+
+    """
+    content = response.content
+    encoding = (response.encoding or 'utf-8').lower()
+    # A byte order mark, or nul bytes among the first characters, mean the body is UTF-16 or UTF-32.
+    if encoding not in _UTF8_ENCODINGS or content[:3] == codecs.BOM_UTF8 or b'\x00' in content[:4]:
+        return response.json()
+    return loads(content)
+
+
+class _StreamingDecoder:
+    """
+    Incrementally decodes JSON values from the text of a response, as it is read.
+    """
+
+    def __init__(self, response, chunk_size):
+        encoding = response.encoding or 'utf-8'
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._chunks = response.iter_content(chunk_size=chunk_size)
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._position = 0
+        self._exhausted = False
+
+    def _read(self):
+        """
+        Appends the next chunk of the body to the buffer, and returns False at the end of the body.
+        """
+        if self._exhausted:
+            return False
+        # Drop what has already been decoded, so the buffer only holds the value being decoded.
+        self._buffer = self._buffer[self._position:]
+        self._position = 0
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._exhausted = True
+            self._buffer += self._decoder.decode(b'', final=True)
+        else:
+            self._buffer += self._decoder.decode(chunk)
+        return True
+
+    def _error(self, message):
+        return requests.JSONDecodeError(message, self._buffer, self._position)
+
+    def next_char(self):
+        """
+        Skips whitespace, and returns the next character without consuming it, or '' at the end of the body.
+        """
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in _WHITESPACE:
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read():
+                return ''
+
+    def expect(self, expected):
+        char = self.next_char()
+        if char not in expected:
+            raise self._error('Expecting one of {!r}'.format(expected))
+        self._position += 1
+        return char
+
+    def value(self):
+        """
+        Decodes the next JSON value.
+
+        A value is only decoded once the character that follows it has been read, so that a number
+        split between chunks isn't decoded from its first digits.
+        """
+        self.next_char()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError as error:
+                if not self._read():
+                    raise requests.JSONDecodeError(error.msg, error.doc, error.pos) from error
+                continue
+            if end < len(self._buffer) or self._exhausted:
+                self._position = end
+                return value
+            self._read()
+
+
+def iter_json_items(response, key='results', metadata=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yields the items of the ``key`` array of a JSON object as they are read from a streamed response.
+
+    Only one item is held in memory at a time, so the response can be much larger than the memory
+    it would take to decode it at once. Make the request with ``stream=True``. If the response is a
+    JSON array rather than an object, its items are yielded.
+
+    Usage example::
+
+        response = client.get(url, stream=True)
+        response.raise_for_status()
+        page = {}
+        for item in iter_json_items(response, metadata=page):
+            process(item)
+        next_url = page['next']
+
+    Args:
+        response (requests.Response): The response to decode.
+        key (str): The member of the top-level object holding the array of items.
+        metadata (dict): If given, the other members of the top-level object are added to it as they
+            are read. Members that follow the array are only added once all the items have been yielded.
+        chunk_size (int): Bytes read from the response at a time.
+
+    Raises:
+        requests.JSONDecodeError if the body isn't valid JSON, or isn't an object or an array.
+
+    """
+    decoder = _StreamingDecoder(response, chunk_size)
+    if decoder.expect('{[') == '[':
+        yield from _iter_array_items(decoder)
+        return
+
+    if decoder.next_char() == '}':
+        return
+    while True:
+        member = decoder.value()
+        decoder.expect(':')
+        if member == key and decoder.next_char() == '[':
+            decoder.expect('[')
+            yield from _iter_array_items(decoder)
+        else:
+            value = decoder.value()
+            if metadata is not None:
+                metadata[member] = value
+        if decoder.expect(',}') == '}':
+            return
+
+
+def _iter_array_items(decoder):
+    """
+    Yields the items of an array whose opening bracket has been consumed.
+    """
+    if decoder.next_char() == ']':
+        decoder.expect(']')
+        return
+    while True:
+        yield decoder.value()
+        if decoder.expect(',]') == ']':
+            return
@@ -0,0 +1,86 @@
+"""
+Propagation of the headers of the Django request being handled, like ``X-Request-ID``, to API requests.
+
+The headers are read from the inbound request once, and the snapshot is kept for as long as the request
+lives. A view that makes thousands of API calls then doesn't look them up, or build a new mapping of
+them, for each call.
+"""
+import threading
+import types
+import weakref
+
+from edx_rest_api_client.django_support import get_current_request, set_custom_attribute
+
+# Headers of the current Django request that ``OAuthAPIClient`` sends along with its requests by default.
+DEFAULT_PROPAGATED_HEADERS = ('X-Request-ID',)
+
+NO_HEADERS = types.MappingProxyType({})
+
+# The contexts of each inbound request, by the names of the headers they propagate.
+_CONTEXTS = weakref.WeakKeyDictionary()
+_CONTEXTS_LOCK = threading.Lock()
+
+
+class PropagationContext:
+    """
+    What is propagated from one inbound request to the API requests made while handling it.
+
+    Attributes:
+        headers (Mapping): The propagated headers that the inbound request has. The mapping can't be
+            changed, so it can be passed on to every API request without copying it.
+
+    """
+
+    def __init__(self, headers):
+        self.headers = types.MappingProxyType(headers) if headers else NO_HEADERS
+        self._custom_attributes = set()
+
+    def set_custom_attribute(self, key, value):
+        """
+        Sets a custom attribute on the monitoring transaction of the inbound request, unless it is already set.
+        """
+        if (key, value) not in self._custom_attributes:
+            self._custom_attributes.add((key, value))
+            set_custom_attribute(key, value)
+
+
+def _read_headers(request, header_names):
+    request_headers = request.headers
+    if request_headers is None:
+        return {}
+    headers = {}
+    for name in header_names:
+        value = request_headers.get(name)
+        if value is not None:
+            headers[name] = value
+    return headers
+
+
+def get_propagation_context(header_names=DEFAULT_PROPAGATED_HEADERS):
+    """
+    Returns the PropagationContext of the Django request handled by the current thread, or None outside of one.
+
+    Args:
+        header_names (tuple(str)): The headers to propagate from the inbound request.
+
+    """
+    request = get_current_request()
+    if request is None:
+        return None
+    request_contexts = _CONTEXTS.get(request)
+    context = request_contexts.get(header_names) if request_contexts is not None else None
+    if context is None:
+        with _CONTEXTS_LOCK:
+            request_contexts = _CONTEXTS.setdefault(request, {})
+            context = request_contexts.get(header_names)
+            if context is None:
+                context = request_contexts[header_names] = PropagationContext(_read_headers(request, header_names))
+    return context
+
+
+def get_propagated_headers(header_names=DEFAULT_PROPAGATED_HEADERS):
+    """
+    Returns a read-only mapping of the ``header_names`` headers of the Django request being handled.
+    """
+    context = get_propagation_context(header_names)
+    return context.headers if context is not None else NO_HEADERS
@@ -0,0 +1,290 @@
+"""
+A client-side rate limiter that keeps ``OAuthAPIClient`` within the request rate of upstream services.
+"""
+import math
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from edx_rest_api_client.django_support import get_django_cache, set_custom_attribute
+from edx_rest_api_client.exceptions import RateLimitedError
+from edx_rest_api_client.retry import get_retry_after
+
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _normalize_host(netloc, scheme=None):
+    """
+    Returns ``netloc`` as a lowercase host, with its port unless it is the default port of ``scheme``.
+
+    Without a scheme, both the HTTP and the HTTPS default ports are dropped.
+    """
+    parts = urlsplit('//' + netloc)
+    host = parts.hostname or ''
+    if ':' in host:
+        host = '[{}]'.format(host)
+    default_ports = _DEFAULT_PORTS.values() if scheme is None else [_DEFAULT_PORTS.get(scheme)]
+    if parts.port is not None and parts.port not in default_ports:
+        host = '{}:{}'.format(host, parts.port)
+    return host
+
+
+def _normalize_url(url):
+    """
+    Returns ``url`` with its scheme and host normalized, so that it matches the prefixes of the limits.
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    return urlunsplit((scheme, _normalize_host(parts.netloc, scheme), parts.path, parts.query, parts.fragment))
+
+
+class RateLimit:
+    """
+    The limits on the requests made to one destination.
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None):
+        """
+        Args:
+            rate (float): Requests per second. If None, the rate isn't limited.
+            burst (int): How many requests can be made at once after the destination has been idle.
+                Defaults to ``rate``, or 1 for rates below one request per second.
+            max_in_flight (int): How many requests may wait for their response at the same time, in
+                each process. If None, the number of concurrent requests isn't limited.
+
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError('rate must be positive.')
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError('max_in_flight must be at least 1.')
+        self.rate = rate
+        self.burst = burst or max(1, int(rate or 1))
+        self.max_in_flight = max_in_flight
+
+
+class _Destination:
+    """
+    The state of the limits for one destination.
+    """
+
+    def __init__(self, key, limit):
+        self.key = key
+        self.limit = limit
+        self.lock = threading.Lock()
+        # The token bucket. Tokens go negative when requests reserve tokens that haven't been added yet.
+        self.tokens = limit.burst
+        self.updated_at = time.monotonic()
+        # The fraction of the rate currently allowed, lowered when the destination responds with 429.
+        self.rate_factor = 1.0
+        self.paused_until = 0.0
+        self.in_flight = threading.BoundedSemaphore(limit.max_in_flight) if limit.max_in_flight else None
+
+
+class RateLimiter:
+    """
+    Limits the rate and concurrency of the requests made to each destination.
+
+    Each request waits for a token from the token bucket of its destination, and for one of its
+    ``max_in_flight`` slots, before it is sent. Destinations are hosts, like ``'api.example.com'``,
+    or URL prefixes, like ``'https://api.example.com/api/enrollment/'``. A request uses the longest
+    prefix matching its URL, then its host, then ``default``, which gives each other host its own limits.
+    Hosts are compared without case and without the default port of the scheme, so ``'api.example.com'``
+    and ``'api.example.com:443'`` both match ``https://api.example.com/`` and ``https://api.example.com:443/``.
+
+    When a destination responds with ``429 Too Many Requests``, its requests are paused for as long
+    as the ``Retry-After`` header asks, and its rate is halved. The rate then recovers gradually with
+    each response that isn't a 429.
+
+    Usage example::
+
+        client = OAuthAPIClient(
+            settings.BACKEND_SERVICE_EDX_OAUTH2_PROVIDER_URL,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_KEY,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_SECRET,
+            rate_limiter=RateLimiter({
+                'https://courses.example.com/api/enrollment/': RateLimit(rate=20, max_in_flight=4),
+                'discovery.example.com': RateLimit(rate=50),
+            }, shared=True),
+        )
+
+    With ``shared=True``, the rates and pauses are shared through the Django cache by every process
+    using it, so that together they stay within the limits. The Django cache must then be shared
+    between processes, like memcached or redis. Shared rates are counted in fixed windows of
+    ``burst / rate`` seconds, so they can briefly reach twice the rate where two windows meet.
+    ``max_in_flight`` always applies to each process separately.
+
+    A single limiter can be shared by several clients, so that they share the limits.
+    """
+
+    # How long requests are paused after a 429 response without a usable Retry-After header.
+    DEFAULT_THROTTLED_SECONDS = 1
+    # How much of the rate is lost with each 429 response, and regained with each other response.
+    RATE_DECREASE_FACTOR = 0.5
+    RATE_INCREASE_STEP = 0.05
+    MIN_RATE_FACTOR = 0.05
+
+    def __init__(self, limits=None, default=None, shared=False, max_wait_seconds=None,
+                 cache_key_prefix='edx_rest_api_client.rate_limit'):
+        """
+        Args:
+            limits (dict): Maps hosts and URL prefixes to their ``RateLimit``.
+            default (RateLimit): The limits of each host that isn't in ``limits``. If None, requests to
+                other hosts aren't limited.
+            shared (bool): Whether to share the rates and pauses between processes through the Django cache.
+            max_wait_seconds (float): If set, requests that would wait longer than this for their limits
+                raise ``RateLimitedError`` instead. By default requests wait as long as needed.
+            cache_key_prefix (str): Prefix of the Django cache keys used when ``shared`` is True.
+
+        """
+        self.limits = {
+            _normalize_url(key) if '://' in key else _normalize_host(key): limit
+            for key, limit in (limits or {}).items()
+        }
+        self.default = default
+        self.shared = shared
+        self.max_wait_seconds = max_wait_seconds
+        self.cache_key_prefix = cache_key_prefix
+        # Longest first, so that the most specific prefix matches.
+        self._prefixes = sorted((key for key in self.limits if '://' in key), key=len, reverse=True)
+        self._destinations = {}
+        self._lock = threading.Lock()
+
+    def _get_destination(self, url):
+        """
+        Returns the destination that ``url`` belongs to, or None if its requests aren't limited.
+        """
+        url = _normalize_url(url)
+        key = next((prefix for prefix in self._prefixes if url.startswith(prefix)), None)
+        if key is None:
+            key = _normalize_host(urlsplit(url).netloc)
+            if key not in self.limits and self.default is None:
+                return None
+        destination = self._destinations.get(key)
+        if destination is None:
+            with self._lock:
+                destination = self._destinations.get(key)
+                if destination is None:
+                    limit = self.limits.get(key, self.default)
+                    destination = self._destinations[key] = _Destination(key, limit)
+        return destination
+
+    def call(self, url, send):
+        """
+        Makes a request to ``url`` with ``send`` once its limits allow it, and adapts them to the response.
+
+        Raises:
+            RateLimitedError if the request would have to wait longer than ``max_wait_seconds``.
+
+        Returns:
+            requests.Response: The response returned by ``send``.
+
+        """
+        destination = self._get_destination(url)
+        if destination is None:
+            return send()
+
+        start = time.monotonic()
+        if destination.in_flight is not None:
+            if not destination.in_flight.acquire(timeout=self.max_wait_seconds):
+                raise RateLimitedError(destination.key)
+        try:
+            if self.shared:
+                self._wait_for_shared_token(destination, start)
+            else:
+                self._wait_for_token(destination, start)
+            waited_seconds = time.monotonic() - start
+            if waited_seconds >= 0.001:
+                set_custom_attribute('api_client_rate_limit_wait_seconds', waited_seconds)
+            response = send()
+        finally:
+            if destination.in_flight is not None:
+                destination.in_flight.release()
+
+        self._record_response(destination, response)
+        return response
+
+    def _get_max_delay(self, start):
+        if self.max_wait_seconds is None:
+            return math.inf
+        return self.max_wait_seconds - (time.monotonic() - start)
+
+    def _wait_for_token(self, destination, start):
+        """
+        Takes a token from the destination's bucket, waiting until one is added if it is empty.
+        """
+        limit = destination.limit
+        with destination.lock:
+            now = time.monotonic()
+            delay = destination.paused_until - now
+            if limit.rate is not None:
+                rate = limit.rate * destination.rate_factor
+                destination.tokens = min(limit.burst, destination.tokens + (now - destination.updated_at) * rate)
+                destination.updated_at = now
+                # Reserve a token now, so that waiting requests are let through in order.
+                destination.tokens -= 1
+                delay = max(delay, -destination.tokens / rate)
+            if delay > self._get_max_delay(start):
+                if limit.rate is not None:
+                    destination.tokens += 1
+                raise RateLimitedError(destination.key)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _wait_for_shared_token(self, destination, start):
+        """
+        Counts a request in the current window of the destination in the Django cache, waiting for a
+        later window if the current one is full.
+        """
+        limit = destination.limit
+        django_cache = get_django_cache()
+        pause_key = self._get_pause_key(destination)
+        while True:
+            now = time.time()
+            delay = max((django_cache.get(pause_key) or 0) - now, destination.paused_until - time.monotonic())
+            if delay <= 0:
+                if limit.rate is None:
+                    return
+                window_seconds = limit.burst / limit.rate
+                window = int(now // window_seconds)
+                if self._count_request(destination, window, window_seconds):
+                    return
+                delay = (window + 1) * window_seconds - now
+            if delay > self._get_max_delay(start):
+                raise RateLimitedError(destination.key)
+            time.sleep(delay)
+
+    def _count_request(self, destination, window, window_seconds):
+        """
+        Counts a request in ``window``, and returns whether the window allows it.
+        """
+        django_cache = get_django_cache()
+        window_key = '{}.{}.{}'.format(self.cache_key_prefix, destination.key, window)
+        django_cache.add(window_key, 0, math.ceil(window_seconds) + 1)
+        try:
+            count = django_cache.incr(window_key)
+        except ValueError:
+            # The window expired between add and incr, or the cache doesn't keep values. Rather than
+            # holding requests back on a broken cache, let them through.
+            return True
+        return count <= max(1, int(destination.limit.burst * destination.rate_factor))
+
+    def _get_pause_key(self, destination):
+        return '{}.{}.paused_until'.format(self.cache_key_prefix, destination.key)
+
+    def _record_response(self, destination, response):
+        """
+        Slows down requests to the destination after a 429 response, and speeds them back up after others.
+        """
+        with destination.lock:
+            if response.status_code != 429:
+                destination.rate_factor = min(1.0, destination.rate_factor + self.RATE_INCREASE_STEP)
+                return
+            destination.rate_factor = max(self.MIN_RATE_FACTOR, destination.rate_factor * self.RATE_DECREASE_FACTOR)
+            retry_after = get_retry_after(response)
+            delay = self.DEFAULT_THROTTLED_SECONDS if retry_after is None else retry_after
+            destination.paused_until = max(destination.paused_until, time.monotonic() + delay)
+
+        set_custom_attribute('api_client_rate_limit_throttled', destination.key)
+        if self.shared and delay > 0:
+            get_django_cache().set(self._get_pause_key(destination), time.time() + delay, math.ceil(delay) + 1)
@@ -0,0 +1,277 @@
+"""
+An HTTP cache for the responses to GET requests made with ``OAuthAPIClient``.
+"""
+import collections
+import email.utils
+import hashlib
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Headers that describe the encoding of the body on the wire. They are dropped from cached responses,
+# because the cached body has already been decoded.
+_WIRE_HEADERS = frozenset(['content-encoding', 'content-length', 'transfer-encoding'])
+# Request headers that responses may vary on without it mattering to the cache: cached bodies are decoded,
+# and cached responses are only shared between requests made with the same client id.
+_IGNORED_VARY_HEADERS = frozenset(['accept-encoding', 'authorization'])
+
+
+class LRUResponseCacheBackend:
+    """
+    Stores cached responses in the memory of the current process.
+
+    Once the cached bodies take up more than ``max_bytes``, the least recently used responses are evicted.
+    """
+
+    def __init__(self, max_bytes=10 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            entry, expires_at = item
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, timeout):
+        size = len(entry['content'])
+        with self._lock:
+            if key in self._entries:
+                # Even a newer response that is too large to store replaces the older one.
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (entry, time.monotonic() + timeout)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key):
+        entry, _ = self._entries.pop(key)
+        self._size -= len(entry['content'])
+
+
+class TieredCacheResponseBackend:
+    """
+    Stores cached responses in the ``TieredCache``, so that they are shared through the Django cache.
+    """
+
+    def get(self, key):
+        from edx_django_utils.cache import TieredCache  # pylint: disable=import-outside-toplevel
+        cached_response = TieredCache.get_cached_response(key)
+        return cached_response.value if cached_response.is_found else None
+
+    def set(self, key, entry, timeout):
+        from edx_django_utils.cache import TieredCache  # pylint: disable=import-outside-toplevel
+        TieredCache.set_all_tiers(key, entry, timeout)
+
+    def delete(self, key):
+        from edx_django_utils.cache import TieredCache  # pylint: disable=import-outside-toplevel
+        TieredCache.delete_all_tiers(key)
+
+
+def _parse_cache_control(value):
+    """
+    Returns the directives of a ``Cache-Control`` header as a dict of lowercase names to values.
+    """
+    directives = {}
+    for directive in (value or '').split(','):
+        name, _, directive_value = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = directive_value.strip('"') or None
+    return directives
+
+
+class ResponseCache:
+    """
+    Caches the responses to GET requests, following HTTP caching rules.
+
+    A response is stored if its status is 200, it doesn't have ``Cache-Control: no-store`` or
+    ``Vary: *``, and it either has a freshness lifetime (``max-age`` or ``Expires``) or a validator
+    (``ETag`` or ``Last-Modified``). Fresh responses are returned without making a request. Stale
+    responses with a validator are revalidated with a conditional request, and reused if the
+    server answers ``304 Not Modified``. Responses with a ``Vary`` header are only reused for requests
+    with the same values of the headers it names, like ``X-Tenant-ID``.
+
+    Cached responses are keyed by the client id, so clients with different credentials never
+    share them. Responses served from the cache have a ``from_cache`` attribute set to True, and
+    no ``request``.
+
+    Usage example::
+
+        client = OAuthAPIClient(
+            settings.BACKEND_SERVICE_EDX_OAUTH2_PROVIDER_URL,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_KEY,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_SECRET,
+            response_cache=ResponseCache(LRUResponseCacheBackend(max_bytes=50 * 1024 * 1024)),
+        )
+
+    """
+
+    DEFAULT_KEY_HEADERS = ('Accept', 'Accept-Language')
+
+    def __init__(self, backend, revalidation_timeout=3600, key_headers=DEFAULT_KEY_HEADERS):
+        """
+        Args:
+            backend: Where responses are stored, such as ``LRUResponseCacheBackend`` or
+                ``TieredCacheResponseBackend``.
+            revalidation_timeout (int): How long in seconds to keep stale responses with a validator, so
+                that they can be revalidated.
+            key_headers (iterable(str)): Request headers whose values are part of the cache key.
+
+        """
+        self.backend = backend
+        self.revalidation_timeout = revalidation_timeout
+        self.key_headers = tuple(key_headers)
+
+    def get_key(self, client_id, url, headers):
+        """
+        Returns the cache key for a GET of ``url`` (including its query string) by ``client_id``.
+        """
+        headers = CaseInsensitiveDict(headers or {})
+        key_parts = [url] + ['{}={}'.format(name.lower(), headers.get(name, '')) for name in self.key_headers]
+        digest = hashlib.sha256('\n'.join(key_parts).encode('utf-8')).hexdigest()
+        return 'edx_rest_api_client.response.{}.{}'.format(client_id, digest)
+
+    def get(self, key):
+        """
+        Returns the cache entry stored at ``key``, or None.
+        """
+        return self.backend.get(key)
+
+    @staticmethod
+    def matches(entry, request_headers):
+        """
+        Returns whether ``entry`` can be used for a request with ``request_headers``, given its ``Vary`` header.
+        """
+        request_headers = CaseInsensitiveDict(request_headers or {})
+        return all(request_headers.get(name) == value for name, value in entry.get('vary', {}).items())
+
+    @staticmethod
+    def is_fresh(entry):
+        return entry['fresh_until'] is not None and time.time() < entry['fresh_until']
+
+    @staticmethod
+    def get_conditional_headers(entry):
+        """
+        Returns the headers that ask the server whether ``entry`` is still valid.
+        """
+        headers = {}
+        if entry['headers'].get('ETag'):
+            headers['If-None-Match'] = entry['headers']['ETag']
+        if entry['headers'].get('Last-Modified'):
+            headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+        return headers
+
+    def store(self, key, response):
+        """
+        Stores ``response`` at ``key``, if it is cacheable.
+        """
+        if response.status_code != 200:
+            return
+        entry = {
+            'status_code': response.status_code,
+            'reason': response.reason,
+            'url': response.url,
+            'encoding': response.encoding,
+            'headers': {
+                name: value for name, value in response.headers.items() if name.lower() not in _WIRE_HEADERS
+            },
+            'content': response.content,
+            'vary': self._get_vary_values(response),
+        }
+        self._store_entry(key, entry, response.headers)
+
+    def update(self, key, entry, not_modified_response):
+        """
+        Refreshes ``entry`` with the headers of a ``304 Not Modified`` response, and returns the updated entry.
+        """
+        headers = CaseInsensitiveDict(entry['headers'])
+        for name, value in not_modified_response.headers.items():
+            if name.lower() not in _WIRE_HEADERS:
+                headers[name] = value
+        entry = dict(entry, headers=dict(headers))
+        if 'Vary' in not_modified_response.headers:
+            entry['vary'] = self._get_vary_values(not_modified_response)
+        self._store_entry(key, entry, headers)
+        return entry
+
+    @staticmethod
+    def _get_vary_values(response):
+        """
+        Returns the values the request of ``response`` had for the headers named by its ``Vary`` header.
+        """
+        request_headers = response.request.headers if response.request is not None else {}
+        vary_values = {}
+        for name in response.headers.get('Vary', '').split(','):
+            name = name.strip().lower()
+            if name and name not in _IGNORED_VARY_HEADERS:
+                vary_values[name] = request_headers.get(name)
+        return vary_values
+
+    def _store_entry(self, key, entry, headers):
+        cache_control = _parse_cache_control(headers.get('Cache-Control'))
+        if 'no-store' in cache_control or headers.get('Vary', '').strip() == '*':
+            self.backend.delete(key)
+            return
+
+        freshness_lifetime = self._get_freshness_lifetime(cache_control, headers)
+        has_validator = bool(headers.get('ETag') or headers.get('Last-Modified'))
+        if not freshness_lifetime and not has_validator:
+            self.backend.delete(key)
+            return
+
+        entry['fresh_until'] = time.time() + freshness_lifetime if freshness_lifetime else None
+        timeout = max(freshness_lifetime, self.revalidation_timeout if has_validator else 0)
+        self.backend.set(key, entry, timeout)
+
+    @staticmethod
+    def _get_freshness_lifetime(cache_control, headers):
+        """
+        Returns for how many seconds a response with the given headers may be used without revalidation.
+        """
+        if 'no-cache' in cache_control:
+            return 0
+        if cache_control.get('max-age') is not None:
+            try:
+                return max(int(cache_control['max-age']), 0)
+            except ValueError:
+                return 0
+        if headers.get('Expires'):
+            try:
+                expires = email.utils.parsedate_to_datetime(headers['Expires'])
+            except (TypeError, ValueError):
+                return 0
+            return max(int(expires.timestamp() - time.time()), 0)
+        return 0
+
+    @staticmethod
+    def build_response(entry):
+        """
+        Returns a new :class:`requests.Response` for the cache entry.
+        """
+        response = requests.Response()
+        response.status_code = entry['status_code']
+        response.reason = entry['reason']
+        response.url = entry['url']
+        response.encoding = entry['encoding']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['content']  # pylint: disable=protected-access
+        response._content_consumed = True  # pylint: disable=protected-access
+        response.from_cache = True
+        return response
@@ -0,0 +1,161 @@
+"""
+Retrying of failed requests made by ``OAuthAPIClient`` and the access token helpers.
+"""
+import datetime
+import email.utils
+import random
+import time
+
+import requests
+
+from edx_rest_api_client.django_support import set_custom_attribute
+
+
+def get_retry_after(response):
+    """
+    Returns the delay in seconds requested by the ``Retry-After`` header of ``response``, or None.
+    """
+    retry_after = response.headers.get('Retry-After')
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max((retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0)
+
+
+class RetryPolicy:
+    """
+    Describes when and how failed requests are retried.
+
+    Requests are retried after connection errors, timeouts and responses with a status code in
+    ``status_forcelist``. Only requests using one of ``allowed_methods`` are retried, except for
+    connection timeouts, where the request is known not to have been sent.
+
+    Retries wait with exponential backoff and full jitter: before retry ``n`` (counting from 0),
+    a random delay between 0 and ``min(backoff_max, backoff_factor * 2 ** n)`` seconds. If the
+    response has a ``Retry-After`` header, that delay is used instead. A response asking to wait
+    longer than ``backoff_max`` is returned rather than retried.
+
+    Usage example::
+
+        client = OAuthAPIClient(
+            settings.BACKEND_SERVICE_EDX_OAUTH2_PROVIDER_URL,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_KEY,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_SECRET,
+            retry=RetryPolicy(total=3, deadline=10),
+        )
+
+    """
+
+    DEFAULT_ALLOWED_METHODS = frozenset(['DELETE', 'GET', 'HEAD', 'OPTIONS', 'PUT', 'TRACE'])
+    DEFAULT_STATUS_FORCELIST = frozenset([429, 502, 503, 504])
+
+    def __init__(self, total=3, backoff_factor=0.5, backoff_max=30,
+                 status_forcelist=DEFAULT_STATUS_FORCELIST, allowed_methods=DEFAULT_ALLOWED_METHODS,
+                 respect_retry_after=True, deadline=None):
+        """
+        Args:
+            total (int): Maximum number of retries for a single call.
+            backoff_factor (float): Base delay in seconds for the exponential backoff.
+            backoff_max (float): Longest delay in seconds before a retry.
+            status_forcelist (iterable(int)): Response status codes that should be retried.
+            allowed_methods (iterable(str)): HTTP methods that are safe to retry, usually the idempotent ones.
+            respect_retry_after (bool): Whether to wait as long as a ``Retry-After`` response header asks.
+            deadline (float): If set, the longest time in seconds a call may take, including retries. No
+                retry is made if it couldn't start before the deadline.
+
+        """
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.status_forcelist = frozenset(status_forcelist)
+        self.allowed_methods = frozenset(method.upper() for method in allowed_methods)
+        self.respect_retry_after = respect_retry_after
+        self.deadline = deadline
+
+    def is_retryable_method(self, method):
+        return method.upper() in self.allowed_methods
+
+    def get_backoff(self, retry_number):
+        """
+        Returns the delay in seconds before retry ``retry_number``, counting from 0.
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** retry_number)))
+
+    def get_retry_after(self, response):
+        """
+        Returns the delay in seconds requested by the ``Retry-After`` header of ``response``, or None.
+        """
+        return get_retry_after(response)
+
+    def _get_exception_delay(self, exception, retry_number, retry_any_method):
+        if isinstance(exception, requests.exceptions.ConnectTimeout):
+            # The request never reached the server, so it is safe to retry whatever the method.
+            return self.get_backoff(retry_number)
+        if retry_any_method and isinstance(exception, (requests.ConnectionError, requests.Timeout)):
+            return self.get_backoff(retry_number)
+        return None
+
+    def _get_response_delay(self, response, retry_number):
+        if response.status_code not in self.status_forcelist:
+            return None
+        if self.respect_retry_after:
+            retry_after = self.get_retry_after(response)
+            if retry_after is not None:
+                return retry_after if retry_after <= self.backoff_max else None
+        return self.get_backoff(retry_number)
+
+    def call(self, send, method, always_retryable=False, monitoring_attribute='api_client_retries'):
+        """
+        Calls ``send`` until it returns a response that shouldn't be retried, or retries run out.
+
+        Args:
+            send (callable): Makes the request, returning a :class:`requests.Response`.
+            method (str): HTTP method of the request.
+            always_retryable (bool): Retry the request even if ``method`` isn't one of ``allowed_methods``.
+            monitoring_attribute (str): Name of the custom attribute that records the number of retries.
+
+        Raises:
+            requests.RequestException from the last attempt, if it failed.
+
+        Returns:
+            requests.Response: The response of the last attempt.
+
+        """
+        retry_any_method = always_retryable or self.is_retryable_method(method)
+        start_time = time.monotonic()
+        retry_number = 0
+        try:
+            while True:
+                try:
+                    response = send()
+                except requests.RequestException as exception:
+                    delay = None
+                    if retry_number < self.total:
+                        delay = self._get_exception_delay(exception, retry_number, retry_any_method)
+                    if delay is None or not self._is_before_deadline(start_time, delay):
+                        raise
+                else:
+                    if retry_number >= self.total or not retry_any_method:
+                        return response
+                    delay = self._get_response_delay(response, retry_number)
+                    if delay is None or not self._is_before_deadline(start_time, delay):
+                        return response
+                    # Release the connection back to the pool before waiting.
+                    response.close()
+
+                time.sleep(delay)
+                retry_number += 1
+        finally:
+            set_custom_attribute(monitoring_attribute, retry_number)
+
+    def _is_before_deadline(self, start_time, delay):
+        return self.deadline is None or time.monotonic() + delay < start_time + self.deadline
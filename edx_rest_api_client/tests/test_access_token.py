@@ -0,0 +1,194 @@
+import datetime
+import pickle
+import time
+from unittest import TestCase, mock
+
+import jwt
+import responses
+from edx_django_utils.cache import TieredCache
+
+from edx_rest_api_client.access_token import AccessToken, get_jwt_expiration
+from edx_rest_api_client.client import OAuthAPIClient, get_and_cache_oauth_access_token
+from edx_rest_api_client.tests.mixins import AuthenticationTestMixin
+
+URL = 'http://testing.test'
+OAUTH_URL = URL + '/oauth2/access_token'
+CACHE_KEY = 'edx_rest_api_client.access_token.jwt.client_credentials.client_id.{}'.format(OAUTH_URL)
+
+
+def _encode_jwt(**claims):
+    return jwt.encode(claims, 'secret', algorithm='HS256')
+
+
+class AccessTokenTests(TestCase):
+    """
+    Tests for AccessToken
+    """
+
+    def test_tuple(self):
+        expiration = datetime.datetime.utcnow() + datetime.timedelta(seconds=60)
+        access_token = AccessToken('abcd', expiration)
+
+        token, expires_at = access_token
+        self.assertEqual((token, expires_at), ('abcd', expiration))
+        self.assertEqual(access_token, ('abcd', expiration))
+        self.assertAlmostEqual(access_token.remaining_seconds(), 60, delta=1)
+
+    def test_expiry_skew(self):
+        access_token = AccessToken.from_expires_in('abcd', 10, datetime.datetime.utcnow(), time.monotonic())
+
+        self.assertEqual(access_token.get_expiry_skew(30), 5)
+        self.assertEqual(access_token.get_expiry_skew(2), 2)
+
+    def test_expiry_skew_from_jwt(self):
+        now = int(time.time())
+        expiration = datetime.datetime.utcnow() + datetime.timedelta(seconds=10)
+
+        jwt_token = AccessToken(_encode_jwt(iat=now, exp=now + 10), expiration)
+        opaque_token = AccessToken('abcd', expiration)
+
+        self.assertEqual(jwt_token.get_expiry_skew(30), 5)
+        self.assertEqual(opaque_token.get_expiry_skew(30), 30)
+
+    def test_wall_clock_jump(self):
+        """
+        Test that validity follows the monotonic clock, not the wall clock
+        """
+        access_token = AccessToken.from_expires_in('abcd', 60, datetime.datetime.utcnow(), time.monotonic())
+
+        with mock.patch('edx_rest_api_client.access_token.datetime') as mock_datetime:
+            mock_datetime.datetime.utcnow.return_value = datetime.datetime.utcnow() + datetime.timedelta(hours=2)
+            self.assertTrue(access_token.is_valid(min_remaining_seconds=5))
+
+        with mock.patch('edx_rest_api_client.access_token.time.monotonic', return_value=time.monotonic() + 56):
+            self.assertFalse(access_token.is_valid(min_remaining_seconds=5))
+
+    def test_lifetime_counted_from_request(self):
+        requested_at = datetime.datetime(2030, 1, 1)
+
+        access_token = AccessToken.from_expires_in('abcd', 2 * 24 * 3600, requested_at, time.monotonic() - 10)
+
+        self.assertEqual(access_token.expires_at, datetime.datetime(2030, 1, 3))
+        self.assertAlmostEqual(access_token.remaining_seconds(), 2 * 24 * 3600 - 10, delta=1)
+
+    def test_jwt_expiration(self):
+        requested_at = datetime.datetime(2030, 1, 1)
+        exp = datetime.datetime(2030, 1, 1, 0, 1)
+        token = _encode_jwt(exp=exp)
+
+        access_token = AccessToken.from_expires_in(token, 3600, requested_at, time.monotonic())
+
+        self.assertEqual(access_token.expires_at, exp)
+        self.assertAlmostEqual(access_token.remaining_seconds(), 60, delta=1)
+
+    def test_later_jwt_expiration_ignored(self):
+        requested_at = datetime.datetime(2030, 1, 1)
+        token = _encode_jwt(exp=datetime.datetime(2030, 1, 2))
+
+        access_token = AccessToken.from_expires_in(token, 3600, requested_at, time.monotonic())
+
+        self.assertEqual(access_token.expires_at, datetime.datetime(2030, 1, 1, 1))
+
+    def test_get_jwt_expiration(self):
+        self.assertEqual(get_jwt_expiration(_encode_jwt(exp=1893456000)), datetime.datetime(2030, 1, 1))
+        self.assertIsNone(get_jwt_expiration(_encode_jwt(sub='service')))
+        self.assertIsNone(get_jwt_expiration(_encode_jwt(exp='soon')))
+        self.assertIsNone(get_jwt_expiration('opaque-bearer-token'))
+
+    def test_pickle(self):
+        """
+        Test that the monotonic deadline isn't carried over to other processes
+        """
+        expiration = datetime.datetime.utcnow() + datetime.timedelta(seconds=60)
+        access_token = AccessToken('abcd', expiration, monotonic_deadline=time.monotonic() + 10)
+
+        unpickled = pickle.loads(pickle.dumps(access_token))
+
+        self.assertEqual(unpickled, access_token)
+        self.assertAlmostEqual(unpickled.remaining_seconds(), 60, delta=1)
+
+
+class TokenLifetimeTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for caching access tokens for their whole lifetime
+    """
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+
+    @responses.activate
+    def test_long_lived_token(self):
+        """
+        Test that a token valid for days is cached for days, not for the seconds part of its lifetime
+        """
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'abcd', 'expires_in': 2 * 24 * 3600 + 30})
+
+        with mock.patch.object(TieredCache, 'set_all_tiers', wraps=TieredCache.set_all_tiers) as mock_set:
+            get_and_cache_oauth_access_token(URL, 'client_id', 'secret')
+            get_and_cache_oauth_access_token(URL, 'client_id', 'secret')
+
+        self.assertAlmostEqual(mock_set.call_args.args[2], 2 * 24 * 3600 + 25, delta=1)
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_jwt_expiration_shortens_cache(self):
+        exp = datetime.datetime.utcnow() + datetime.timedelta(seconds=60)
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': _encode_jwt(exp=exp), 'expires_in': 3600})
+
+        with mock.patch.object(TieredCache, 'set_all_tiers', wraps=TieredCache.set_all_tiers) as mock_set:
+            _, expiration = get_and_cache_oauth_access_token(URL, 'client_id', 'secret')
+
+        self.assertEqual(expiration, exp.replace(microsecond=0))
+        self.assertAlmostEqual(mock_set.call_args.args[2], 55, delta=1)
+
+    @responses.activate
+    def test_cached_as_tuple(self):
+        """
+        Test that the cache holds plain tuples, which other versions of this library can read
+        """
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'abcd', 'expires_in': 60})
+
+        token, expiration = get_and_cache_oauth_access_token(URL, 'client_id', 'secret')
+
+        cached_value = TieredCache.get_cached_response(CACHE_KEY).value
+        self.assertIs(type(cached_value), tuple)
+        self.assertEqual(cached_value, (token, expiration))
+
+    @responses.activate
+    def test_expired_token_not_cached(self):
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'abcd', 'expires_in': 0})
+
+        token, _ = get_and_cache_oauth_access_token(URL, 'client_id', 'secret')
+
+        self.assertEqual(token, 'abcd')
+        self.assertFalse(TieredCache.get_cached_response(CACHE_KEY).is_found)
+
+    @responses.activate
+    def test_short_lived_token_reused(self):
+        """
+        Test that a token issued for less than the expiry skew is reused for half its lifetime
+        """
+        now = int(time.time())
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': _encode_jwt(iat=now, exp=now + 10), 'expires_in': 10})
+        responses.add(responses.GET, URL + '/api')
+        client = OAuthAPIClient(URL, 'client_id', 'secret', expiry_skew_seconds=30)
+
+        client.get(URL + '/api')
+        client.get(URL + '/api')
+        get_and_cache_oauth_access_token(URL, 'client_id', 'secret', expiry_skew_seconds=30)
+
+        self.assertEqual(len([call for call in responses.calls if call.request.url == OAUTH_URL]), 1)
+        self.assertTrue(TieredCache.get_cached_response(CACHE_KEY).is_found)
+
+    @responses.activate
+    def test_expiry_skew(self):
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'abcd', 'expires_in': 60})
+        client = OAuthAPIClient(URL, 'client_id', 'secret', expiry_skew_seconds=30)
+
+        with mock.patch.object(TieredCache, 'set_all_tiers', wraps=TieredCache.set_all_tiers) as mock_set:
+            client.get_jwt_access_token()
+
+        self.assertAlmostEqual(mock_set.call_args.args[2], 30, delta=1)
+        _, memo_deadline = client._token_memos['jwt']  # pylint: disable=protected-access
+        self.assertAlmostEqual(memo_deadline - time.monotonic(), 30, delta=1)
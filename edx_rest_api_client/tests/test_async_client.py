@@ -0,0 +1,111 @@
+import asyncio
+import json
+from unittest import IsolatedAsyncioTestCase, mock
+
+import httpx
+from edx_django_utils.cache import TieredCache
+
+from edx_rest_api_client.async_client import AsyncOAuthAPIClient, get_and_cache_oauth_access_token_async
+from edx_rest_api_client.client import get_and_cache_oauth_access_token
+
+OAUTH_URL = 'http://testing.test/oauth2/access_token'
+
+
+class AsyncOAuthAPIClientTests(IsolatedAsyncioTestCase):
+    """
+    Tests for AsyncOAuthAPIClient
+    """
+    base_url = 'http://testing.test'
+    client_id = 'test'
+    client_secret = 'secret'
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.requests = []
+        self.tokens = ['cred2', 'cred1']
+
+    async def _handler(self, request):
+        self.requests.append(request)
+        if str(request.url) == OAUTH_URL:
+            # Yield to the event loop, so that concurrent token requests have a chance to overlap.
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={'access_token': self.tokens.pop(), 'expires_in': 60})
+        return httpx.Response(200, json={'status': 'ok'})
+
+    def _get_client(self):
+        return AsyncOAuthAPIClient(
+            self.base_url, self.client_id, self.client_secret, transport=httpx.MockTransport(self._handler),
+        )
+
+    async def test_automatic_auth(self):
+        async with self._get_client() as client:
+            response = await client.post(self.base_url + '/endpoint', data={'test': 'ok'})
+
+        self.assertEqual(len(self.requests), 2)
+        token_request, api_request = self.requests[0], self.requests[1]
+        self.assertIn('client_id=%s' % self.client_id, token_request.content.decode())
+        self.assertEqual(api_request.headers['Authorization'], 'JWT cred1')
+        self.assertIn('edx-rest-api-client', api_request.headers['User-Agent'])
+        self.assertEqual(response.json()['status'], 'ok')
+
+    async def test_concurrent_requests_share_token_fetch(self):
+        async with self._get_client() as client:
+            responses = await asyncio.gather(*(client.get(self.base_url + '/endpoint') for _ in range(50)))
+
+        token_requests = [request for request in self.requests if str(request.url) == OAUTH_URL]
+        self.assertEqual(len(token_requests), 1)
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        self.assertEqual(await client.get_jwt_access_token(), 'cred1')
+
+    async def test_shares_cache_with_sync_client(self):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(self._handler)) as client:
+            token, _ = await get_and_cache_oauth_access_token_async(
+                self.base_url, self.client_id, self.client_secret, client=client,
+            )
+
+        self.assertEqual(token, 'cred1')
+        self.assertEqual(get_and_cache_oauth_access_token(self.base_url, self.client_id, self.client_secret)[0], token)
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_invalidate_token(self):
+        async with self._get_client() as client:
+            await client.get(self.base_url + '/endpoint')
+            client.invalidate_token()
+            TieredCache.dangerous_clear_all_tiers()
+            await client.get(self.base_url + '/endpoint')
+            self.assertEqual(await client.get_jwt_access_token(), 'cred2')
+
+    async def test_access_token_bad_response_code(self):
+        def handler(request):  # pylint: disable=unused-argument
+            return httpx.Response(500, json={})
+
+        async with AsyncOAuthAPIClient(
+            self.base_url, self.client_id, self.client_secret, transport=httpx.MockTransport(handler),
+        ) as client:
+            with self.assertRaises(httpx.HTTPStatusError):
+                await client.get_jwt_access_token()
+
+    async def test_access_token_invalid_json_response(self):
+        def handler(request):  # pylint: disable=unused-argument
+            return httpx.Response(200, content=json.dumps({'expires_in': 60}))
+
+        async with AsyncOAuthAPIClient(
+            self.base_url, self.client_id, self.client_secret, transport=httpx.MockTransport(handler),
+        ) as client:
+            with self.assertRaises(httpx.DecodingError):
+                await client.get_jwt_access_token()
+
+    @mock.patch('edx_rest_api_client.async_client.get_request_id')
+    async def test_request_id_forwarding(self, mock_get_request_id):
+        mock_get_request_id.return_value = 'a-fake-request-id'
+        async with self._get_client() as client:
+            response = await client.get(self.base_url + '/endpoint')
+        self.assertEqual(response.request.headers['X-Request-ID'], 'a-fake-request-id')
+
+    @mock.patch('edx_rest_api_client.async_client.get_request_id')
+    async def test_request_id_forwarding_no_id(self, mock_get_request_id):
+        mock_get_request_id.return_value = None
+        async with self._get_client() as client:
+            response = await client.get(self.base_url + '/endpoint')
+        self.assertNotIn('X-Request-ID', response.request.headers)
@@ -0,0 +1,136 @@
+from unittest import TestCase, mock
+
+import requests
+import responses
+from edx_django_utils.cache import TieredCache
+
+from edx_rest_api_client.circuit_breaker import CircuitBreaker
+from edx_rest_api_client.client import OAuthAPIClient
+from edx_rest_api_client.exceptions import CircuitOpenError
+from edx_rest_api_client.tests.mixins import AuthenticationTestMixin
+
+HOST = 'testing.test'
+
+
+class CircuitBreakerTests(TestCase):
+    """
+    Tests for CircuitBreaker
+    """
+
+    def setUp(self):
+        super().setUp()
+        monotonic_patcher = mock.patch('edx_rest_api_client.circuit_breaker.time.monotonic', return_value=100)
+        self.mock_monotonic = monotonic_patcher.start()
+        self.addCleanup(monotonic_patcher.stop)
+        self.breaker = CircuitBreaker(failure_rate_threshold=0.5, minimum_calls=4, window_size=4, cooldown_seconds=30)
+
+    def _response(self, status_code):
+        response = requests.Response()
+        response.status_code = status_code
+        return response
+
+    def _call(self, status_code, host=HOST):
+        return self.breaker.call(host, lambda: self._response(status_code))
+
+    def _open_circuit(self):
+        for _ in range(4):
+            self._call(503)
+        self.assertEqual(self.breaker.get_state(HOST), CircuitBreaker.OPEN)
+
+    def test_stays_closed_below_threshold(self):
+        for status_code in (200, 503, 200, 200, 200, 503):
+            self._call(status_code)
+        self.assertEqual(self.breaker.get_state(HOST), CircuitBreaker.CLOSED)
+
+    def test_stays_closed_below_minimum_calls(self):
+        for _ in range(3):
+            self._call(503)
+        self.assertEqual(self.breaker.get_state(HOST), CircuitBreaker.CLOSED)
+
+    def test_client_errors_are_successes(self):
+        for _ in range(4):
+            self._call(404)
+        self.assertEqual(self.breaker.get_state(HOST), CircuitBreaker.CLOSED)
+
+    def test_opens_on_exceptions(self):
+        def send():
+            raise requests.ConnectionError()
+
+        for _ in range(4):
+            with self.assertRaises(requests.ConnectionError):
+                self.breaker.call(HOST, send)
+        self.assertEqual(self.breaker.get_state(HOST), CircuitBreaker.OPEN)
+
+    def test_open_fails_fast(self):
+        self._open_circuit()
+        send = mock.Mock()
+        with self.assertRaises(CircuitOpenError) as context:
+            self.breaker.call(HOST, send)
+        send.assert_not_called()
+        self.assertEqual(context.exception.host, HOST)
+        self.assertIsInstance(context.exception, requests.RequestException)
+
+    def test_hosts_are_independent(self):
+        self._open_circuit()
+        self.assertEqual(self._call(200, host='other.test').status_code, 200)
+
+    def test_half_open_success_closes(self):
+        self._open_circuit()
+        self.mock_monotonic.return_value = 130
+        self.assertEqual(self.breaker.get_state(HOST), CircuitBreaker.HALF_OPEN)
+        self._call(200)
+        self.assertEqual(self.breaker.get_state(HOST), CircuitBreaker.CLOSED)
+        # The failures from before the circuit opened are forgotten.
+        self._call(503)
+        self.assertEqual(self.breaker.get_state(HOST), CircuitBreaker.CLOSED)
+
+    def test_half_open_failure_reopens(self):
+        self._open_circuit()
+        self.mock_monotonic.return_value = 130
+        self._call(503)
+        self.assertEqual(self.breaker.get_state(HOST), CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self._call(200)
+
+    def test_half_open_limits_trial_calls(self):
+        self._open_circuit()
+        self.mock_monotonic.return_value = 130
+        self.assertEqual(self.breaker.before_call(HOST), CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call(HOST)
+
+
+class OAuthAPIClientCircuitBreakerTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for the circuit breaker in OAuthAPIClient
+    """
+    base_url = 'http://testing.test'
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.breaker = CircuitBreaker(minimum_calls=2, window_size=2)
+        self.client = OAuthAPIClient(self.base_url, 'test', 'secret', circuit_breaker=self.breaker)
+
+    @responses.activate
+    @mock.patch('edx_rest_api_client.client.set_custom_attribute')
+    def test_circuit_opens(self, mock_set_custom_attribute):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+        responses.add(responses.GET, 'http://api.test/endpoint', status=503)
+
+        self.client.get('http://api.test/endpoint')
+        self.client.get('http://api.test/endpoint')
+        with self.assertRaises(CircuitOpenError):
+            self.client.get('http://api.test/endpoint')
+
+        self.assertEqual(len(responses.calls), 3)
+        mock_set_custom_attribute.assert_any_call('api_client_circuit_state', CircuitBreaker.OPEN)
+        mock_set_custom_attribute.assert_any_call('api_client_circuit_open_host', 'api.test')
+
+    @responses.activate
+    def test_token_failures_not_counted(self):
+        responses.add(responses.POST, self.base_url + '/oauth2/access_token', status=503)
+        for _ in range(2):
+            with self.assertRaises(requests.HTTPError):
+                self.client.get('http://testing.test/endpoint')
+        self.assertEqual(self.breaker.get_state('testing.test'), CircuitBreaker.CLOSED)
@@ -1,14 +1,26 @@
 import datetime
+import email
+import gc
+import gzip
+import io
 import json
-from unittest import TestCase, mock
+import os
+import re
+import signal
+import tempfile
+import threading
+import time
+from unittest import TestCase, mock, skipUnless
 
 import ddt
 import requests
 import responses
+from django.core.cache import cache as django_cache
 from edx_django_utils.cache import TieredCache
 from freezegun import freeze_time
 
 from edx_rest_api_client import __version__
+from edx_rest_api_client import client as client_module
 from edx_rest_api_client.client import (OAuthAPIClient, get_and_cache_oauth_access_token,
                                         get_oauth_access_token)
 from edx_rest_api_client.tests.mixins import AuthenticationTestMixin
@@ -37,6 +49,43 @@ class ClientCredentialTests(AuthenticationTestMixin, TestCase):
             get_oauth_access_token(OAUTH_URL, 'client_id', 'client_secret', grant_type='refresh_token')
 
 
+class UserAgentTests(TestCase):
+    """
+    Test the User-Agent sent by the client.
+    """
+
+    def setUp(self):
+        super().setUp()
+        client_module.get_user_agent.cache_clear()
+        self.addCleanup(client_module.get_user_agent.cache_clear)
+
+    @mock.patch.dict('os.environ', {'EDX_REST_API_CLIENT_NAME': 'ecommerce'})
+    def test_client_name(self):
+        self.assertEqual(
+            client_module.USER_AGENT,
+            '{} edx-rest-api-client/{} ecommerce'.format(requests.utils.default_user_agent(), __version__),
+        )
+
+    @mock.patch.dict('os.environ', {'EDX_REST_API_CLIENT_NAME': ''})
+    @mock.patch('edx_rest_api_client.client.socket')
+    def test_hostname_without_dns_lookup(self, mock_socket):
+        mock_socket.gethostname.return_value = 'worker-1'
+        self.assertTrue(client_module.get_user_agent().endswith(' worker-1'))
+        mock_socket.gethostbyname.assert_not_called()
+
+    @mock.patch.dict('os.environ', {'EDX_REST_API_CLIENT_NAME': ''})
+    @mock.patch('edx_rest_api_client.client.socket.gethostname', side_effect=OSError)
+    def test_unknown_client_name(self, _mock_gethostname):
+        self.assertTrue(client_module.get_user_agent().endswith(' unknown_client_name'))
+
+    @mock.patch('edx_rest_api_client.client.user_agent', return_value='test-agent')
+    def test_computed_once(self, mock_user_agent):
+        self.assertEqual(client_module.get_user_agent(), 'test-agent')
+        self.assertEqual(client_module.USER_AGENT, 'test-agent')
+        self.assertEqual(OAuthAPIClient('http://testing.test', 'id', 'secret').headers['User-Agent'], 'test-agent')
+        mock_user_agent.assert_called_once()
+
+
 class CachedClientCredentialTests(AuthenticationTestMixin, TestCase):
     """
     Test cached client credentials requests.
@@ -46,6 +95,23 @@ class CachedClientCredentialTests(AuthenticationTestMixin, TestCase):
         super().setUp()
         TieredCache.dangerous_clear_all_tiers()
 
+    @skipUnless(hasattr(os, 'fork'), 'Requires os.fork.')
+    def test_fetch_locks_reset_after_fork(self):
+        """
+        Test that a forked process can fetch tokens while another thread of its parent holds a fetch lock
+        """
+        fetch_lock = client_module._get_token_fetch_lock('cache-key')  # pylint: disable=protected-access
+        with fetch_lock, client_module._TOKEN_FETCH_LOCKS_GUARD:  # pylint: disable=protected-access
+            pid = os.fork()
+            if pid == 0:
+                # Kill the child rather than letting it hang on an inherited lock.
+                signal.alarm(5)
+                # pylint: disable=protected-access
+                acquired = client_module._get_token_fetch_lock('cache-key').acquire(timeout=1)
+                os._exit(0 if acquired else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+
     @responses.activate
     def test_token_caching(self):
         """
@@ -99,6 +165,76 @@ class CachedClientCredentialTests(AuthenticationTestMixin, TestCase):
             self.assertEqual(token_response[0], expected_token)
         self.assertEqual(len(responses.calls), 8)
 
+    @responses.activate
+    def test_concurrent_token_fetches_are_coalesced(self):
+        """
+        Test that concurrent cache misses for the same token result in a single token request.
+        """
+        def auth_callback(request):   # pylint: disable=unused-argument
+            time.sleep(0.1)
+            return (200, {}, json.dumps({'access_token': 'shared-token', 'expires_in': 60}))
+
+        responses.add_callback(responses.POST, OAUTH_URL, callback=auth_callback, content_type='application/json')
+
+        results = []
+
+        def fetch_token():
+            results.append(self._get_and_cache_oauth_access_token(OAUTH_URL, 'test-id', 'jwt', 'client_credentials'))
+
+        threads = [threading.Thread(target=fetch_token) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual([token for token, _ in results], ['shared-token'] * 10)
+
+    @responses.activate
+    def test_token_lease_waits_for_other_process(self):
+        """
+        Test that a token lease held by another process is waited on rather than fetching a new token.
+        """
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'our-token', 'expires_in': 60})
+        cache_key = 'edx_rest_api_client.access_token.jwt.client_credentials.test-id.{}'.format(OAUTH_URL)
+        django_cache.add(cache_key + '.lease', 'other-process')
+        other_token = ('their-token', datetime.datetime.utcnow() + datetime.timedelta(seconds=60))
+        timer = threading.Timer(0.2, TieredCache.set_all_tiers, args=(cache_key, other_token, 60))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        token, _ = get_and_cache_oauth_access_token(OAUTH_URL, 'test-id', 'test-secret', use_token_lease=True)
+
+        self.assertEqual(token, 'their-token')
+        self.assertEqual(len(responses.calls), 0)
+
+    @responses.activate
+    @mock.patch('edx_rest_api_client.client.TOKEN_LEASE_TIMEOUT_SECONDS', 0.3)
+    def test_token_lease_expired(self):
+        """
+        Test that a token is fetched if the process holding the lease never caches one.
+        """
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'our-token', 'expires_in': 60})
+        cache_key = 'edx_rest_api_client.access_token.jwt.client_credentials.test-id.{}'.format(OAUTH_URL)
+        django_cache.add(cache_key + '.lease', 'other-process', 0.3)
+
+        token, _ = get_and_cache_oauth_access_token(OAUTH_URL, 'test-id', 'test-secret', use_token_lease=True)
+
+        self.assertEqual(token, 'our-token')
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_token_lease_released(self):
+        """
+        Test that the token lease is released once the token has been fetched.
+        """
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'our-token', 'expires_in': 60})
+        cache_key = 'edx_rest_api_client.access_token.jwt.client_credentials.test-id.{}'.format(OAUTH_URL)
+
+        get_and_cache_oauth_access_token(OAUTH_URL, 'test-id', 'test-secret', use_token_lease=True)
+
+        self.assertIsNone(django_cache.get(cache_key + '.lease'))
+
     def _get_and_cache_oauth_access_token(self, auth_url, client_id, token_type, grant_type):
         refresh_token = 'test-refresh-token' if grant_type == 'refresh_token' else None
         return get_and_cache_oauth_access_token(
@@ -179,8 +315,236 @@ class OAuthAPIClientTests(AuthenticationTestMixin, TestCase):
             response = client_session.post(self.base_url + '/endpoint', data={'test': 'ok'})
             self.assertEqual(client_session.auth.token, 'cred2')
 
-    @mock.patch('edx_rest_api_client.client.requests.post')
-    def test_access_token_request_timeout_wiring2(self, mock_access_token_post):
+    @responses.activate
+    def test_token_memo(self):
+        """
+        Test that the client reuses its token without going back to the token cache until it nears expiry
+        """
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        self._mock_auth_api(self.base_url + '/endpoint', 200, {'status': 'ok'})
+        client = OAuthAPIClient(self.base_url, self.client_id, self.client_secret)
+        client.post(self.base_url + '/endpoint')
+
+        with mock.patch.object(TieredCache, 'get_cached_response', wraps=TieredCache.get_cached_response) as mock_get:
+            client.post(self.base_url + '/endpoint')
+            client.post(self.base_url + '/endpoint')
+            mock_get.assert_not_called()
+
+            # Close to expiry, the token cache is checked again
+            with mock.patch('edx_rest_api_client.client.time.monotonic', return_value=time.monotonic() + 596):
+                client.post(self.base_url + '/endpoint')
+            self.assertEqual(mock_get.call_count, 1)
+
+        self.assertEqual(client.auth.token, 'abcd')
+
+    @responses.activate
+    def test_invalidate_token(self):
+        """
+        Test that invalidating the token makes the client look it up again
+        """
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        client = OAuthAPIClient(self.base_url, self.client_id, self.client_secret)
+        client._ensure_authentication()  # pylint: disable=protected-access
+
+        client.invalidate_token()
+        with mock.patch.object(TieredCache, 'get_cached_response', wraps=TieredCache.get_cached_response) as mock_get:
+            client._ensure_authentication()  # pylint: disable=protected-access
+            mock_get.assert_called_once()
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_refresh_ahead_scheduled(self):
+        """
+        Test that a background refresh is scheduled at the refresh_ahead fraction of the token lifetime
+        """
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        client = OAuthAPIClient(self.base_url, self.client_id, self.client_secret, refresh_ahead=0.75)
+        self.addCleanup(client.close)
+
+        client._ensure_authentication()  # pylint: disable=protected-access
+        timer = client._refresh_timers['jwt']  # pylint: disable=protected-access
+        self.assertAlmostEqual(timer.interval, 450, delta=1)
+        self.assertTrue(timer.daemon)
+
+        # Using the same token again shouldn't reschedule the refresh
+        client._ensure_authentication()  # pylint: disable=protected-access
+        self.assertIs(client._refresh_timers.get('jwt'), timer)  # pylint: disable=protected-access
+
+        client.close()
+        self.assertIsNone(client._refresh_timers.get('jwt'))  # pylint: disable=protected-access
+
+    @responses.activate
+    def test_refresh_ahead_cancelled_when_collected(self):
+        """
+        Test that the refresh threads of clients that are garbage collected without being closed stop
+        """
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        timers = []
+        for _ in range(5):
+            client = OAuthAPIClient(self.base_url, self.client_id, self.client_secret, refresh_ahead=0.75)
+            client._ensure_authentication()  # pylint: disable=protected-access
+            timers.append(client._refresh_timers['jwt'])  # pylint: disable=protected-access
+
+        del client
+        gc.collect()
+
+        for timer in timers:
+            timer.join(timeout=1)
+            self.assertFalse(timer.is_alive())
+
+    @responses.activate
+    def test_refresh_ahead_replaces_token(self):
+        """
+        Test that a background refresh fetches a new token even though the current one is still valid
+        """
+        tokens = ['cred2', 'cred1']
+
+        def auth_callback(request):   # pylint: disable=unused-argument
+            return (200, {}, json.dumps({'access_token': tokens.pop(), 'expires_in': 600}))
+
+        responses.add_callback(
+            responses.POST, self.base_url + '/oauth2/access_token',
+            callback=auth_callback,
+            content_type='application/json',
+        )
+        client = OAuthAPIClient(self.base_url, self.client_id, self.client_secret, refresh_ahead=0.5)
+        self.addCleanup(client.close)
+        client._ensure_authentication()  # pylint: disable=protected-access
+        self.assertEqual(client.auth.token, 'cred1')
+
+        client._refresh_token()  # pylint: disable=protected-access
+        self.assertEqual(client.auth.token, 'cred2')
+        self.assertEqual(len(responses.calls), 2)
+
+        # The request path picks up the refreshed token from the cache
+        self._mock_auth_api(self.base_url + '/endpoint', 200, {'status': 'ok'})
+        client.post(self.base_url + '/endpoint')
+        self.assertEqual(client.auth.token, 'cred2')
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_refresh_ahead_uses_newer_cached_token(self):
+        """
+        Test that a background refresh adopts a newer token cached by another client rather than fetching one
+        """
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'cred1', 'expires_in': 600})
+        client = OAuthAPIClient(self.base_url, self.client_id, self.client_secret, refresh_ahead=0.5)
+        self.addCleanup(client.close)
+        client._ensure_authentication()  # pylint: disable=protected-access
+
+        cache_key = 'edx_rest_api_client.access_token.jwt.client_credentials.{}.{}'.format(
+            self.client_id, self.base_url + '/oauth2/access_token',
+        )
+        newer_token = ('cred-other', datetime.datetime.utcnow() + datetime.timedelta(seconds=1200))
+        TieredCache.set_all_tiers(cache_key, newer_token, 1200)
+
+        client._refresh_token()  # pylint: disable=protected-access
+        self.assertEqual(client.auth.token, 'cred-other')
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_refresh_ahead_failure(self):
+        """
+        Test that a failed background refresh keeps the current token and is retried later
+        """
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'cred1', 'expires_in': 600})
+        client = OAuthAPIClient(self.base_url, self.client_id, self.client_secret, refresh_ahead=0.5)
+        self.addCleanup(client.close)
+        client._ensure_authentication()  # pylint: disable=protected-access
+
+        responses.replace(responses.POST, self.base_url + '/oauth2/access_token', status=500, json={})
+        client._refresh_token()  # pylint: disable=protected-access
+        self.assertEqual(client.auth.token, 'cred1')
+        self.assertEqual(client._refresh_timers['jwt'].interval, 30)  # pylint: disable=protected-access
+
+    def test_refresh_ahead_invalid(self):
+        with self.assertRaises(ValueError):
+            OAuthAPIClient(self.base_url, self.client_id, self.client_secret, refresh_ahead=1.5)
+
+    def _mock_auth_by_token_type(self, expires_in=600):
+        """
+        Mocks the access token endpoint to return a token named after the requested token type.
+        """
+        def auth_callback(request):
+            token_type = re.search('token_type=([a-z]+)', request.body).group(1)
+            return (200, {}, json.dumps({'access_token': token_type + '-token', 'expires_in': expires_in}))
+
+        responses.add_callback(
+            responses.POST, self.base_url + '/oauth2/access_token',
+            callback=auth_callback,
+            content_type='application/json',
+        )
+
+    @responses.activate
+    def test_token_type_forwarded(self):
+        """
+        Test that the requested token type is the one fetched and cached
+        """
+        self._mock_auth_by_token_type()
+
+        bearer_token, _ = get_and_cache_oauth_access_token(self.base_url, self.client_id, 'secret', token_type='bearer')
+        jwt_token, _ = get_and_cache_oauth_access_token(self.base_url, self.client_id, 'secret', token_type='jwt')
+
+        self.assertEqual((bearer_token, jwt_token), ('bearer-token', 'jwt-token'))
+        self.assertIn('token_type=bearer', responses.calls[0].request.body)
+
+    @responses.activate
+    def test_bearer_client(self):
+        self._mock_auth_by_token_type()
+        self._mock_auth_api(self.base_url + '/endpoint', 200, {'status': 'ok'})
+        client = OAuthAPIClient(self.base_url, self.client_id, self.client_secret, token_type='bearer')
+
+        client.post(self.base_url + '/endpoint')
+
+        self.assertEqual(responses.calls[1].request.headers['Authorization'], 'Bearer bearer-token')
+        self.assertEqual(client.get_access_token(), 'bearer-token')
+
+    @responses.activate
+    def test_token_type_per_request(self):
+        """
+        Test that one client can send both types of tokens, each fetched once
+        """
+        self._mock_auth_by_token_type()
+        self._mock_auth_api(self.base_url + '/endpoint', 200, {'status': 'ok'})
+        client = OAuthAPIClient(self.base_url, self.client_id, self.client_secret)
+
+        for _ in range(2):
+            client.post(self.base_url + '/endpoint')
+            client.post(self.base_url + '/endpoint', token_type='bearer')
+
+        api_calls = [call for call in responses.calls if call.request.url.endswith('/endpoint')]
+        self.assertEqual(
+            [call.request.headers['Authorization'] for call in api_calls],
+            ['JWT jwt-token', 'Bearer bearer-token'] * 2,
+        )
+        self.assertEqual(len(responses.calls), 6)
+        self.assertEqual(client.auth.token, 'jwt-token')
+        self.assertEqual(client.get_jwt_access_token(), 'jwt-token')
+
+    @responses.activate
+    def test_token_types_refreshed_separately(self):
+        self._mock_auth_by_token_type()
+        client = OAuthAPIClient(self.base_url, self.client_id, self.client_secret, refresh_ahead=0.5)
+        self.addCleanup(client.close)
+        client.get_access_token('jwt')
+        client.get_access_token('bearer')
+
+        self.assertEqual(set(client._refresh_timers), {'jwt', 'bearer'})  # pylint: disable=protected-access
+        client.invalidate_token('bearer')
+        client._refresh_token('bearer')  # pylint: disable=protected-access
+        self.assertEqual(client.get_access_token('bearer'), 'bearer-token')
+        self.assertIn('token_type=bearer', responses.calls[-1].request.body)
+
+    def test_token_type_invalid(self):
+        with self.assertRaises(ValueError):
+            OAuthAPIClient(self.base_url, self.client_id, self.client_secret, token_type='mac')
+        client = OAuthAPIClient(self.base_url, self.client_id, self.client_secret)
+        with self.assertRaises(ValueError):
+            client.get(self.base_url + '/endpoint', token_type='mac')
+
+    @mock.patch('edx_rest_api_client.client._get_token_session')
+    def test_access_token_request_timeout_wiring2(self, mock_get_token_session):
+        mock_access_token_post = mock_get_token_session.return_value.post
         mock_access_token_post.return_value.json.return_value = {'access_token': 'token', 'expires_in': 1000}
 
         timeout_override = (6.1, 2)
@@ -189,6 +553,37 @@ class OAuthAPIClientTests(AuthenticationTestMixin, TestCase):
 
         assert mock_access_token_post.call_args.kwargs['timeout'] == timeout_override
 
+    def test_connection_pool_settings(self):
+        client = OAuthAPIClient(
+            self.base_url, self.client_id, self.client_secret,
+            pool_connections=4, pool_maxsize=32, pool_block=True, max_retries=2,
+        )
+        for prefix in ('http://', 'https://'):
+            adapter = client.get_adapter(prefix + 'example.com')
+            # pylint: disable=protected-access
+            self.assertEqual(adapter._pool_connections, 4)
+            self.assertEqual(adapter._pool_maxsize, 32)
+            self.assertTrue(adapter._pool_block)
+            self.assertEqual(adapter.max_retries.total, 2)
+
+    @responses.activate
+    def test_token_requests_share_session(self):
+        """
+        Test that access token requests reuse one session, which doesn't keep cookies
+        """
+        responses.add(
+            responses.POST, self.base_url + '/oauth2/access_token',
+            json={'access_token': 'abcd', 'expires_in': 60},
+            headers={'Set-Cookie': 'sessionid=secret; Path=/'},
+        )
+        get_oauth_access_token(self.base_url, 'client-1', self.client_secret)
+        get_oauth_access_token(self.base_url, 'client-2', self.client_secret)
+
+        self.assertIs(client_module._get_token_session(), client_module._get_token_session())  # pylint: disable=protected-access
+        self.assertEqual(len(client_module._get_token_session().cookies), 0)  # pylint: disable=protected-access
+        self.assertNotIn('Cookie', responses.calls[1].request.headers)
+        self.assertIn('edx-rest-api-client', responses.calls[1].request.headers['User-Agent'])
+
     @responses.activate
     def test_access_token_invalid_json_response(self):
         responses.add(responses.POST,
@@ -267,3 +662,914 @@ class OAuthAPIClientTests(AuthenticationTestMixin, TestCase):
                       json={})
         response = client.post(post_url, data={'test': 'ok'})
         assert response.request.headers.get('X-Request-ID') is None
+
+
+@ddt.ddt
+class PaginationTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for iterating over paginated endpoints with OAuthAPIClient
+    """
+    base_url = 'http://testing.test'
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.client = OAuthAPIClient(self.base_url, 'test', 'secret')
+
+    def _mock_pages(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+        responses.add(
+            responses.GET, URL + '/courses/?page_size=2',
+            match=[responses.matchers.query_param_matcher({'page_size': '2'})],
+            json={'next': URL + '/courses/?page=2&page_size=2', 'results': [1, 2]},
+        )
+        responses.add(
+            responses.GET, URL + '/courses/?page=2&page_size=2',
+            match=[responses.matchers.query_param_matcher({'page': '2', 'page_size': '2'})],
+            # Relative links, like cursor pagination can produce, are resolved against the page URL.
+            json={'next': '/api/v2/courses/?cursor=abc', 'results': [3, 4]},
+        )
+        responses.add(
+            responses.GET, URL + '/courses/?cursor=abc',
+            match=[responses.matchers.query_param_matcher({'cursor': 'abc'})],
+            json={'next': None, 'results': [5]},
+        )
+
+    @responses.activate
+    @ddt.data(False, True)
+    def test_iter_results(self, prefetch):
+        self._mock_pages()
+        results = self.client.iter_results(URL + '/courses/', params={'page_size': 2}, prefetch=prefetch)
+        self.assertEqual(list(results), [1, 2, 3, 4, 5])
+
+    @responses.activate
+    def test_iter_results_stream(self):
+        self._mock_pages()
+        results = self.client.iter_results(URL + '/courses/', params={'page_size': 2}, stream=True)
+        self.assertEqual(list(results), [1, 2, 3, 4, 5])
+
+    def test_iter_results_stream_prefetch(self):
+        with self.assertRaises(ValueError):
+            next(self.client.iter_results(URL + '/courses/', prefetch=True, stream=True))
+
+    @responses.activate
+    @ddt.data(False, True)
+    def test_iter_pages(self, prefetch):
+        self._mock_pages()
+        pages = list(self.client.iter_pages(URL + '/courses/', params={'page_size': 2}, prefetch=prefetch))
+        self.assertEqual([page['results'] for page in pages], [[1, 2], [3, 4], [5]])
+
+    @responses.activate
+    def test_iter_pages_is_lazy(self):
+        self._mock_pages()
+        pages = self.client.iter_pages(URL + '/courses/', params={'page_size': 2})
+        next(pages)
+        self.assertEqual(len(responses.calls), 2)
+        pages.close()
+
+    @responses.activate
+    def test_pagination_object(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+        responses.add(
+            responses.GET, URL + '/enrollments/',
+            match=[responses.matchers.query_param_matcher({})],
+            json={'pagination': {'next': URL + '/enrollments/?page=2'}, 'results': ['a']},
+        )
+        responses.add(
+            responses.GET, URL + '/enrollments/?page=2',
+            match=[responses.matchers.query_param_matcher({'page': '2'})],
+            json={'pagination': {'next': None}, 'results': ['b']},
+        )
+        self.assertEqual(list(self.client.iter_results(URL + '/enrollments/')), ['a', 'b'])
+
+    @responses.activate
+    def test_unpaginated_list(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+        responses.add(responses.GET, URL + '/programs/', json=['a', 'b'])
+        self.assertEqual(list(self.client.iter_results(URL + '/programs/')), ['a', 'b'])
+
+    @responses.activate
+    def test_error(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+        responses.add(responses.GET, URL + '/courses/', status=500)
+        with self.assertRaises(requests.HTTPError):
+            list(self.client.iter_results(URL + '/courses/'))
+
+    @responses.activate
+    @mock.patch('crum.get_current_request')
+    def test_prefetch_forwards_request_id(self, mock_crum_get_current_request):
+        mock_request = mock.MagicMock()
+        mock_request.headers.get.return_value = 'a-fake-request-id'
+        # Like crum, only the thread handling the Django request can see it.
+        main_thread = threading.current_thread()
+        mock_crum_get_current_request.side_effect = lambda: (
+            mock_request if threading.current_thread() is main_thread else None
+        )
+        self._mock_pages()
+        list(self.client.iter_pages(URL + '/courses/', params={'page_size': 2}, prefetch=True))
+        api_calls = [call for call in responses.calls if '/courses/' in call.request.url]
+        self.assertTrue(all(call.request.headers['X-Request-ID'] == 'a-fake-request-id' for call in api_calls))
+
+
+class BatchTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for OAuthAPIClient.batch
+    """
+    base_url = 'http://testing.test'
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.client = OAuthAPIClient(self.base_url, 'test', 'secret')
+
+    @responses.activate
+    def test_batch(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+
+        def callback(request):
+            # Respond out of order, to check that results are returned in the order of the calls.
+            number = int(request.url.rsplit('/', 1)[-1])
+            time.sleep((20 - number) / 1000)
+            return (200, {}, json.dumps({'number': number}))
+
+        responses.add_callback(
+            responses.GET, re.compile(URL + '/runs/[0-9]+'), callback=callback, content_type='application/json',
+        )
+        responses.add(responses.POST, URL + '/runs/', status=201, json={'number': 20})
+
+        calls = [('GET', '{}/runs/{}'.format(URL, number)) for number in range(20)]
+        calls.append(('POST', URL + '/runs/', {'json': {'number': 20}}))
+        results = self.client.batch(calls, max_workers=5)
+
+        self.assertEqual([result.response.json()['number'] for result in results], list(range(21)))
+        self.assertTrue(all(result.exception is None for result in results))
+        token_calls = [call for call in responses.calls if call.request.url.endswith('/access_token')]
+        self.assertEqual(len(token_calls), 1)
+
+    @responses.activate
+    def test_batch_errors(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+        responses.add(responses.GET, URL + '/ok', json={})
+        responses.add(responses.GET, URL + '/down', body=requests.ConnectionError('down'))
+
+        results = self.client.batch([('GET', URL + '/ok'), ('GET', URL + '/down')])
+        ok_result, error_result = results[0], results[1]
+
+        self.assertEqual(ok_result.response.status_code, 200)
+        self.assertIsNone(ok_result.exception)
+        self.assertIsNone(error_result.response)
+        self.assertIsInstance(error_result.exception, requests.ConnectionError)
+
+    def test_batch_empty(self):
+        self.assertEqual(self.client.batch([]), [])
+
+    @responses.activate
+    @mock.patch('crum.get_current_request')
+    def test_batch_forwards_request_id(self, mock_crum_get_current_request):
+        mock_request = mock.MagicMock()
+        mock_request.headers.get.return_value = 'a-fake-request-id'
+        main_thread = threading.current_thread()
+        mock_crum_get_current_request.side_effect = lambda: (
+            mock_request if threading.current_thread() is main_thread else None
+        )
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+        responses.add(responses.GET, URL + '/ok', json={})
+
+        results = self.client.batch([('GET', URL + '/ok')] * 3)
+
+        self.assertTrue(
+            all(result.response.request.headers['X-Request-ID'] == 'a-fake-request-id' for result in results)
+        )
+
+
+@ddt.ddt
+class CoalescingTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for coalescing identical concurrent requests in OAuthAPIClient
+    """
+    base_url = 'http://testing.test'
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.client = OAuthAPIClient(self.base_url, 'test', 'secret', coalesce_requests=True)
+
+    def _mock_slow_api(self, method=responses.GET, status=200):
+        def callback(request):   # pylint: disable=unused-argument
+            time.sleep(0.2)
+            return (status, {}, json.dumps({'price': 100}))
+
+        responses.add_callback(method, URL + '/pricing', callback=callback, content_type='application/json')
+
+    def _concurrently(self, make_request, count=10):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+        # Make sure the token is cached, so only API requests are made concurrently.
+        self.client.get_jwt_access_token()
+        results = [None] * count
+
+        def run(index):
+            try:
+                results[index] = make_request()
+            except Exception as exception:  # pylint: disable=broad-except
+                results[index] = exception
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def _api_calls(self):
+        return [call for call in responses.calls if call.request.url.startswith(URL)]
+
+    @responses.activate
+    def test_identical_requests_coalesced(self):
+        self._mock_slow_api()
+        results = self._concurrently(lambda: self.client.get(URL + '/pricing', params={'course': 'a'}))
+
+        self.assertEqual(len(self._api_calls()), 1)
+        self.assertEqual([response.json() for response in results], [{'price': 100}] * 10)
+        self.assertEqual(len({id(response) for response in results}), 10)
+
+    @responses.activate
+    def test_different_requests_not_coalesced(self):
+        self._mock_slow_api()
+        results = self._concurrently(lambda: self.client.get(
+            URL + '/pricing', params={'course': threading.current_thread().name},
+        ), count=3)
+
+        self.assertEqual(len(self._api_calls()), 3)
+        self.assertTrue(all(response.status_code == 200 for response in results))
+
+    @responses.activate
+    @ddt.data(
+        (responses.POST, {}),
+        (responses.GET, {'stream': True}),
+        (responses.GET, {'auth': ('user', 'password')}),
+    )
+    @ddt.unpack
+    def test_not_coalesced(self, method, kwargs):
+        self._mock_slow_api(method=method)
+        self._concurrently(lambda: self.client.request(method, URL + '/pricing', **kwargs), count=3)
+        self.assertEqual(len(self._api_calls()), 3)
+
+    @responses.activate
+    def test_errors_shared(self):
+        responses.add(responses.GET, URL + '/pricing', body=requests.ConnectionError('down'))
+        results = self._concurrently(lambda: self.client.get(URL + '/pricing'), count=3)
+        self.assertTrue(all(isinstance(result, requests.ConnectionError) for result in results))
+
+    @responses.activate
+    def test_sequential_requests_not_coalesced(self):
+        self._mock_slow_api()
+        self._concurrently(lambda: self.client.get(URL + '/pricing'), count=1)
+        self.client.get(URL + '/pricing')
+        self.assertEqual(len(self._api_calls()), 2)
+
+
+@ddt.ddt
+class CompressionTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for content encoding negotiation and request body compression in OAuthAPIClient
+    """
+    base_url = 'http://testing.test'
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+
+    def _mock_api(self, method=responses.POST):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+        responses.add(method, URL + '/grades', json={})
+
+    def _api_request(self):
+        return [call.request for call in responses.calls if call.request.url.startswith(URL)][-1]
+
+    @ddt.data(
+        (None, 'gzip, deflate'),
+        (['zstd', 'br', 'gzip'], 'gzip'),
+        (['identity'], 'identity'),
+    )
+    @ddt.unpack
+    def test_accept_encoding(self, accept_encoding, expected):
+        client = OAuthAPIClient(self.base_url, 'test', 'secret', accept_encoding=accept_encoding)
+        self.assertEqual(client.headers['Accept-Encoding'], expected)
+
+    @mock.patch('urllib3.response.HTTPResponse.CONTENT_DECODERS', ['gzip', 'x-gzip', 'deflate', 'br', 'zstd'])
+    def test_accept_encoding_optional_decoders(self):
+        self.assertEqual(client_module.get_supported_content_encodings(), ['zstd', 'br', 'gzip', 'deflate'])
+        client = OAuthAPIClient(self.base_url, 'test', 'secret', accept_encoding=['br', 'gzip'])
+        self.assertEqual(client.headers['Accept-Encoding'], 'br, gzip')
+
+    @responses.activate
+    def test_gzipped_response(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+        responses.add(
+            responses.GET, URL + '/grades', body=gzip.compress(b'{"grade": 1}'), headers={'Content-Encoding': 'gzip'},
+        )
+        response = OAuthAPIClient(self.base_url, 'test', 'secret').get(URL + '/grades')
+        self.assertEqual(response.json(), {'grade': 1})
+
+    @responses.activate
+    @ddt.data(
+        {'json': {'grades': [{'user': index, 'grade': 0.5} for index in range(100)]}},
+        {'data': {'grades': 'x' * 2000}},
+        {'data': b'x' * 2000},
+    )
+    def test_compressed_body(self, kwargs):
+        self._mock_api()
+        client = OAuthAPIClient(self.base_url, 'test', 'secret', compress_requests_over=1024)
+        uncompressed_body = requests.Request('POST', URL + '/grades', **kwargs).prepare().body
+
+        client.post(URL + '/grades', **kwargs)
+
+        request = self._api_request()
+        self.assertEqual(request.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(int(request.headers['Content-Length']), len(request.body))
+        expected_body = uncompressed_body if isinstance(uncompressed_body, bytes) else uncompressed_body.encode()
+        self.assertEqual(gzip.decompress(request.body), expected_body)
+
+    @responses.activate
+    @ddt.data(
+        (responses.POST, {'data': b'x' * 100}),
+        (responses.POST, {'data': os.urandom(2000)}),
+        (responses.POST, {'data': b'x' * 2000, 'headers': {'Content-Encoding': 'br'}}),
+        (responses.POST, {'data': iter([b'x' * 2000])}),
+        (responses.DELETE, {'data': b'x' * 2000}),
+    )
+    @ddt.unpack
+    def test_uncompressed_body(self, method, kwargs):
+        self._mock_api(method)
+        client = OAuthAPIClient(self.base_url, 'test', 'secret', compress_requests_over=1024)
+
+        client.request(method, URL + '/grades', **kwargs)
+
+        self.assertNotEqual(self._api_request().headers.get('Content-Encoding'), 'gzip')
+
+    @responses.activate
+    def test_compression_disabled(self):
+        self._mock_api()
+        OAuthAPIClient(self.base_url, 'test', 'secret').post(URL + '/grades', data=b'x' * 2000)
+        self.assertNotIn('Content-Encoding', self._api_request().headers)
+
+
+class RejectedTokenTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for OAuthAPIClient replacing access tokens rejected with a 401
+    """
+    base_url = 'http://testing.test'
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        client_module._TOKEN_INVALIDATION_TIMES.clear()  # pylint: disable=protected-access
+        self.tokens = ['token3', 'token2', 'token1']
+        self.rejected_tokens = {'token1'}
+
+        def auth_callback(request):  # pylint: disable=unused-argument
+            return (200, {}, json.dumps({'access_token': self.tokens.pop(), 'expires_in': 600}))
+
+        def api_callback(request):
+            if request.headers['Authorization'].split()[-1] in self.rejected_tokens:
+                return (401, {}, json.dumps({'detail': 'Invalid token.'}))
+            return (200, {}, json.dumps({'status': 'ok'}))
+
+        responses.add_callback(responses.POST, self.base_url + '/oauth2/access_token', callback=auth_callback)
+        responses.add_callback(responses.POST, URL + '/endpoint', callback=api_callback)
+
+    def _token_requests(self):
+        return [call for call in responses.calls if call.request.url.endswith('/access_token')]
+
+    def _api_requests(self):
+        return [call for call in responses.calls if call.request.url.endswith('/endpoint')]
+
+    @responses.activate
+    def test_rejected_token_replaced(self):
+        client = OAuthAPIClient(self.base_url, 'test', 'secret')
+
+        with mock.patch('edx_rest_api_client.client.set_custom_attribute') as mock_set_custom_attribute:
+            response = client.post(URL + '/endpoint', data={'test': 'ok'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self._token_requests()), 2)
+        self.assertEqual(self._api_requests()[-1].request.body, 'test=ok')
+        self.assertEqual(client.auth.token, 'token2')
+        mock_set_custom_attribute.assert_any_call('api_client_token_rejected', True)
+        # The new token is cached for other clients.
+        OAuthAPIClient(self.base_url, 'test', 'secret').post(URL + '/endpoint')
+        self.assertEqual(len(self._token_requests()), 2)
+
+    @responses.activate
+    def test_token_replaced_by_other_client(self):
+        """
+        Test that a client doesn't drop a token that another client has already replaced
+        """
+        first_client = OAuthAPIClient(self.base_url, 'test', 'secret')
+        second_client = OAuthAPIClient(self.base_url, 'test', 'secret')
+        first_client.get_jwt_access_token()
+        second_client.get_jwt_access_token()
+
+        self.assertEqual(first_client.post(URL + '/endpoint').status_code, 200)
+        self.assertEqual(second_client.post(URL + '/endpoint').status_code, 200)
+
+        self.assertEqual(len(self._token_requests()), 2)
+        self.assertEqual(second_client.auth.token, 'token2')
+
+    @responses.activate
+    def test_rejected_again(self):
+        """
+        Test that a service rejecting every token doesn't cause a token request for each of its requests
+        """
+        self.rejected_tokens.update(self.tokens)
+        client = OAuthAPIClient(self.base_url, 'test', 'secret')
+
+        self.assertEqual(client.post(URL + '/endpoint').status_code, 401)
+        self.assertEqual(client.post(URL + '/endpoint').status_code, 401)
+
+        self.assertEqual(len(self._token_requests()), 2)
+        self.assertEqual(len(self._api_requests()), 3)
+
+        with mock.patch('edx_rest_api_client.client.time.monotonic', return_value=time.monotonic() + 31):
+            client.post(URL + '/endpoint')
+        self.assertEqual(len(self._token_requests()), 3)
+
+    @responses.activate
+    def test_unreplayable_body(self):
+        client = OAuthAPIClient(self.base_url, 'test', 'secret')
+
+        response = client.post(URL + '/endpoint', data=iter([b'test']))
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(len(self._api_requests()), 1)
+        # The next request uses a new token.
+        self.assertEqual(client.post(URL + '/endpoint').status_code, 200)
+        self.assertEqual(len(self._token_requests()), 2)
+
+    @responses.activate
+    def test_supplied_auth(self):
+        client = OAuthAPIClient(self.base_url, 'test', 'secret')
+
+        response = client.post(URL + '/endpoint', auth=client_module.BearerAuth('token1'))
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(len(self._api_requests()), 1)
+        self.assertEqual(len(self._token_requests()), 1)
+
+
+class _BrokenConnection(io.RawIOBase):
+    """
+    A response body whose connection breaks after ``data`` has been read.
+    """
+
+    def __init__(self, data):
+        super().__init__()
+        self.data = data
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self.data:
+            raise ConnectionResetError('Connection reset by peer')
+        size = min(len(buffer), len(self.data))
+        buffer[:size] = self.data[:size]
+        self.data = self.data[size:]
+        return size
+
+
+@ddt.ddt
+class TransferTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for OAuthAPIClient.download_to and OAuthAPIClient.upload_from
+    """
+    base_url = 'http://testing.test'
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        temporary_directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temporary_directory.cleanup)
+        self.path = os.path.join(temporary_directory.name, 'export.csv')
+        self.client = OAuthAPIClient(self.base_url, 'test', 'secret')
+
+    def _write(self, data):
+        with open(self.path, 'wb') as file:
+            file.write(data)
+
+    def _read(self):
+        with open(self.path, 'rb') as file:
+            return file.read()
+
+    def _mock_ranges(self, body):
+        """
+        Mocks an export endpoint that supports Range requests for ``body``.
+        """
+        def callback(request):
+            first_byte = int(re.match(r'bytes=(\d+)-', request.headers.get('Range', 'bytes=0-')).group(1))
+            if first_byte >= len(body):
+                return (416, {'Content-Range': 'bytes */{}'.format(len(body))}, b'')
+            headers = {'Accept-Ranges': 'bytes'}
+            if not first_byte:
+                return (200, headers, body)
+            headers['Content-Range'] = 'bytes {}-{}/{}'.format(first_byte, len(body) - 1, len(body))
+            return (206, headers, body[first_byte:])
+
+        responses.add_callback(responses.GET, URL + '/export', callback=callback)
+
+    def _api_requests(self):
+        return [call.request for call in responses.calls if '/oauth2/' not in call.request.url]
+
+    def _record_streamed_body(self, bodies):
+        def callback(request):
+            bodies.append(b''.join(request.body))
+            return (200, {}, '')
+        return callback
+
+    @responses.activate
+    def test_download_to_path(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        responses.add(responses.GET, URL + '/export', body=b'x' * 2500)
+        self._write(b'old contents')
+
+        response = self.client.download_to(URL + '/export', self.path, chunk_size=1000, params={'course': 'demo'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._read(), b'x' * 2500)
+        self.assertEqual(self._api_requests()[0].url, URL + '/export?course=demo')
+
+    @responses.activate
+    def test_download_to_file(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        responses.add(responses.GET, URL + '/export', body=b'grades')
+        file = io.BytesIO()
+
+        self.client.download_to(URL + '/export', file)
+
+        self.assertEqual(file.getvalue(), b'grades')
+
+    @responses.activate
+    def test_download_error(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        responses.add(responses.GET, URL + '/export', status=404, body=b'Not found')
+        self._write(b'old contents')
+
+        with self.assertRaises(requests.HTTPError):
+            self.client.download_to(URL + '/export', self.path)
+
+        self.assertEqual(self._read(), b'old contents')
+
+    @responses.activate
+    def test_resume_partial_download(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        self._mock_ranges(b'abcdef')
+        self._write(b'abc')
+
+        response = self.client.download_to(URL + '/export', self.path, resume=True)
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self._read(), b'abcdef')
+        request = self._api_requests()[0]
+        self.assertEqual(request.headers['Range'], 'bytes=3-')
+        self.assertEqual(request.headers['Accept-Encoding'], 'identity')
+
+    @responses.activate
+    def test_resume_complete_download(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        self._mock_ranges(b'abcdef')
+        self._write(b'abcdef')
+
+        response = self.client.download_to(URL + '/export', self.path, resume=True)
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(self._read(), b'abcdef')
+
+    @responses.activate
+    def test_resume_wrong_range(self):
+        """
+        Test that a partial response for another range than the one requested isn't written after the partial body
+        """
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        responses.add(
+            responses.GET, URL + '/export', status=206, body=b'cdef', headers={'Content-Range': 'bytes 2-5/6'},
+        )
+        responses.add(responses.GET, URL + '/export', body=b'abcdef')
+        self._write(b'abc')
+
+        response = self.client.download_to(URL + '/export', self.path, resume=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._read(), b'abcdef')
+        self.assertEqual([request.headers.get('Range') for request in self._api_requests()], ['bytes=3-', None])
+
+    @responses.activate
+    def test_unrequested_partial_response(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        responses.add(
+            responses.GET, URL + '/export', status=206, body=b'cdef', headers={'Content-Range': 'bytes 2-5/6'},
+        )
+        self._write(b'old contents')
+
+        with self.assertRaises(requests.HTTPError):
+            self.client.download_to(URL + '/export', self.path)
+
+        self.assertEqual(self._read(), b'old contents')
+
+    @responses.activate
+    def test_resume_without_ranges(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        responses.add(responses.GET, URL + '/export', body=b'abcdef')
+        self._write(b'abcxyz123')
+
+        self.client.download_to(URL + '/export', self.path, resume=True)
+
+        self.assertEqual(self._read(), b'abcdef')
+
+    @responses.activate
+    @ddt.data(True, False)
+    def test_broken_connection(self, resume):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        responses.add(
+            responses.GET, URL + '/export', headers={'Accept-Ranges': 'bytes'},
+            body=io.BufferedReader(_BrokenConnection(b'abc')),
+        )
+        self._mock_ranges(b'abcdef')
+
+        if resume:
+            self.client.download_to(URL + '/export', self.path, resume=True, chunk_size=1)
+            self.assertEqual(self._read(), b'abcdef')
+            self.assertEqual(self._api_requests()[1].headers['Range'], 'bytes=3-')
+        else:
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                self.client.download_to(URL + '/export', self.path, chunk_size=1)
+
+    @responses.activate
+    def test_upload_from_path(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        bodies = []
+        responses.add_callback(
+            responses.PUT, URL + '/import', callback=lambda request: bodies.append(request.body) or (204, {}, ''),
+        )
+        self._write(b'x' * 2500)
+
+        response = self.client.upload_from(URL + '/import', self.path, method='PUT', content_type='text/csv')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(bodies, [b'x' * 2500])
+        request = self._api_requests()[0]
+        self.assertEqual(request.headers['Content-Length'], '2500')
+        self.assertEqual(request.headers['Content-Type'], 'text/csv')
+
+    @responses.activate
+    def test_upload_from_generator(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        bodies = []
+        responses.add_callback(responses.POST, URL + '/import', callback=self._record_streamed_body(bodies))
+
+        self.client.upload_from(URL + '/import', (b'row %d\n' % index for index in range(3)))
+
+        self.assertEqual(bodies, [b'row 0\nrow 1\nrow 2\n'])
+        self.assertEqual(self._api_requests()[0].headers['Transfer-Encoding'], 'chunked')
+
+    @responses.activate
+    def test_upload_multipart(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 600})
+        bodies = []
+        responses.add_callback(responses.POST, URL + '/import', callback=self._record_streamed_body(bodies))
+        self._write(b'username\nedx\n')
+
+        self.client.upload_from(
+            URL + '/import', self.path, field_name='file', content_type='text/csv', fields={'action': 'enroll'},
+            chunk_size=4,
+        )
+
+        content_type = self._api_requests()[0].headers['Content-Type']
+        self.assertTrue(content_type.startswith('multipart/form-data; boundary='))
+        message = email.message_from_bytes(b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + bodies[0])
+        parts = {part.get_param('name', header='content-disposition'): part for part in message.get_payload()}
+        self.assertEqual(parts['action'].get_payload(), 'enroll')
+        self.assertEqual(parts['file'].get_filename(), 'export.csv')
+        self.assertEqual(parts['file'].get_content_type(), 'text/csv')
+        self.assertEqual(parts['file'].get_payload(decode=True), b'username\nedx\n')
+
+    @responses.activate
+    def test_token_outlives_transfer(self):
+        """
+        Test that a transfer doesn't start with a token that could expire before it ends
+        """
+        tokens = [('long-lived', 3600), ('short-lived', 200)]
+
+        def auth_callback(request):  # pylint: disable=unused-argument
+            access_token, expires_in = tokens.pop()
+            return (200, {}, json.dumps({'access_token': access_token, 'expires_in': expires_in}))
+
+        responses.add_callback(responses.POST, self.base_url + '/oauth2/access_token', callback=auth_callback)
+        responses.add(responses.POST, URL + '/import')
+        self.assertEqual(self.client.get_jwt_access_token(), 'short-lived')
+
+        self.client.upload_from(URL + '/import', iter([b'grades']))
+
+        self.assertEqual(self._api_requests()[0].headers['Authorization'], 'JWT long-lived')
+        # Later requests keep the long-lived token.
+        self.client.post(URL + '/import')
+        self.assertEqual(len(responses.calls), 4)
+
+
+@ddt.ddt
+class EndpointTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for OAuthAPIClient.endpoint
+    """
+    base_url = 'http://testing.test'
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.client = OAuthAPIClient(self.base_url, 'test', 'secret')
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+
+    def _api_requests(self):
+        return [call.request for call in responses.calls if call.request.url.startswith(URL)]
+
+    @responses.activate
+    def test_get(self):
+        responses.add(responses.GET, re.compile(URL + '/courses/.*'), json={'id': 'course'})
+        get_course = self.client.endpoint(URL + '/courses/{course_id}/?username={username}')
+
+        response = get_course(course_id='course-v1:edX+DemoX+Demo_Course', username='a&b=c', params={'page': 2})
+
+        self.assertEqual(response.json(), {'id': 'course'})
+        self.assertEqual(
+            response.request.url,
+            URL + '/courses/course-v1:edX+DemoX+Demo_Course/?username=a%26b%3Dc&page=2',
+        )
+        self.assertEqual(response.request.headers['Authorization'], 'JWT abcd')
+        self.assertEqual(response.request.headers['User-Agent'], self.client.headers['User-Agent'])
+        self.assertEqual(repr(get_course), '<Endpoint GET {}/courses/{{course_id}}/?username={{username}}>'.format(URL))
+
+    @responses.activate
+    def test_path_values_escaped(self):
+        responses.add(responses.GET, re.compile(URL + '/users/.*'), json={})
+        get_user = self.client.endpoint(URL + '/users/{username}')
+
+        request = get_user(username='../admin?x=y#z é').request
+
+        self.assertEqual(request.url, URL + '/users/..%2Fadmin%3Fx=y%23z%20%C3%A9')
+
+    @responses.activate
+    @ddt.data(('.', '%2E'), ('..', '%2E%2E'), ('...', '...'), ('a.b', 'a.b'))
+    @ddt.unpack
+    def test_dot_segments_escaped(self, username, escaped_username):
+        responses.add(responses.GET, re.compile(URL + '/users/.*'), json={})
+        get_user = self.client.endpoint(URL + '/users/{username}/?next={next}')
+
+        request = get_user(username=username, next='..').request
+
+        self.assertEqual(request.url, URL + '/users/{}/?next=..'.format(escaped_username))
+
+    @responses.activate
+    @ddt.data(
+        ('GET', '/courses/{course_id}/runs/', {'course_id': 'edX+DemoX'}, {'params': [('a', 1), ('a', 2)]}),
+        ('POST', '/enrollments/', {}, {'json': {'user': 'édx'}, 'headers': {'X-Custom': 'value'}}),
+        ('PUT', '/grades/{username}', {'username': 'edx'}, {'data': {'grade': 'A'}}),
+        ('DELETE', '/grades/{username}?reason=reset', {'username': 'edx'}, {}),
+        ('PATCH', '/grades/{username}', {'username': 'edx'}, {'data': b'body', 'headers': {'Accept': None}}),
+    )
+    @ddt.unpack
+    def test_same_request_as_request(self, method, path, fields, kwargs):
+        """
+        Test that endpoint calls send the same requests as ``OAuthAPIClient.request``
+        """
+        responses.add(method, re.compile(URL + '/.*'))
+        self.client.cookies.set('session', 'cookie')
+
+        expected = self.client.request(method, URL + path.format(**fields), **kwargs).request
+        request = self.client.endpoint(URL + path, method=method.lower())(**fields, **kwargs).request
+
+        self.assertEqual(request.method, expected.method)
+        self.assertEqual(request.url, expected.url)
+        self.assertEqual(dict(request.headers), dict(expected.headers))
+        self.assertEqual(request.body, expected.body)
+
+    @responses.activate
+    @mock.patch('crum.get_current_request')
+    def test_headers(self, mock_get_current_request):
+        mock_get_current_request.return_value.headers = {'X-Request-ID': 'a-request-id'}
+        responses.add(responses.GET, URL + '/courses/', json={})
+        list_courses = self.client.endpoint(
+            URL + '/courses/', headers={'Accept': 'application/json', 'X-Request-ID': 'endpoint-request-id'},
+        )
+
+        request = list_courses().request
+        self.assertEqual(request.headers['Accept'], 'application/json')
+        self.assertEqual(request.headers['X-Request-ID'], 'endpoint-request-id')
+
+        request = list_courses(headers={'Accept': 'text/csv', 'User-Agent': None}).request
+        self.assertEqual(request.headers['Accept'], 'text/csv')
+        self.assertNotIn('User-Agent', request.headers)
+
+        request = self.client.endpoint(URL + '/courses/')().request
+        self.assertEqual(request.headers['X-Request-ID'], 'a-request-id')
+
+    @ddt.data(
+        'http://{host}/courses/',
+        URL + '/courses/#{section}',
+        URL + '/courses/{}',
+        URL + '/courses/{0}',
+        URL + '/courses/{course.id}',
+        URL + '/courses/{course_id!r}',
+        URL + '/courses/{course_id:>10}',
+        URL + '/courses/{json}',
+        URL + '/courses/{self}',
+        URL + '/courses/{course_id',
+    )
+    def test_invalid_template(self, template):
+        with self.assertRaises(ValueError):
+            self.client.endpoint(template)
+
+    @responses.activate
+    def test_client_params(self):
+        responses.add(responses.GET, re.compile(URL + '/courses/.*'))
+        list_courses = self.client.endpoint(URL + '/courses/{org}/')
+        self.client.params = {'format': 'json', 'page_size': 10}
+
+        request = list_courses(org='edx', params={'page_size': 20, 'page': 2}).request
+
+        expected = self.client.get(URL + '/courses/edx/', params={'page_size': 20, 'page': 2}).request
+        self.assertEqual(request.url, URL + '/courses/edx/?format=json&page_size=20&page=2')
+        self.assertEqual(request.url, expected.url)
+        self.assertEqual(list_courses(org='edx').request.url, URL + '/courses/edx/?format=json&page_size=10')
+
+    def test_invalid_token_type(self):
+        with self.assertRaises(ValueError):
+            self.client.endpoint(URL + '/courses/', token_type='mac')
+
+    def test_invalid_fields(self):
+        get_course = self.client.endpoint(URL + '/courses/{course_id}/')
+        with self.assertRaises(TypeError):
+            get_course()
+        with self.assertRaises(TypeError):
+            get_course(course_id='course', run='run')
+        with self.assertRaises(TypeError):
+            self.client.endpoint(URL + '/courses/{course_id}/runs/{course_id}')(course_id='course', run='run')
+
+    @responses.activate
+    def test_token_type(self):
+        responses.add(responses.GET, URL + '/courses/', json={})
+        request = self.client.endpoint(URL + '/courses/', token_type='bearer')().request
+        self.assertEqual(request.headers['Authorization'], 'Bearer abcd')
+
+    @responses.activate
+    def test_rejected_token_replaced(self):
+        self._mock_auth_api(self.base_url + '/oauth2/access_token', 200, {'access_token': 'efgh', 'expires_in': 60})
+        responses.add(responses.POST, URL + '/enrollments/', status=401)
+        responses.add(responses.POST, URL + '/enrollments/', status=201)
+        client_module._TOKEN_INVALIDATION_TIMES.clear()  # pylint: disable=protected-access
+
+        response = self.client.endpoint(URL + '/enrollments/', method='POST')(json={'user': 'edx'})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [request.headers['Authorization'] for request in self._api_requests()], ['JWT abcd', 'JWT efgh'],
+        )
+        self.assertEqual(self._api_requests()[1].body, b'{"user": "edx"}')
+
+    @responses.activate
+    def test_request_hooks(self):
+        timings = []
+        client = OAuthAPIClient(self.base_url, 'test', 'secret', request_hooks=[timings.append])
+        responses.add(responses.GET, URL + '/courses/edx/', json={'id': 'edx'})
+
+        client.endpoint(URL + '/courses/{course_id}/')(course_id='edx', params={'page': 1})
+
+        self.assertEqual(len(timings), 1)
+        self.assertEqual(timings[0].method, 'GET')
+        self.assertEqual(timings[0].url, URL + '/courses/edx/')
+        self.assertEqual(timings[0].status_code, 200)
+        self.assertEqual(timings[0].response_bytes, len(b'{"id": "edx"}'))
+
+    @responses.activate
+    @ddt.data(
+        ('GET', {'coalesce_requests': True}, True),
+        ('POST', {'coalesce_requests': True}, False),
+        ('GET', {'response_cache': mock.Mock()}, True),
+        ('GET', {}, False),
+    )
+    @ddt.unpack
+    def test_uses_request(self, method, client_kwargs, uses_request):
+        """
+        Test that requests that may be coalesced or served from the response cache are made with ``request``
+        """
+        client = OAuthAPIClient(self.base_url, 'test', 'secret', **client_kwargs)
+        responses.add(method, URL + '/courses/edx/')
+        endpoint = client.endpoint(URL + '/courses/{course_id}/', method=method, headers={'Accept': 'text/csv'})
+
+        with mock.patch.object(client, 'request', wraps=client.request) as mock_request:
+            endpoint(course_id='edx', timeout=1)
+
+        if uses_request:
+            mock_request.assert_called_once_with(
+                method, URL + '/courses/edx/', headers={'Accept': 'text/csv'}, token_type='jwt', timeout=1,
+            )
+        else:
+            mock_request.assert_not_called()
@@ -0,0 +1,183 @@
+from unittest import TestCase, mock
+
+import requests
+import responses
+from edx_django_utils.cache import TieredCache
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import SpanKind, StatusCode
+
+from edx_rest_api_client.client import OAuthAPIClient
+from edx_rest_api_client.instrumentation import (
+    TOKEN_CACHE_HIT,
+    TOKEN_CACHE_MISS,
+    TOKEN_MEMO,
+    OpenTelemetryHook,
+    RequestTimings,
+)
+from edx_rest_api_client.response_cache import LRUResponseCacheBackend, ResponseCache
+from edx_rest_api_client.tests.mixins import AuthenticationTestMixin
+
+BASE_URL = 'http://testing.test'
+API_URL = 'http://api.test/courses/'
+
+
+class RequestHooksTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for the request hooks of OAuthAPIClient
+    """
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.timings = []
+        self.client = OAuthAPIClient(BASE_URL, 'test', 'secret', request_hooks=[self.timings.append])
+
+    def _mock_auth(self):
+        self._mock_auth_api(BASE_URL + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+
+    @responses.activate
+    def test_timings(self):
+        self._mock_auth()
+        responses.add(responses.GET, API_URL, json={'count': 1})
+
+        self.client.get(API_URL, params={'page': 1})
+        self.client.get(API_URL)
+
+        first, second = self.timings[0], self.timings[1]
+        self.assertEqual((first.method, first.url, first.status_code), ('GET', API_URL, 200))
+        self.assertEqual(first.response_bytes, len(b'{"count": 1}'))
+        self.assertEqual(first.token_cache, TOKEN_CACHE_MISS)
+        self.assertEqual(second.token_cache, TOKEN_MEMO)
+        self.assertGreaterEqual(first.token_seconds, 0)
+        self.assertGreaterEqual(first.total_seconds, first.token_seconds)
+        self.assertIsNotNone(first.ttfb_seconds)
+        self.assertIsNone(first.exception)
+
+    @responses.activate
+    def test_token_cache_hit(self):
+        self._mock_auth()
+        responses.add(responses.GET, API_URL, json={})
+        OAuthAPIClient(BASE_URL, 'test', 'secret').get_jwt_access_token()
+
+        self.client.get(API_URL)
+
+        self.assertEqual(self.timings[0].token_cache, TOKEN_CACHE_HIT)
+
+    @responses.activate
+    @mock.patch('edx_rest_api_client.client.set_custom_attribute')
+    def test_token_custom_attributes(self, mock_set_custom_attribute):
+        self._mock_auth()
+        responses.add(responses.GET, API_URL, json={})
+
+        self.client.get(API_URL)
+
+        mock_set_custom_attribute.assert_any_call('api_client_token_cache', TOKEN_CACHE_MISS)
+        token_seconds = [
+            call.args[1] for call in mock_set_custom_attribute.call_args_list
+            if call.args[0] == 'api_client_token_seconds'
+        ]
+        self.assertEqual(len(token_seconds), 1)
+
+    @responses.activate
+    def test_streamed_response(self):
+        self._mock_auth()
+        responses.add(responses.GET, API_URL, body=b'0123456789', headers={'Content-Length': '10'})
+
+        self.client.get(API_URL, stream=True)
+
+        self.assertEqual(self.timings[0].response_bytes, 10)
+
+    @responses.activate
+    def test_exception(self):
+        self._mock_auth()
+        responses.add(responses.GET, API_URL, body=requests.ConnectionError('down'))
+
+        with self.assertRaises(requests.ConnectionError):
+            self.client.get(API_URL)
+
+        self.assertIsInstance(self.timings[0].exception, requests.ConnectionError)
+        self.assertIsNone(self.timings[0].status_code)
+        self.assertIsNotNone(self.timings[0].total_seconds)
+
+    @responses.activate
+    def test_failing_hook(self):
+        self._mock_auth()
+        responses.add(responses.GET, API_URL, json={})
+        failing_hook = mock.Mock(side_effect=ValueError)
+        client = OAuthAPIClient(BASE_URL, 'test', 'secret', request_hooks=[failing_hook, self.timings.append])
+
+        with self.assertLogs('edx_rest_api_client.client', level='ERROR'):
+            response = client.get(API_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.timings), 1)
+
+    @responses.activate
+    def test_response_cache_hit(self):
+        self._mock_auth()
+        responses.add(responses.GET, API_URL, json={}, headers={'Cache-Control': 'max-age=60'})
+        client = OAuthAPIClient(
+            BASE_URL, 'test', 'secret',
+            response_cache=ResponseCache(LRUResponseCacheBackend()),
+            request_hooks=[self.timings.append],
+        )
+
+        client.get(API_URL)
+        client.get(API_URL)
+
+        self.assertFalse(self.timings[0].from_cache)
+        self.assertTrue(self.timings[1].from_cache)
+        self.assertIsNone(self.timings[1].ttfb_seconds)
+        self.assertIsNone(self.timings[1].token_cache)
+
+
+class OpenTelemetryHookTests(TestCase):
+    """
+    Tests for OpenTelemetryHook
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.exporter = InMemorySpanExporter()
+        tracer_provider = TracerProvider()
+        tracer_provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self.hook = OpenTelemetryHook(tracer_provider=tracer_provider)
+
+    def _timings(self, **kwargs):
+        timings = RequestTimings('get', API_URL, start_time_ns=1_000_000_000)
+        timings.total_seconds = 0.25
+        for name, value in kwargs.items():
+            setattr(timings, name, value)
+        return timings
+
+    def test_span(self):
+        self.hook(self._timings(status_code=200, response_bytes=12, token_cache=TOKEN_MEMO, token_seconds=0.0))
+
+        span = self.exporter.get_finished_spans()[0]
+        self.assertEqual(span.name, 'GET')
+        self.assertEqual(span.kind, SpanKind.CLIENT)
+        self.assertEqual((span.start_time, span.end_time), (1_000_000_000, 1_250_000_000))
+        self.assertEqual(span.attributes['http.request.method'], 'GET')
+        self.assertEqual(span.attributes['server.address'], 'api.test')
+        self.assertEqual(span.attributes['http.response.status_code'], 200)
+        self.assertEqual(span.attributes['http.response.body.size'], 12)
+        self.assertEqual(span.attributes['edx_rest_api_client.token_cache'], TOKEN_MEMO)
+        self.assertNotIn('edx_rest_api_client.ttfb_seconds', span.attributes)
+        self.assertEqual(span.status.status_code, StatusCode.UNSET)
+
+    def test_server_error(self):
+        self.hook(self._timings(status_code=503))
+
+        span = self.exporter.get_finished_spans()[0]
+        self.assertEqual(span.attributes['error.type'], '503')
+        self.assertEqual(span.status.status_code, StatusCode.ERROR)
+
+    def test_exception(self):
+        self.hook(self._timings(exception=requests.ConnectionError('down')))
+
+        span = self.exporter.get_finished_spans()[0]
+        self.assertEqual(span.attributes['error.type'], 'ConnectionError')
+        self.assertEqual(span.status.status_code, StatusCode.ERROR)
+        self.assertEqual(span.events[0].name, 'exception')
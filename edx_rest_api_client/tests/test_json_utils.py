@@ -0,0 +1,123 @@
+import io
+import json
+from unittest import TestCase, mock
+
+import ddt
+import requests
+
+from edx_rest_api_client import json_utils
+from edx_rest_api_client.json_utils import decode_response, iter_json_items, loads
+
+
+def _response(content, encoding=None):
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(content)
+    response.encoding = encoding
+    return response
+
+
+@ddt.ddt
+class LoadsTests(TestCase):
+    """
+    Tests for loads
+    """
+
+    @ddt.data(
+        {'orjson': json_utils.orjson},
+        {'orjson': None, 'msgspec': mock.Mock(json=mock.Mock(decode=json.loads))},
+        {'orjson': None, 'msgspec': None},
+    )
+    def test_backends(self, backends):
+        with mock.patch.multiple(json_utils, **backends):
+            self.assertEqual(loads(b'{"results": [1, "\\u00e9"]}'), {'results': [1, 'é']})
+
+    @ddt.data(
+        {'orjson': json_utils.orjson},
+        {'orjson': None, 'msgspec': mock.Mock(json=mock.Mock(decode=mock.Mock(side_effect=ValueError('bad'))))},
+        {'orjson': None, 'msgspec': None},
+    )
+    def test_invalid(self, backends):
+        with mock.patch.multiple(json_utils, **backends):
+            with self.assertRaises(requests.JSONDecodeError):
+                loads(b'{"results": ')
+
+
+@ddt.ddt
+class DecodeResponseTests(TestCase):
+    """
+    Tests for decode_response
+    """
+
+    @ddt.data(None, 'utf-8', 'UTF8')
+    def test_utf8(self, encoding):
+        response = _response('{"name": "été"}'.encode('utf-8'), encoding)
+        with mock.patch.object(response, 'json') as mock_json:
+            self.assertEqual(decode_response(response), {'name': 'été'})
+        mock_json.assert_not_called()
+
+    @ddt.data(
+        ('{"name": "été"}'.encode('latin-1'), 'latin-1'),
+        ('{"name": "été"}'.encode('utf-16'), None),
+        ('{"name": "été"}'.encode('utf-8-sig'), None),
+    )
+    @ddt.unpack
+    def test_other_encodings(self, content, encoding):
+        self.assertEqual(decode_response(_response(content, encoding)), {'name': 'été'})
+
+    def test_invalid(self):
+        with self.assertRaises(requests.JSONDecodeError):
+            decode_response(_response(b'<html></html>'))
+
+
+@ddt.ddt
+class IterJsonItemsTests(TestCase):
+    """
+    Tests for iter_json_items
+    """
+    document = {
+        'count': 3,
+        'next': 'http://testing.test/?page=2',
+        'results': [
+            {'id': 1, 'name': 'Café \U0001f600', 'tags': ['a', 'b']},
+            {'id': 22, 'text': 'brackets ] } [ { and "quotes", \\ backslashes'},
+            12345678,
+        ],
+        'facets': {'total': 1.5e3},
+    }
+
+    @ddt.data(1, 2, 3, 7, 64 * 1024)
+    def test_chunk_sizes(self, chunk_size):
+        metadata = {}
+        content = json.dumps(self.document, ensure_ascii=False, indent=2).encode('utf-8')
+        items = list(iter_json_items(_response(content), metadata=metadata, chunk_size=chunk_size))
+        self.assertEqual(items, self.document['results'])
+        self.assertEqual(metadata, {key: value for key, value in self.document.items() if key != 'results'})
+
+    def test_items_are_lazy(self):
+        content = json.dumps(self.document).encode('utf-8')
+        response = _response(content)
+        items = iter_json_items(response, chunk_size=16)
+        self.assertEqual(next(items), self.document['results'][0])
+        self.assertLess(response.raw.tell(), len(content))
+
+    @ddt.data(b'[1, {"a": 2}, "three"]', b' [ 1 , {"a" : 2} , "three" ] ')
+    def test_array(self, content):
+        self.assertEqual(list(iter_json_items(_response(content), chunk_size=2)), [1, {'a': 2}, 'three'])
+
+    @ddt.data(b'{}', b'[]', b'{"results": []}', b'{"count": 0, "results": null}')
+    def test_no_items(self, content):
+        self.assertEqual(list(iter_json_items(_response(content))), [])
+
+    def test_other_key(self):
+        content = b'{"results": [1], "items": [2, 3]}'
+        self.assertEqual(list(iter_json_items(_response(content), key='items')), [2, 3])
+
+    def test_encoding(self):
+        content = '{"results": ["été"]}'.encode('latin-1')
+        self.assertEqual(list(iter_json_items(_response(content, 'latin-1'), chunk_size=1)), ['été'])
+
+    @ddt.data(b'', b'"results"', b'{"results": [1, 2', b'{"results": [1 2]}', b'{"results": [1], }')
+    def test_invalid(self, content):
+        with self.assertRaises(requests.JSONDecodeError):
+            list(iter_json_items(_response(content), chunk_size=4))
@@ -0,0 +1,151 @@
+import gc
+import weakref
+from unittest import TestCase, mock
+
+import responses
+from django.http import HttpRequest
+from edx_django_utils.cache import TieredCache
+
+from edx_rest_api_client import propagation
+from edx_rest_api_client.client import OAuthAPIClient
+from edx_rest_api_client.propagation import get_propagated_headers, get_propagation_context
+from edx_rest_api_client.tests.mixins import AuthenticationTestMixin
+
+BASE_URL = 'http://testing.test'
+API_URL = 'http://api.test/courses/'
+TRACEPARENT = '00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01'
+
+
+def _inbound_request(**meta):
+    request = HttpRequest()
+    request.META.update(meta)
+    return request
+
+
+class PropagationContextTests(TestCase):
+    """
+    Tests for get_propagation_context
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.inbound_request = _inbound_request(HTTP_X_REQUEST_ID='a-request-id', HTTP_TRACEPARENT=TRACEPARENT)
+        patcher = mock.patch('crum.get_current_request', return_value=self.inbound_request)
+        self.mock_get_current_request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_headers(self):
+        self.assertEqual(dict(get_propagated_headers()), {'X-Request-ID': 'a-request-id'})
+        self.assertEqual(
+            dict(get_propagated_headers(('X-Request-ID', 'traceparent', 'X-Tenant-ID'))),
+            {'X-Request-ID': 'a-request-id', 'traceparent': TRACEPARENT},
+        )
+        with self.assertRaises(TypeError):
+            get_propagated_headers()['X-Request-ID'] = 'another-request-id'
+
+    def test_snapshot_per_request(self):
+        context = get_propagation_context()
+        self.assertIs(get_propagation_context(), context)
+
+        self.mock_get_current_request.return_value = _inbound_request(HTTP_X_REQUEST_ID='another-request-id')
+        self.assertEqual(get_propagation_context().headers['X-Request-ID'], 'another-request-id')
+
+    def test_released_with_request(self):
+        inbound_request = _inbound_request(HTTP_X_REQUEST_ID='another-request-id')
+        inbound_request_ref = weakref.ref(inbound_request)
+        self.mock_get_current_request.return_value = inbound_request
+        get_propagation_context()
+        self.assertIn(inbound_request, propagation._CONTEXTS)  # pylint: disable=protected-access
+
+        self.mock_get_current_request.return_value = None
+        del inbound_request
+        gc.collect()
+        self.assertIsNone(inbound_request_ref())
+
+    def test_no_request(self):
+        self.mock_get_current_request.return_value = None
+        self.assertIsNone(get_propagation_context())
+        self.assertEqual(get_propagated_headers(), {})
+
+    @mock.patch('edx_rest_api_client.propagation.set_custom_attribute')
+    def test_custom_attribute_set_once(self, mock_set_custom_attribute):
+        for _ in range(3):
+            get_propagation_context().set_custom_attribute('api_client', 'OAuthAPIClient')
+        mock_set_custom_attribute.assert_called_once_with('api_client', 'OAuthAPIClient')
+
+
+class ClientPropagationTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for the headers OAuthAPIClient propagates from the current Django request
+    """
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.inbound_request = _inbound_request(
+            HTTP_X_REQUEST_ID='a-request-id', HTTP_TRACEPARENT=TRACEPARENT, HTTP_X_TENANT_ID='edx',
+        )
+        patcher = mock.patch('crum.get_current_request', return_value=self.inbound_request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _mock_apis(self):
+        self._mock_auth_api(BASE_URL + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+        responses.add(responses.GET, API_URL, json={})
+
+    @responses.activate
+    def test_extra_headers(self):
+        self._mock_apis()
+        client = OAuthAPIClient(BASE_URL, 'test', 'secret', propagate_headers=['X-Request-ID', 'traceparent'])
+        headers = {'traceparent': 'caller-traceparent', 'Accept': 'application/json'}
+
+        request = client.get(API_URL, headers=headers).request
+
+        self.assertEqual(request.headers['X-Request-ID'], 'a-request-id')
+        self.assertEqual(request.headers['traceparent'], 'caller-traceparent')
+        self.assertEqual(request.headers['Accept'], 'application/json')
+        self.assertNotIn('X-Tenant-ID', request.headers)
+        # The caller's headers are left as they were.
+        self.assertEqual(headers, {'traceparent': 'caller-traceparent', 'Accept': 'application/json'})
+
+    @responses.activate
+    def test_headers_read_once(self):
+        self._mock_apis()
+        client = OAuthAPIClient(BASE_URL, 'test', 'secret')
+
+        with mock.patch.object(propagation, '_read_headers', wraps=propagation._read_headers) as mock_read_headers:  # pylint: disable=protected-access
+            for _ in range(3):
+                self.assertEqual(client.get(API_URL).request.headers['X-Request-ID'], 'a-request-id')
+
+        self.assertEqual(mock_read_headers.call_count, 1)
+
+    @responses.activate
+    @mock.patch('edx_rest_api_client.client.set_custom_attribute')
+    @mock.patch('edx_rest_api_client.propagation.set_custom_attribute')
+    def test_custom_attribute(self, mock_set_request_attribute, mock_set_custom_attribute):
+        self._mock_apis()
+        client = OAuthAPIClient(BASE_URL, 'test', 'secret')
+
+        client.get(API_URL)
+        client.get(API_URL)
+        mock_set_request_attribute.assert_called_once_with('api_client', 'OAuthAPIClient')
+
+        # Outside of a Django request, each call sets it.
+        with mock.patch('crum.get_current_request', return_value=None):
+            client.get(API_URL)
+            client.get(API_URL)
+        self.assertEqual(
+            [attribute for attribute in mock_set_custom_attribute.call_args_list if attribute[0][0] == 'api_client'],
+            [mock.call('api_client', 'OAuthAPIClient')] * 2,
+        )
+
+    @responses.activate
+    def test_batch(self):
+        self._mock_apis()
+        client = OAuthAPIClient(BASE_URL, 'test', 'secret', propagate_headers=['X-Request-ID', 'X-Tenant-ID'])
+
+        results = client.batch([('GET', API_URL), ('GET', API_URL, {'headers': {'X-Tenant-ID': 'other'}})])
+
+        self.assertEqual(results[0].response.request.headers['X-Tenant-ID'], 'edx')
+        self.assertEqual(results[1].response.request.headers['X-Tenant-ID'], 'other')
+        self.assertEqual(results[1].response.request.headers['X-Request-ID'], 'a-request-id')
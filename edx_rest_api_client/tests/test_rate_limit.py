@@ -0,0 +1,274 @@
+from unittest import TestCase, mock
+
+import requests
+import responses
+from django.core.cache import cache as django_cache
+from edx_django_utils.cache import TieredCache
+
+from edx_rest_api_client.client import OAuthAPIClient
+from edx_rest_api_client.exceptions import RateLimitedError
+from edx_rest_api_client.rate_limit import RateLimit, RateLimiter
+from edx_rest_api_client.tests.mixins import AuthenticationTestMixin
+
+BASE_URL = 'http://testing.test'
+API_URL = 'http://api.test/courses/'
+
+
+class FakeClock:
+    """
+    Stands in for the time module, with a clock that only moves when sleeping.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return 1_700_000_000 + self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _response(status_code=200, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+class RateLimiterTests(TestCase):
+    """
+    Tests for RateLimiter
+    """
+
+    def setUp(self):
+        super().setUp()
+        django_cache.clear()
+        self.clock = FakeClock()
+        time_patcher = mock.patch('edx_rest_api_client.rate_limit.time', self.clock)
+        time_patcher.start()
+        self.addCleanup(time_patcher.stop)
+
+    def _call(self, limiter, url=API_URL, status_code=200, headers=None):
+        return limiter.call(url, lambda: _response(status_code, headers))
+
+    def test_token_bucket(self):
+        limiter = RateLimiter({'api.test': RateLimit(rate=2, burst=2)})
+
+        for _ in range(4):
+            self._call(limiter)
+
+        self.assertEqual(self.clock.sleeps, [0.5, 0.5])
+
+    def test_bucket_refills(self):
+        limiter = RateLimiter({'api.test': RateLimit(rate=2, burst=2)})
+        self._call(limiter)
+        self._call(limiter)
+
+        self.clock.now += 1
+        self._call(limiter)
+        self._call(limiter)
+
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_destinations(self):
+        slow_limit = RateLimit(rate=1)
+        host_limit = RateLimit(rate=100)
+        default_limit = RateLimit(rate=10)
+        limiter = RateLimiter(
+            {
+                'http://api.test/slow/': slow_limit,
+                'http://api.test/slow/but-not-this/': host_limit,
+                'api.test': host_limit,
+            },
+            default=default_limit,
+        )
+
+        # pylint: disable=protected-access
+        self.assertIs(limiter._get_destination('http://api.test/slow/1/').limit, slow_limit)
+        self.assertIs(limiter._get_destination('http://api.test/slow/but-not-this/').limit, host_limit)
+        self.assertIs(limiter._get_destination('http://api.test/fast/').limit, host_limit)
+        other_destination = limiter._get_destination('http://other.test/')
+        self.assertEqual((other_destination.key, other_destination.limit), ('other.test', default_limit))
+        self.assertIsNot(other_destination, limiter._get_destination('http://another.test/'))
+        self.assertIsNone(RateLimiter({'api.test': host_limit})._get_destination('http://other.test/'))
+
+    def test_default_ports(self):
+        limit = RateLimit(rate=1)
+        limiter = RateLimiter({'API.test': limit, 'https://prefix.test:443/slow/': limit, 'port.test:8000': limit})
+
+        # pylint: disable=protected-access
+        self.assertIs(limiter._get_destination('https://api.test:443/').limit, limit)
+        self.assertIs(limiter._get_destination('http://api.test:80/').limit, limit)
+        self.assertIs(limiter._get_destination('HTTPS://Api.Test/').limit, limit)
+        self.assertIs(limiter._get_destination('https://prefix.test/slow/1/').limit, limit)
+        self.assertIs(limiter._get_destination('http://port.test:8000/').limit, limit)
+        self.assertIsNone(limiter._get_destination('http://port.test/'))
+        self.assertIsNone(limiter._get_destination('https://api.test:8443/'))
+        self.assertIs(RateLimiter({'api.test:443': limit})._get_destination('https://api.test/').limit, limit)
+
+    def test_unlimited_destination(self):
+        limiter = RateLimiter({'other.test': RateLimit(rate=1)})
+
+        for _ in range(3):
+            self._call(limiter)
+
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_max_in_flight(self):
+        limiter = RateLimiter({'api.test': RateLimit(max_in_flight=1)}, max_wait_seconds=0)
+
+        def send():
+            with self.assertRaises(RateLimitedError):
+                self._call(limiter)
+            return _response()
+
+        limiter.call(API_URL, send)
+        # The slot is released once the response is received.
+        self._call(limiter)
+
+    def test_max_wait(self):
+        limiter = RateLimiter({'api.test': RateLimit(rate=1)}, max_wait_seconds=0.5)
+        self._call(limiter)
+
+        with self.assertRaises(RateLimitedError) as context:
+            self._call(limiter)
+        self.assertEqual(context.exception.destination, 'api.test')
+
+        # The rejected request didn't use up a token.
+        self.clock.now += 1
+        self._call(limiter)
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_retry_after(self):
+        limiter = RateLimiter({'api.test': RateLimit(rate=10)})
+
+        self._call(limiter, status_code=429, headers={'Retry-After': '7'})
+        self._call(limiter)
+
+        self.assertEqual(self.clock.sleeps, [7])
+
+    def test_throttled_without_retry_after(self):
+        limiter = RateLimiter({'api.test': RateLimit(max_in_flight=5)})
+
+        self._call(limiter, status_code=429)
+        self._call(limiter)
+
+        self.assertEqual(self.clock.sleeps, [RateLimiter.DEFAULT_THROTTLED_SECONDS])
+
+    def test_rate_adapts(self):
+        limiter = RateLimiter({'api.test': RateLimit(rate=10)})
+        destination = limiter._get_destination(API_URL)  # pylint: disable=protected-access
+
+        self._call(limiter, status_code=429, headers={'Retry-After': '0'})
+        self._call(limiter, status_code=429, headers={'Retry-After': '0'})
+        self.assertEqual(destination.rate_factor, 0.25)
+
+        for _ in range(20):
+            self._call(limiter)
+        self.assertEqual(destination.rate_factor, 1.0)
+
+    @mock.patch('edx_rest_api_client.rate_limit.set_custom_attribute')
+    def test_custom_attributes(self, mock_set_custom_attribute):
+        limiter = RateLimiter({'api.test': RateLimit(rate=1)})
+
+        self._call(limiter, status_code=429, headers={'Retry-After': '2'})
+        self._call(limiter)
+
+        mock_set_custom_attribute.assert_any_call('api_client_rate_limit_throttled', 'api.test')
+        mock_set_custom_attribute.assert_any_call('api_client_rate_limit_wait_seconds', 2)
+
+    def test_shared_rate(self):
+        """
+        Test that limiters in different processes share the rate through the Django cache
+        """
+        limit = RateLimit(rate=2)
+        first_limiter = RateLimiter({'api.test': limit}, shared=True)
+        second_limiter = RateLimiter({'api.test': limit}, shared=True)
+
+        self._call(first_limiter)
+        self._call(first_limiter)
+        self._call(second_limiter)
+
+        self.assertEqual(self.clock.sleeps, [1])
+
+    def test_shared_pause(self):
+        first_limiter = RateLimiter({'api.test': RateLimit(rate=10)}, shared=True)
+        second_limiter = RateLimiter({'api.test': RateLimit(rate=10)}, shared=True)
+
+        self._call(first_limiter, status_code=429, headers={'Retry-After': '5'})
+        self._call(second_limiter)
+
+        self.assertEqual(self.clock.sleeps, [5])
+
+    def test_shared_max_wait(self):
+        limiter = RateLimiter({'api.test': RateLimit(rate=1)}, shared=True, max_wait_seconds=0.5)
+        self._call(limiter)
+
+        with self.assertRaises(RateLimitedError):
+            self._call(limiter)
+
+    @mock.patch('edx_rest_api_client.rate_limit.get_django_cache')
+    def test_shared_cache_unavailable(self, mock_get_django_cache):
+        mock_cache = mock_get_django_cache.return_value
+        mock_cache.get.return_value = None
+        mock_cache.incr.side_effect = ValueError
+        limiter = RateLimiter({'api.test': RateLimit(rate=1)}, shared=True)
+
+        for _ in range(3):
+            self._call(limiter)
+
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_invalid_limits(self):
+        with self.assertRaises(ValueError):
+            RateLimit(rate=0)
+        with self.assertRaises(ValueError):
+            RateLimit(max_in_flight=0)
+
+
+class RateLimitedClientTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for OAuthAPIClient with a RateLimiter
+    """
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.clock = FakeClock()
+        time_patcher = mock.patch('edx_rest_api_client.rate_limit.time', self.clock)
+        time_patcher.start()
+        self.addCleanup(time_patcher.stop)
+        self._mock_auth_api(BASE_URL + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+
+    @responses.activate
+    def test_throttled(self):
+        responses.add(responses.GET, API_URL, status=429, headers={'Retry-After': '3'})
+        responses.add(responses.GET, API_URL, json={})
+        client = OAuthAPIClient(
+            BASE_URL, 'test', 'secret', rate_limiter=RateLimiter({'api.test': RateLimit(rate=100)}),
+        )
+
+        self.assertEqual(client.get(API_URL).status_code, 429)
+        self.assertEqual(client.get(API_URL).status_code, 200)
+
+        self.assertEqual(self.clock.sleeps, [3])
+        # Access token requests aren't limited.
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_rate_limited(self):
+        responses.add(responses.GET, API_URL, json={})
+        client = OAuthAPIClient(
+            BASE_URL, 'test', 'secret',
+            rate_limiter=RateLimiter({'api.test': RateLimit(rate=1)}, max_wait_seconds=0),
+        )
+        client.get(API_URL)
+
+        with self.assertRaises(RateLimitedError):
+            client.get(API_URL)
@@ -0,0 +1,235 @@
+from unittest import TestCase, mock
+
+import ddt
+import responses
+from edx_django_utils.cache import TieredCache
+from requests.auth import HTTPBasicAuth
+
+from edx_rest_api_client.client import OAuthAPIClient
+from edx_rest_api_client.response_cache import LRUResponseCacheBackend, ResponseCache, TieredCacheResponseBackend
+from edx_rest_api_client.tests.mixins import AuthenticationTestMixin
+
+BASE_URL = 'http://testing.test'
+API_URL = 'http://api.test/courses/'
+
+
+def _entry(content):
+    return {'content': content}
+
+
+class LRUResponseCacheBackendTests(TestCase):
+    """
+    Tests for LRUResponseCacheBackend
+    """
+
+    def test_get_and_set(self):
+        backend = LRUResponseCacheBackend()
+        self.assertIsNone(backend.get('key'))
+        backend.set('key', _entry(b'body'), 60)
+        self.assertEqual(backend.get('key'), _entry(b'body'))
+        backend.delete('key')
+        self.assertIsNone(backend.get('key'))
+
+    @mock.patch('edx_rest_api_client.response_cache.time.monotonic')
+    def test_expiry(self, mock_monotonic):
+        backend = LRUResponseCacheBackend()
+        mock_monotonic.return_value = 100
+        backend.set('key', _entry(b'body'), 60)
+        mock_monotonic.return_value = 160
+        self.assertIsNone(backend.get('key'))
+
+    def test_size_eviction(self):
+        backend = LRUResponseCacheBackend(max_bytes=10)
+        backend.set('a', _entry(b'1234'), 60)
+        backend.set('b', _entry(b'1234'), 60)
+        # Using 'a' makes 'b' the least recently used entry.
+        backend.get('a')
+        backend.set('c', _entry(b'1234'), 60)
+        self.assertIsNotNone(backend.get('a'))
+        self.assertIsNone(backend.get('b'))
+        self.assertIsNotNone(backend.get('c'))
+
+    def test_replace(self):
+        backend = LRUResponseCacheBackend(max_bytes=10)
+        backend.set('a', _entry(b'12345678'), 60)
+        backend.set('a', _entry(b'1234'), 60)
+        backend.set('b', _entry(b'1234'), 60)
+        self.assertEqual(backend.get('a'), _entry(b'1234'))
+        self.assertIsNotNone(backend.get('b'))
+
+    def test_too_large(self):
+        backend = LRUResponseCacheBackend(max_bytes=2)
+        backend.set('a', _entry(b'1234'), 60)
+        self.assertIsNone(backend.get('a'))
+
+    def test_too_large_replacement(self):
+        backend = LRUResponseCacheBackend(max_bytes=10)
+        backend.set('a', _entry(b'old'), 60)
+        backend.set('a', _entry(b'new-and-much-too-large'), 60)
+        self.assertIsNone(backend.get('a'))
+        self.assertEqual(backend._size, 0)  # pylint: disable=protected-access
+
+
+@ddt.ddt
+class ResponseCacheTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for caching responses with OAuthAPIClient
+    """
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.response_cache = ResponseCache(LRUResponseCacheBackend())
+        self.client = OAuthAPIClient(BASE_URL, 'test', 'secret', response_cache=self.response_cache)
+        self._mock_auth_api(BASE_URL + '/oauth2/access_token', 200, {'access_token': 'abcd', 'expires_in': 60})
+
+    def _api_calls(self):
+        return [call for call in responses.calls if call.request.url.startswith(API_URL)]
+
+    @responses.activate
+    @ddt.data(LRUResponseCacheBackend, TieredCacheResponseBackend)
+    def test_fresh_response(self, backend_class):
+        client = OAuthAPIClient(BASE_URL, 'test', 'secret', response_cache=ResponseCache(backend_class()))
+        responses.add(responses.GET, API_URL, json={'count': 1}, headers={'Cache-Control': 'max-age=60'})
+
+        first_response = client.get(API_URL)
+        second_response = client.get(API_URL)
+
+        self.assertEqual(second_response.json(), {'count': 1})
+        self.assertEqual(second_response.headers['Content-Type'], 'application/json')
+        self.assertTrue(second_response.from_cache)
+        self.assertFalse(hasattr(first_response, 'from_cache'))
+        second_response.close()
+        self.assertEqual(len(self._api_calls()), 1)
+
+    @responses.activate
+    def test_expires_header(self):
+        responses.add(responses.GET, API_URL, json={}, headers={'Expires': 'Thu, 01 Jan 2099 00:00:00 GMT'})
+        self.client.get(API_URL)
+        self.assertTrue(self.client.get(API_URL).from_cache)
+
+    @responses.activate
+    def test_expired_response(self):
+        responses.add(responses.GET, API_URL, json={}, headers={'Cache-Control': 'max-age=60'})
+        self.client.get(API_URL)
+        with mock.patch('edx_rest_api_client.response_cache.time.time', return_value=2 ** 40):
+            self.client.get(API_URL)
+        self.assertEqual(len(self._api_calls()), 2)
+
+    @responses.activate
+    @ddt.data(
+        {'Cache-Control': 'no-store, max-age=60'},
+        {'Cache-Control': 'max-age=60', 'Vary': '*'},
+        {},
+    )
+    def test_not_cached(self, headers):
+        responses.add(responses.GET, API_URL, json={}, headers=headers)
+        self.client.get(API_URL)
+        self.client.get(API_URL)
+        self.assertEqual(len(self._api_calls()), 2)
+
+    @responses.activate
+    def test_error_not_cached(self):
+        responses.add(responses.GET, API_URL, status=500, headers={'Cache-Control': 'max-age=60'})
+        self.client.get(API_URL)
+        self.client.get(API_URL)
+        self.assertEqual(len(self._api_calls()), 2)
+
+    @responses.activate
+    def test_etag_revalidation(self):
+        responses.add(
+            responses.GET, API_URL, json={'count': 1},
+            headers={'Cache-Control': 'no-cache', 'ETag': '"v1"'},
+        )
+        responses.add(responses.GET, API_URL, status=304, headers={'ETag': '"v1"', 'X-Checked': 'yes'})
+
+        self.client.get(API_URL)
+        response = self.client.get(API_URL)
+
+        self.assertEqual(self._api_calls()[1].request.headers['If-None-Match'], '"v1"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'count': 1})
+        self.assertEqual(response.headers['X-Checked'], 'yes')
+        self.assertTrue(response.from_cache)
+
+    @responses.activate
+    def test_last_modified_revalidation_changed(self):
+        last_modified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+        responses.add(responses.GET, API_URL, json={'count': 1}, headers={'Last-Modified': last_modified})
+        responses.add(responses.GET, API_URL, json={'count': 2}, headers={'Last-Modified': last_modified})
+
+        self.client.get(API_URL)
+        response = self.client.get(API_URL)
+
+        self.assertEqual(self._api_calls()[1].request.headers['If-Modified-Since'], last_modified)
+        self.assertEqual(response.json(), {'count': 2})
+
+    @responses.activate
+    def test_key_includes_query_and_headers(self):
+        responses.add(responses.GET, API_URL, json={}, headers={'Cache-Control': 'max-age=60'})
+        self.client.get(API_URL, params={'page': 1})
+        self.client.get(API_URL, params={'page': 2})
+        self.client.get(API_URL, params={'page': 2}, headers={'Accept-Language': 'fr'})
+        self.client.get(API_URL, params={'page': 2})
+        self.assertEqual(len(self._api_calls()), 3)
+
+    @responses.activate
+    def test_vary(self):
+        headers = {'Cache-Control': 'max-age=60', 'Vary': 'X-Tenant-ID'}
+        responses.add(responses.GET, API_URL, json={'tenant': 'a'}, headers=headers)
+        responses.add(responses.GET, API_URL, json={'tenant': 'b'}, headers=headers)
+
+        self.assertEqual(self.client.get(API_URL, headers={'X-Tenant-ID': 'a'}).json(), {'tenant': 'a'})
+        response = self.client.get(API_URL, headers={'X-Tenant-ID': 'b'})
+        self.assertEqual(response.json(), {'tenant': 'b'})
+        self.assertFalse(hasattr(response, 'from_cache'))
+        response = self.client.get(API_URL, headers={'x-tenant-id': 'b'})
+        self.assertEqual(response.json(), {'tenant': 'b'})
+        self.assertTrue(response.from_cache)
+        self.assertEqual(len(self._api_calls()), 2)
+
+    @responses.activate
+    def test_vary_on_ignored_headers(self):
+        responses.add(
+            responses.GET, API_URL, json={},
+            headers={'Cache-Control': 'max-age=60', 'Vary': 'Accept-Encoding, Authorization, User-Agent'},
+        )
+        self.client.get(API_URL)
+        self.assertTrue(self.client.get(API_URL).from_cache)
+
+    @responses.activate
+    @ddt.data({'auth': HTTPBasicAuth('alice', 'password')}, {'cookies': {'sessionid': 'alice'}})
+    def test_other_identities_not_cached(self, kwargs):
+        """
+        Test that responses to requests made with their own credentials are never cached or served from the cache
+        """
+        responses.add(responses.GET, API_URL, json={}, headers={'Cache-Control': 'max-age=60'})
+
+        self.client.get(API_URL, **kwargs)
+        self.client.get(API_URL)
+        self.client.get(API_URL, **kwargs)
+
+        self.assertEqual(len(self._api_calls()), 3)
+
+    @responses.activate
+    def test_key_scoped_by_client_id(self):
+        responses.add(responses.GET, API_URL, json={}, headers={'Cache-Control': 'max-age=60'})
+        other_client = OAuthAPIClient(BASE_URL, 'other', 'secret', response_cache=self.response_cache)
+        self.client.get(API_URL)
+        other_client.get(API_URL)
+        self.assertEqual(len(self._api_calls()), 2)
+
+    @responses.activate
+    @ddt.data('no-cache', 'no-store')
+    def test_request_cache_control(self, cache_control):
+        responses.add(responses.GET, API_URL, json={}, headers={'Cache-Control': 'max-age=60'})
+        self.client.get(API_URL)
+        self.client.get(API_URL, headers={'Cache-Control': cache_control})
+        self.assertEqual(len(self._api_calls()), 2)
+
+    @responses.activate
+    def test_other_methods_not_cached(self):
+        responses.add(responses.POST, API_URL, json={}, headers={'Cache-Control': 'max-age=60'})
+        self.client.post(API_URL)
+        self.client.post(API_URL)
+        self.assertEqual(len(self._api_calls()), 2)
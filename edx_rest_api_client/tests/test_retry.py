@@ -0,0 +1,182 @@
+import datetime
+import email.utils
+from unittest import TestCase, mock
+
+import ddt
+import requests
+import responses
+from edx_django_utils.cache import TieredCache
+
+from edx_rest_api_client.client import OAuthAPIClient, get_oauth_access_token
+from edx_rest_api_client.retry import RetryPolicy
+from edx_rest_api_client.tests.mixins import AuthenticationTestMixin
+
+BASE_URL = 'http://testing.test'
+OAUTH_URL = BASE_URL + '/oauth2/access_token'
+API_URL = BASE_URL + '/endpoint'
+
+
+@ddt.ddt
+class RetryPolicyTests(TestCase):
+    """
+    Tests for RetryPolicy
+    """
+
+    def setUp(self):
+        super().setUp()
+        sleep_patcher = mock.patch('edx_rest_api_client.retry.time.sleep')
+        self.mock_sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def _response(self, status_code, headers=None):
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers or {})
+        response.raw = mock.Mock()
+        return response
+
+    @mock.patch('edx_rest_api_client.retry.random.uniform', side_effect=lambda low, high: high)
+    def test_backoff(self, _mock_uniform):
+        policy = RetryPolicy(backoff_factor=0.5, backoff_max=3)
+        self.assertEqual([policy.get_backoff(n) for n in range(5)], [0.5, 1, 2, 3, 3])
+
+    def test_backoff_jitter(self):
+        policy = RetryPolicy(backoff_factor=1, backoff_max=60)
+        delays = [policy.get_backoff(4) for _ in range(50)]
+        self.assertTrue(all(0 <= delay <= 16 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    @ddt.data(
+        ('120', 120),
+        ('0', 0),
+        ('not-a-date', None),
+        (None, None),
+    )
+    @ddt.unpack
+    def test_retry_after(self, header, expected):
+        headers = {'Retry-After': header} if header else {}
+        self.assertEqual(RetryPolicy().get_retry_after(self._response(503, headers)), expected)
+
+    def test_retry_after_date(self):
+        retry_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=60)
+        response = self._response(503, {'Retry-After': email.utils.format_datetime(retry_at, usegmt=True)})
+        self.assertAlmostEqual(RetryPolicy().get_retry_after(response), 60, delta=2)
+
+    @mock.patch('edx_rest_api_client.retry.set_custom_attribute')
+    def test_retries_until_success(self, mock_set_custom_attribute):
+        send = mock.Mock(side_effect=[self._response(503), self._response(502), self._response(200)])
+        response = RetryPolicy(total=3).call(send, 'GET')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(self.mock_sleep.call_count, 2)
+        mock_set_custom_attribute.assert_called_once_with('api_client_retries', 2)
+
+    def test_retries_exhausted(self):
+        send = mock.Mock(return_value=self._response(503))
+        response = RetryPolicy(total=2).call(send, 'GET')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(send.call_count, 3)
+
+    @ddt.data(400, 404, 500)
+    def test_status_not_retried(self, status_code):
+        send = mock.Mock(return_value=self._response(status_code))
+        RetryPolicy().call(send, 'GET')
+        self.assertEqual(send.call_count, 1)
+
+    def test_method_not_retried(self):
+        send = mock.Mock(return_value=self._response(503))
+        RetryPolicy().call(send, 'POST')
+        self.assertEqual(send.call_count, 1)
+
+    def test_always_retryable(self):
+        send = mock.Mock(side_effect=[self._response(503), self._response(200)])
+        RetryPolicy().call(send, 'POST', always_retryable=True)
+        self.assertEqual(send.call_count, 2)
+
+    def test_connect_timeout_retried_for_any_method(self):
+        send = mock.Mock(side_effect=[requests.exceptions.ConnectTimeout(), self._response(201)])
+        response = RetryPolicy().call(send, 'POST')
+        self.assertEqual(response.status_code, 201)
+
+    def test_read_timeout_not_retried_for_unsafe_method(self):
+        send = mock.Mock(side_effect=requests.exceptions.ReadTimeout())
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            RetryPolicy().call(send, 'POST')
+        self.assertEqual(send.call_count, 1)
+
+    def test_connection_error_exhausted(self):
+        send = mock.Mock(side_effect=requests.ConnectionError())
+        with self.assertRaises(requests.ConnectionError):
+            RetryPolicy(total=2).call(send, 'GET')
+        self.assertEqual(send.call_count, 3)
+
+    def test_uses_retry_after(self):
+        send = mock.Mock(side_effect=[self._response(429, {'Retry-After': '7'}), self._response(200)])
+        RetryPolicy().call(send, 'GET')
+        self.mock_sleep.assert_called_once_with(7)
+
+    def test_retry_after_too_long(self):
+        send = mock.Mock(return_value=self._response(429, {'Retry-After': '3600'}))
+        response = RetryPolicy(backoff_max=30).call(send, 'GET')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(send.call_count, 1)
+
+    def test_deadline(self):
+        send = mock.Mock(return_value=self._response(503, {'Retry-After': '5'}))
+        # The call starts at 0 seconds, and each attempt takes 5 seconds. A retry waiting 5 seconds from
+        # the second attempt would only start after the deadline.
+        with mock.patch('edx_rest_api_client.retry.time.monotonic', side_effect=[0, 5, 10]):
+            response = RetryPolicy(total=10, deadline=12).call(send, 'GET')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(send.call_count, 2)
+
+
+class OAuthAPIClientRetryTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for retries made by OAuthAPIClient
+    """
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        sleep_patcher = mock.patch('edx_rest_api_client.retry.time.sleep')
+        sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+        self.client = OAuthAPIClient(BASE_URL, 'test', 'secret', retry=RetryPolicy(total=2))
+
+    @responses.activate
+    def test_api_call_retried(self):
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'abcd', 'expires_in': 60})
+        responses.add(responses.GET, API_URL, status=503)
+        responses.add(responses.GET, API_URL, status=200, json={'status': 'ok'})
+
+        response = self.client.get(API_URL)
+
+        self.assertEqual(response.json(), {'status': 'ok'})
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_streamed_body_not_retried(self):
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'abcd', 'expires_in': 60})
+        responses.add(responses.PUT, API_URL, status=503)
+
+        response = self.client.put(API_URL, data=iter([b'chunk']))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_token_request_retried(self):
+        responses.add(responses.POST, OAUTH_URL, status=503)
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'abcd', 'expires_in': 60})
+
+        self.assertEqual(self.client.get_jwt_access_token(), 'abcd')
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_get_oauth_access_token_retry(self):
+        responses.add(responses.POST, OAUTH_URL, body=requests.exceptions.ConnectTimeout())
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'abcd', 'expires_in': 60})
+
+        token, _ = get_oauth_access_token(BASE_URL, 'test', 'secret', retry=RetryPolicy())
+        self.assertEqual(token, 'abcd')
@@ -0,0 +1,156 @@
+import datetime
+import multiprocessing
+import os
+import stat
+import tempfile
+import threading
+import time
+from unittest import TestCase, mock, skipUnless
+
+import responses
+from edx_django_utils.cache import TieredCache
+
+from edx_rest_api_client import client as client_module
+from edx_rest_api_client.client import OAuthAPIClient, get_and_cache_oauth_access_token
+from edx_rest_api_client.tests.mixins import AuthenticationTestMixin
+from edx_rest_api_client.token_broker import FileTokenBroker
+
+URL = 'http://testing.test'
+OAUTH_URL = URL + '/oauth2/access_token'
+
+
+def _get_token_in_process(directory, fetch_log_path):
+    """
+    Gets a token through the broker in a separate process, recording each token request in ``fetch_log_path``.
+    """
+    def get_oauth_access_token(*args, **kwargs):  # pylint: disable=unused-argument
+        with open(fetch_log_path, 'a', encoding='utf-8') as fetch_log:
+            fetch_log.write('fetch\n')
+        time.sleep(0.2)
+        return 'abcd', datetime.datetime.utcnow() + datetime.timedelta(seconds=60)
+
+    TieredCache.dangerous_clear_all_tiers()
+    with mock.patch.object(client_module, 'get_oauth_access_token', get_oauth_access_token):
+        token, _ = get_and_cache_oauth_access_token(URL, 'client_id', 'secret', token_broker=FileTokenBroker(directory))
+    if token != 'abcd':
+        raise AssertionError(token)
+
+
+class FileTokenBrokerTests(TestCase):
+    """
+    Tests for FileTokenBroker
+    """
+
+    def setUp(self):
+        super().setUp()
+        temporary_directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temporary_directory.cleanup)
+        self.directory = os.path.join(temporary_directory.name, 'tokens')
+        self.broker = FileTokenBroker(self.directory)
+        self.expiration = datetime.datetime(2030, 1, 1, 12, 30)
+
+    def test_get_and_set(self):
+        self.assertIsNone(self.broker.get('key'))
+        self.broker.set('key', ('abcd', self.expiration))
+        self.assertEqual(self.broker.get('key'), ('abcd', self.expiration))
+        self.assertIsNone(self.broker.get('other-key'))
+
+    def test_private_files(self):
+        self.broker.set('key', ('abcd', self.expiration))
+        self.assertEqual(stat.S_IMODE(os.stat(self.directory).st_mode), 0o700)
+        for name in os.listdir(self.directory):
+            self.assertEqual(stat.S_IMODE(os.stat(os.path.join(self.directory, name)).st_mode), 0o600)
+
+    def test_shared_directory(self):
+        os.chmod(self.directory, 0o755)
+        with self.assertRaises(PermissionError):
+            FileTokenBroker(self.directory)
+
+    def test_corrupted_file(self):
+        self.broker.set('key', ('abcd', self.expiration))
+        for name in os.listdir(self.directory):
+            with open(os.path.join(self.directory, name), 'w', encoding='utf-8') as token_file:
+                token_file.write('{"access_token": ')
+        self.assertIsNone(self.broker.get('key'))
+
+    def test_lock(self):
+        events = []
+
+        def take_lock():
+            with self.broker.lock('key'):
+                events.append('second')
+
+        with self.broker.lock('key'):
+            thread = threading.Thread(target=take_lock)
+            thread.start()
+            thread.join(0.2)
+            events.append('first')
+        thread.join()
+
+        self.assertEqual(events, ['first', 'second'])
+
+    @skipUnless('fork' in multiprocessing.get_all_start_methods(), 'Requires the fork start method.')
+    def test_processes_share_one_fetch(self):
+        fetch_log_path = os.path.join(self.directory, 'fetches.log')
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=_get_token_in_process, args=(self.directory, fetch_log_path)) for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertEqual([process.exitcode for process in processes], [0] * 4)
+        with open(fetch_log_path, encoding='utf-8') as fetch_log:
+            self.assertEqual(fetch_log.read(), 'fetch\n')
+
+
+class TokenBrokerClientTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for getting access tokens through a FileTokenBroker
+    """
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        temporary_directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temporary_directory.cleanup)
+        self.broker = FileTokenBroker(temporary_directory.name + '/tokens')
+
+    def _cache_key(self):
+        return client_module._get_token_cache_key(  # pylint: disable=protected-access
+            'jwt', 'client_credentials', 'client_id', OAUTH_URL,
+        )
+
+    @responses.activate
+    def test_fetched_token_shared(self):
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'abcd', 'expires_in': 60})
+
+        token, expiration = get_and_cache_oauth_access_token(URL, 'client_id', 'secret', token_broker=self.broker)
+
+        self.assertEqual(self.broker.get(self._cache_key()), (token, expiration))
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_brokered_token_used(self):
+        expiration = datetime.datetime.utcnow() + datetime.timedelta(seconds=60)
+        self.broker.set(self._cache_key(), ('brokered', expiration))
+
+        client = OAuthAPIClient(URL, 'client_id', 'secret', token_broker=self.broker)
+
+        self.assertEqual(client.get_jwt_access_token(), 'brokered')
+        self.assertEqual(len(responses.calls), 0)
+        # The token is also cached in this process.
+        self.assertEqual(TieredCache.get_cached_response(self._cache_key()).value, ('brokered', expiration))
+
+    @responses.activate
+    def test_expired_brokered_token(self):
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'abcd', 'expires_in': 60})
+        expiration = datetime.datetime.utcnow() + datetime.timedelta(seconds=2)
+        self.broker.set(self._cache_key(), ('brokered', expiration))
+
+        token, _ = get_and_cache_oauth_access_token(URL, 'client_id', 'secret', token_broker=self.broker)
+
+        self.assertEqual(token, 'abcd')
+        self.assertEqual(self.broker.get(self._cache_key())[0], 'abcd')
@@ -0,0 +1,197 @@
+import datetime
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase, mock
+
+import responses
+from edx_django_utils.cache import TieredCache
+
+from edx_rest_api_client.client import OAuthAPIClient, get_and_cache_oauth_access_token
+from edx_rest_api_client.tests.mixins import AuthenticationTestMixin
+from edx_rest_api_client.token_store import (FileTokenStore, MemoryTokenStore, TieredCacheTokenStore,
+                                             get_default_token_store)
+
+URL = 'http://testing.test'
+OAUTH_URL = URL + '/oauth2/access_token'
+EXPIRATION = datetime.datetime(2030, 1, 1, 12, 30)
+
+
+class MemoryTokenStoreTests(TestCase):
+    """
+    Tests for MemoryTokenStore
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.store = MemoryTokenStore()
+
+    def test_get_set_and_delete(self):
+        self.assertIsNone(self.store.get('key'))
+        self.store.set('key', ('abcd', EXPIRATION), 60)
+        self.assertEqual(self.store.get('key'), ('abcd', EXPIRATION))
+
+        self.store.delete('key')
+        self.assertIsNone(self.store.get('key'))
+        self.store.delete('key')
+
+    @mock.patch('edx_rest_api_client.token_store.time.monotonic', return_value=100)
+    def test_expiration(self, mock_monotonic):
+        self.store.set('key', ('abcd', EXPIRATION), 60)
+        self.store.set('other-key', ('efgh', EXPIRATION), 30)
+
+        mock_monotonic.return_value = 159
+        self.assertEqual(self.store.get('key'), ('abcd', EXPIRATION))
+
+        mock_monotonic.return_value = 160
+        self.assertIsNone(self.store.get('key'))
+        self.assertNotIn('key', self.store._entries)  # pylint: disable=protected-access
+
+    @mock.patch('edx_rest_api_client.token_store.time.monotonic', return_value=100)
+    def test_set_evicts_expired_tokens(self, mock_monotonic):
+        self.store.set('key', ('abcd', EXPIRATION), 30)
+        mock_monotonic.return_value = 130
+        self.store.set('other-key', ('efgh', EXPIRATION), 30)
+
+        self.assertEqual(list(self.store._entries), ['other-key'])  # pylint: disable=protected-access
+
+
+class TieredCacheTokenStoreTests(TestCase):
+    """
+    Tests for TieredCacheTokenStore
+    """
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.store = TieredCacheTokenStore()
+
+    def test_get_set_and_delete(self):
+        self.assertIsNone(self.store.get('key'))
+        self.store.set('key', ('abcd', EXPIRATION), 60)
+        self.assertEqual(self.store.get('key'), ('abcd', EXPIRATION))
+        self.assertTrue(TieredCache.get_cached_response('key').is_found)
+
+        self.store.delete('key')
+        self.assertIsNone(self.store.get('key'))
+
+
+class FileTokenStoreTests(TestCase):
+    """
+    Tests for FileTokenStore
+    """
+
+    def setUp(self):
+        super().setUp()
+        temporary_directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temporary_directory.cleanup)
+        self.directory = temporary_directory.name
+        self.store = FileTokenStore(self.directory)
+
+    def test_get_set_and_delete(self):
+        self.store.set('key', ('abcd', EXPIRATION), 60)
+        self.assertEqual(FileTokenStore(self.directory).get('key'), ('abcd', EXPIRATION))
+
+        self.store.delete('key')
+        self.assertIsNone(self.store.get('key'))
+        self.assertEqual(os.listdir(self.directory), [])
+        self.store.delete('key')
+
+
+class ClientTokenStoreTests(AuthenticationTestMixin, TestCase):
+    """
+    Tests for the token_store of OAuthAPIClient and get_and_cache_oauth_access_token
+    """
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+
+    @responses.activate
+    def test_memory_store(self):
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'abcd', 'expires_in': 60})
+        store = MemoryTokenStore()
+
+        for _ in range(2):
+            token, _ = get_and_cache_oauth_access_token(URL, 'client_id', 'secret', token_store=store)
+            self.assertEqual(token, 'abcd')
+
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(len(store._entries), 1)  # pylint: disable=protected-access
+        # The TieredCache isn't used.
+        self.assertIsNone(TieredCacheTokenStore().get(next(iter(store._entries))))  # pylint: disable=protected-access
+
+    @responses.activate
+    def test_file_store(self):
+        """
+        Test that a token fetched by one run of a job is reused by the next one
+        """
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'abcd', 'expires_in': 60})
+        temporary_directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temporary_directory.cleanup)
+
+        for _ in range(2):
+            # Each run has its own process, with an empty TieredCache.
+            TieredCache.dangerous_clear_all_tiers()
+            client = OAuthAPIClient(URL, 'client_id', 'secret', token_store=FileTokenStore(temporary_directory.name))
+            self.assertEqual(client.get_jwt_access_token(), 'abcd')
+
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_expired_tokens_are_not_stored(self):
+        self._mock_auth_api(OAUTH_URL, 200, {'access_token': 'abcd', 'expires_in': 0})
+        store = MemoryTokenStore()
+
+        get_and_cache_oauth_access_token(URL, 'client_id', 'secret', token_store=store)
+
+        self.assertEqual(store._entries, {})  # pylint: disable=protected-access
+
+
+class DefaultTokenStoreTests(TestCase):
+    """
+    Tests for get_default_token_store and using the client without Django
+    """
+
+    def test_django_configured(self):
+        self.assertIsInstance(get_default_token_store(), TieredCacheTokenStore)
+        self.assertIs(get_default_token_store(), get_default_token_store())
+
+    @mock.patch('edx_rest_api_client.token_store.is_django_configured', return_value=False)
+    def test_without_django(self, _mock_is_django_configured):
+        self.assertIsInstance(get_default_token_store(), MemoryTokenStore)
+        self.assertIs(get_default_token_store(), get_default_token_store())
+
+    def test_import_without_django(self):
+        environment = dict(os.environ)
+        environment.pop('DJANGO_SETTINGS_MODULE', None)
+        script = (
+            'import sys\n'
+            'from edx_rest_api_client.client import OAuthAPIClient, get_request_id\n'
+            'from edx_rest_api_client.django_support import set_custom_attribute\n'
+            'from edx_rest_api_client.token_store import MemoryTokenStore, get_default_token_store\n'
+            'set_custom_attribute("key", "value")\n'
+            'assert get_request_id() is None\n'
+            'assert isinstance(get_default_token_store(), MemoryTokenStore)\n'
+            'assert not [name for name in sys.modules if name.split(".")[0] in ("django", "edx_django_utils")]\n'
+        )
+
+        subprocess.run([sys.executable, '-c', script], env=environment, check=True)
+
+    def test_import_without_fcntl(self):
+        """
+        Test that the client can be imported without fcntl, like on Windows, where FileTokenStore is unavailable
+        """
+        script = (
+            'import sys\n'
+            'sys.modules["fcntl"] = None\n'
+            'from edx_rest_api_client.client import OAuthAPIClient\n'
+            'from edx_rest_api_client import token_store\n'
+            'store = token_store.MemoryTokenStore()\n'
+            'store.set("key", ("abcd", None), 60)\n'
+            'assert store.get("key") == ("abcd", None)\n'
+            'assert not hasattr(token_store, "FileTokenStore")\n'
+        )
+
+        subprocess.run([sys.executable, '-c', script], check=True)
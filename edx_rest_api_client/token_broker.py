@@ -0,0 +1,115 @@
+"""
+Shares access tokens between the processes of a host, such as the workers of a gunicorn server.
+
+Only available on POSIX systems, because it relies on ``fcntl`` file locks.
+"""
+import contextlib
+import datetime
+import fcntl
+import hashlib
+import json
+import os
+import stat
+import tempfile
+
+# Preferred location of the token files: a memory-backed filesystem, so tokens never reach the disk.
+SHARED_MEMORY_DIRECTORY = '/dev/shm'
+
+
+def _get_default_directory():
+    parent = SHARED_MEMORY_DIRECTORY
+    if not (os.path.isdir(parent) and os.access(parent, os.W_OK | os.X_OK)):
+        parent = tempfile.gettempdir()
+    return os.path.join(parent, 'edx_rest_api_client_tokens-{}'.format(os.getuid()))
+
+
+class FileTokenBroker:
+    """
+    Shares access tokens between processes through files, with a file lock per token.
+
+    When a process needs a token that isn't in its own cache, it first looks for it in the broker.
+    Otherwise it takes the token's file lock, so that only one process on the host requests a new
+    token while the others wait for it. Locks are released by the operating system if their
+    holder dies.
+
+    Usage example::
+
+        client = OAuthAPIClient(
+            settings.BACKEND_SERVICE_EDX_OAUTH2_PROVIDER_URL,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_KEY,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_SECRET,
+            token_broker=FileTokenBroker(),
+        )
+
+    The token files are only readable by the user running the processes.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Args:
+            directory (str): Directory holding the token files. Defaults to a directory for the current user
+                in ``/dev/shm``, or in the temporary directory if there is no ``/dev/shm``.
+
+        Raises:
+            PermissionError if the directory belongs to another user or can be accessed by other users.
+
+        """
+        self.directory = directory or _get_default_directory()
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        directory_stat = os.stat(self.directory)
+        if directory_stat.st_uid != os.getuid() or stat.S_IMODE(directory_stat.st_mode) & 0o077:
+            raise PermissionError(
+                'The token broker directory {} must only be accessible by its owner.'.format(self.directory)
+            )
+
+    def _get_path(self, cache_key):
+        return os.path.join(self.directory, hashlib.sha256(cache_key.encode('utf-8')).hexdigest())
+
+    def get(self, cache_key):
+        """
+        Returns the (access token, expiration datetime) tuple stored for ``cache_key``, or None.
+        """
+        try:
+            with open(self._get_path(cache_key) + '.json', encoding='utf-8') as token_file:
+                data = json.load(token_file)
+            return data['access_token'], datetime.datetime.fromisoformat(data['expires_at'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def set(self, cache_key, oauth_access_token_response):
+        """
+        Stores the (access token, expiration datetime) tuple for ``cache_key``.
+
+        The file is replaced atomically, so readers never see a partly written token.
+        """
+        access_token, expiration = oauth_access_token_response
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'w', encoding='utf-8') as token_file:
+                json.dump({'access_token': access_token, 'expires_at': expiration.isoformat()}, token_file)
+            os.replace(temporary_path, self._get_path(cache_key) + '.json')
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def delete(self, cache_key):
+        """
+        Removes the token stored for ``cache_key``, if any.
+        """
+        try:
+            os.unlink(self._get_path(cache_key) + '.json')
+        except FileNotFoundError:
+            pass
+
+    @contextlib.contextmanager
+    def lock(self, cache_key):
+        """
+        Holds the lock for fetching the token stored at ``cache_key``, waiting for other processes to release it.
+        """
+        file_descriptor = os.open(self._get_path(cache_key) + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(file_descriptor, fcntl.LOCK_EX)
+            yield
+        finally:
+            # Closing the file releases the lock.
+            os.close(file_descriptor)
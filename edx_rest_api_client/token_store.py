@@ -0,0 +1,113 @@
+"""
+Stores for the access tokens fetched by ``OAuthAPIClient`` and ``get_and_cache_oauth_access_token``.
+
+A token store has the following methods, which take the cache key of a token:
+
+* ``get(cache_key)`` returns the stored (access token, expiration datetime) tuple, or None.
+* ``set(cache_key, oauth_access_token_response, timeout)`` stores the tuple for ``timeout`` seconds.
+* ``delete(cache_key)`` removes the stored token.
+
+Stores shared between processes can also have a ``lock(cache_key)`` context manager, which is held
+while fetching a new token so that only one process fetches it.
+
+By default, tokens are kept in the ``TieredCache`` when Django is configured, and otherwise in the
+memory of the process.
+"""
+import threading
+import time
+
+from edx_rest_api_client.django_support import is_django_configured
+
+try:
+    from edx_rest_api_client.token_broker import FileTokenBroker
+except ImportError:
+    # FileTokenBroker relies on fcntl file locks, so FileTokenStore is only available on POSIX systems.
+    FileTokenBroker = None
+
+
+class MemoryTokenStore:
+    """
+    Stores tokens in the memory of the current process, which is all that scripts usually need.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, cache_key):
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        oauth_access_token_response, expires_at = entry
+        if time.monotonic() >= expires_at:
+            with self._lock:
+                if self._entries.get(cache_key) is entry:
+                    del self._entries[cache_key]
+            return None
+        return oauth_access_token_response
+
+    def set(self, cache_key, oauth_access_token_response, timeout):
+        with self._lock:
+            now = time.monotonic()
+            # Tokens are stored rarely, so this is a good time to evict the expired ones.
+            for expired_key in [key for key, (_, expires_at) in self._entries.items() if now >= expires_at]:
+                del self._entries[expired_key]
+            self._entries[cache_key] = (oauth_access_token_response, now + timeout)
+
+    def delete(self, cache_key):
+        with self._lock:
+            self._entries.pop(cache_key, None)
+
+
+class TieredCacheTokenStore:
+    """
+    Stores tokens in the ``TieredCache`` of edx-django-utils: the request cache, then the Django cache.
+    """
+
+    def get(self, cache_key):
+        from edx_django_utils.cache import TieredCache  # pylint: disable=import-outside-toplevel
+        cached_response = TieredCache.get_cached_response(cache_key)
+        return cached_response.value if cached_response.is_found else None
+
+    def set(self, cache_key, oauth_access_token_response, timeout):
+        from edx_django_utils.cache import TieredCache  # pylint: disable=import-outside-toplevel
+        TieredCache.set_all_tiers(cache_key, oauth_access_token_response, timeout)
+
+    def delete(self, cache_key):
+        from edx_django_utils.cache import TieredCache  # pylint: disable=import-outside-toplevel
+        TieredCache.delete_all_tiers(cache_key)
+
+
+if FileTokenBroker is not None:
+    class FileTokenStore(FileTokenBroker):
+        """
+        Stores tokens in files, so that they outlive the process, for command line tools and batch jobs.
+
+        Consecutive runs of a job reuse the token fetched by the first one, and jobs running at the same
+        time wait on a file lock for the one fetching a new token. Expired tokens are left in their file
+        until they are replaced, and are never returned. See ``FileTokenBroker`` for the files.
+
+        Usage example::
+
+            client = OAuthAPIClient(base_url, client_id, client_secret, token_store=FileTokenStore())
+
+        """
+
+        def set(self, cache_key, oauth_access_token_response, timeout=None):  # pylint: disable=unused-argument
+            super().set(cache_key, oauth_access_token_response)
+
+
+_default_token_stores = {}
+_default_token_stores_lock = threading.Lock()
+
+
+def get_default_token_store():
+    """
+    Returns the ``TieredCacheTokenStore`` if Django is configured, and otherwise the process's ``MemoryTokenStore``.
+    """
+    store_class = TieredCacheTokenStore if is_django_configured() else MemoryTokenStore
+    store = _default_token_stores.get(store_class)
+    if store is None:
+        with _default_token_stores_lock:
+            store = _default_token_stores.setdefault(store_class, store_class())
+    return store
@@ -133,6 +133,13 @@ setup(
     author='edX',
     author_email='oscm@edx.org',
     license='Apache',
-    packages=find_packages(exclude=['*.tests']),
+    packages=find_packages(exclude=['*.tests', 'benchmarks']),
     install_requires=load_requirements('requirements/base.in'),
+    extras_require={
+        'async': ['httpx'],
+        'compression': ['urllib3[brotli,zstd]'],
+        'msgspec': ['msgspec'],
+        'opentelemetry': ['opentelemetry-api'],
+        'orjson': ['orjson'],
+    },
 )